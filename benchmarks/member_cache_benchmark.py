@@ -0,0 +1,107 @@
+"""
+Compara o consumo de memória dos modos de cache de membros ('full' e 'lean') em um servidor sintético.
+
+Nenhuma conexão com o Discord é feita: os payloads de GUILD_CREATE, dos chunks de membros e das
+atualizações de presença são gerados localmente e entregues ao estado interno do discord.py,
+que é o mesmo caminho usado pelo gateway.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/member_cache_benchmark.py --members 50000 --online 0.3 --presence-updates 20000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+
+from utils.members import build_client_options
+
+GUILD_ID = 1
+STATUSES = ("online", "idle", "dnd")
+
+def member_payload(user_id: int) -> dict:
+    return {
+        "user": {"id": str(user_id), "username": f"jogador{user_id}", "global_name": f"Jogador {user_id}", "discriminator": "0", "avatar": None},
+        "nick": None,
+        "roles": [str(10 + user_id % 5)],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+def presence_payload(user_id: int, rng: random.Random) -> dict:
+    activities = [{"name": "League of Legends: Wild Rift", "type": 0, "created_at": 0}] if rng.random() < 0.5 else []
+    status = rng.choice(STATUSES)
+    return {"user": {"id": str(user_id)}, "guild_id": str(GUILD_ID), "status": status, "activities": activities, "client_status": {"mobile": status}}
+
+def guild_payload(members: list, presences: list) -> dict:
+    roles = [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False}]
+    roles += [{"id": str(10 + i), "name": f"cargo{i}", "permissions": "0", "position": i + 1, "color": 0, "hoist": False, "managed": False, "mentionable": False} for i in range(5)]
+    return {"id": str(GUILD_ID), "name": "Arena", "roles": roles, "members": members, "presences": presences, "member_count": len(members)}
+
+def measure(label: str, fn):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<38} retido {current / 2**20:8.1f} MiB | pico {peak / 2**20:8.1f} MiB | {elapsed:6.2f}s")
+    return result
+
+def run_full(args, member_ids, rng):
+    print("Modo full (presenças + MemberCacheFlags.all + chunk na conexão)")
+    client = discord.Client(**build_client_options("full"))
+    state = client._connection
+    members = [member_payload(user_id) for user_id in member_ids]
+    online = [presence_payload(user_id, rng) for user_id in member_ids[:int(len(member_ids) * args.online)]]
+
+    guild = measure("servidor em cache", lambda: discord.Guild(data=guild_payload(members, online), state=state))
+    state._add_guild(guild)
+
+    updates = [presence_payload(rng.choice(member_ids), rng) for _ in range(args.presence_updates)]
+    measure(f"{args.presence_updates} atualizações de presença", lambda: [state.parse_presence_update(update) for update in updates])
+    print(f"  membros em cache: {len(guild.members)}")
+
+def run_lean(args, member_ids, rng):
+    print("Modo lean (sem presenças, cache só de quem está em call, sem chunk na conexão)")
+    client = discord.Client(**build_client_options("lean"))
+    state = client._connection
+    # Em servidores grandes o GUILD_CREATE não traz a lista de membros
+    guild = measure("servidor em cache", lambda: discord.Guild(data=guild_payload([], []), state=state))
+    state._add_guild(guild)
+    print(f"  atualizações de presença: nenhuma (intent desligada)")
+
+    # Sincronização diária: guild.chunk(cache=False) monta os membros só durante a tarefa
+    members = [member_payload(user_id) for user_id in member_ids]
+    def daily_sync():
+        chunk = [discord.Member(data=data, guild=guild, state=state) for data in members]
+        return len({member.id for member in chunk if not member.bot})
+    synced = measure("sincronização diária (chunk sem cache)", daily_sync)
+    print(f"  membros sincronizados: {synced} | membros em cache depois: {len(guild.members)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=50000)
+    parser.add_argument("--online", type=float, default=0.3, help="fração de membros online no GUILD_CREATE")
+    parser.add_argument("--presence-updates", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    member_ids = list(range(100_000, 100_000 + args.members))
+    print(f"Servidor sintético: {args.members} membros, {args.online:.0%} online\n")
+    run_full(args, member_ids, random.Random(args.seed))
+    print()
+    run_lean(args, member_ids, random.Random(args.seed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compara jogadores mantidos em memória como dict e como PlayerRecord (slots): memória retida,
+decodificação de BSON, acesso por chave e codificação de volta para BSON.
+
+Os documentos são gerados localmente no formato de PlayerService._new_player_document,
+já registrados e com partidas jogadas; nenhuma conexão com o MongoDB é feita.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/model_benchmark.py --players 100000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson
+from bson.codec_options import CodecOptions
+
+from database.records import PlayerRecord
+
+REGIONS = ("BR", "LAS", "NA")
+ROUTES = ("Topo", "Selva", "Meio", "Atirador", "Suporte")
+TIERS = ("Ferro", "Bronze", "Prata", "Ouro", "Platina")
+
+def player_document(player_id: int, rng: random.Random) -> dict:
+    wins, losses = rng.randint(0, 200), rng.randint(0, 200)
+    points = rng.randint(0, 2500)
+    now = time.time()
+    return {
+        "_id": player_id, "discord_id": player_id, "username": f"jogador{player_id}",
+        "is_registered": True, "registration_reminders_sent": 0, "last_reminder_sent_at": None,
+        "wr_nickname": f"Nick{player_id}", "wr_region": rng.choice(REGIONS), "wwr_official_rank": "Não ranqueado",
+        "preferred_roles": rng.sample(ROUTES, 2),
+        "individual_elo_points": points, "individual_current_elo": rng.choice(TIERS), "individual_current_division": "II",
+        "is_in_promo": False, "promo_wins": 0, "promo_losses": 0, "win_streak": rng.randint(0, 5), "demotion_shield_games": 0,
+        "wins": wins, "losses": losses, "matches_played": wins + losses, "peak_elo_points": points + rng.randint(0, 300),
+        "last_match_at": now, "created_at": now, "last_updated": now, "player_card_message_id": rng.getrandbits(60)
+    }
+
+def measure(label: str, fn):
+    """Executa `fn` medindo tempo e a memória que continua alocada enquanto o resultado existir."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<34} retido {current / 2**20:8.1f} MiB | pico {peak / 2**20:8.1f} MiB | {elapsed:6.2f}s")
+    return result
+
+def timed(label: str, fn, count: int):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {elapsed:6.3f}s ({count / elapsed / 1000:8.0f} mil/s)")
+
+def run(label: str, blob: bytes, codec_options: CodecOptions, count: int):
+    print(label)
+    players = measure("decodificar e manter em memória", lambda: bson.decode_all(blob, codec_options))
+    timed("acesso doc['campo'] (3 campos)", lambda: sum(
+        p["individual_elo_points"] + p["wins"] + p["matches_played"] for p in players
+    ), count)
+    timed("acesso doc.get('campo') (3 campos)", lambda: sum(
+        p.get("individual_elo_points", 0) + p.get("wins", 0) + p.get("matches_played", 0) for p in players
+    ), count)
+    timed("codificar para BSON", lambda: [bson.encode(p) for p in players], count)
+    return players
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    blob = b"".join(bson.encode(player_document(100_000 + i, rng)) for i in range(args.players))
+    print(f"{args.players} jogadores, {len(blob) / 2**20:.1f} MiB em BSON\n")
+
+    as_dicts = run("dict", blob, CodecOptions(), args.players)
+    print()
+    as_records = run("PlayerRecord (slots)", blob, PlayerRecord.codec_options(), args.players)
+    assert all(record == document for record, document in zip(as_records[:1000], as_dicts[:1000]))
+
+if __name__ == "__main__":
+    main()
@@ -4,47 +4,150 @@ from discord.ext import commands
 import logging
 import time
 import asyncio
-import os
-from typing import Any, Dict
+import weakref
+from typing import Any, Dict, Optional, Sequence, Union
+
+from bson import ObjectId
+from bson.errors import InvalidId
 
 # Importa todos os nossos módulos auxiliares
 from database.player_service import PlayerService
 from database.duel_service import DuelService
+from database.history_service import MatchHistoryService
+from database.job_service import JobService
+from database.bot_state_service import BotStateService
+from database.history_digest_service import HistoryDigestService
 from database.connection import get_db
 from ui.duel_ui import DuelChallengeView, DuelPanelView, DisputeDecisionView
-from utils.elo_calculator import calculate_elo
-from utils.embeds import create_duel_result_embed, create_player_card_embed
+from utils.embeds import create_duel_result_embed
+from utils.duel_registry import ActiveDuelRegistry
+from utils.arena_pool import ArenaPool
+from utils.job_scheduler import JobScheduler
+from utils.members import resolve_member
+from utils.anchor_messages import AnchorMessages
+from utils.history_digest import HistoryDigest
+from utils.settings import get_settings
+from utils.rest_scheduler import PRIORITY_INTERACTION, PRIORITY_DUEL_PANEL, PRIORITY_CONTENT, PRIORITY_CLEANUP, channel_route
 
 logger = logging.getLogger(__name__)
 
-# Carrega as configurações do .env
-try:
-    SERVER_ID = int(os.getenv('SERVER_ID'))
-    DUEL_HISTORY_CHANNEL_ID = int(os.getenv('DUEL_HISTORY_CHANNEL_ID'))
-    PLAYER_CARD_CHANNEL_ID = int(os.getenv('PLAYER_CARD_CHANNEL_ID'))
-    MOD_ROLE_ID = int(os.getenv('MOD_ROLE_ID'))
-except (TypeError, ValueError):
-    logger.critical("ERRO CRÍTICO: IDs de canal ou de cargo não configurados no .env!")
-    SERVER_ID, DUEL_HISTORY_CHANNEL_ID, PLAYER_CARD_CHANNEL_ID, MOD_ROLE_ID = 0, 0, 0, 0
+# Prazos aplicados pelo agendador (em segundos)
+CHALLENGE_EXPIRY_SECONDS = 3600
+SCREENSHOT_TIMEOUT_SECONDS = 120
+CONFIRMATION_TIMEOUT_SECONDS = 1800
+ARENA_CLEANUP_DELAY_SECONDS = 30
 
 class DuelCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.settings = get_settings()
         db = get_db()
         self.player_service = PlayerService(db.players)
         self.duel_service = DuelService(db.duels)
+        self.history_service = MatchHistoryService(db.duel_history)
+        # Índice em memória dos duelos ativos (por jogador e por canal), sincronizado a cada transição
+        self.active_duels = ActiveDuelRegistry()
+        # Categorias de duelo pré-criadas, reaproveitadas entre duelos
+        self.arena_pool = ArenaPool(
+            bot, self.settings.server_id, min_idle=self.settings.arena_pool_min_idle, max_idle=self.settings.arena_pool_max_idle
+        )
+        # Prazos e limpezas persistentes, que sobrevivem a reinícios do bot
+        self.scheduler = JobScheduler(JobService(db.scheduled_jobs))
+        self.scheduler.register_handler("challenge_expiry", self.expire_challenge)
+        self.scheduler.register_handler("screenshot_timeout", self.expire_screenshot)
+        self.scheduler.register_handler("confirmation_timeout", self.expire_confirmation)
+        self.scheduler.register_handler("duel_cleanup", self.cleanup_duel_channels)
+        # Painéis de disputa abertos no canal da moderação, por duelo
+        self.anchors = AnchorMessages(bot, BotStateService(db.bot_state))
+        # Modo resumo do histórico: resultados agrupados em mensagens de até 10 embeds
+        self.history_digest: Optional[HistoryDigest] = None
+        if self.settings.history_digest_mode:
+            self.history_digest = HistoryDigest(
+                bot, HistoryDigestService(db.history_digest), self.settings.duel_history_channel_id,
+                flush_interval=self.settings.history_digest_interval_seconds
+            )
         
         self.duel_context_menu = app_commands.ContextMenu(
             name="Desafiar para Duelo",
             callback=self.challenge_duel,
         )
         self.bot.tree.add_command(self.duel_context_menu)
-        
-        self.bot.add_view(DisputeDecisionView(duel_data={"_id":0, "challenger_id":0, "opponent_id":0}))
+        self.startup_task: Optional[asyncio.Task] = None
+        # Locks por duelo; somem sozinhos quando nenhum handler os está usando
+        self._duel_locks: "weakref.WeakValueDictionary[Any, asyncio.Lock]" = weakref.WeakValueDictionary()
         logger.info("Cog de Duelos carregado e comando de menu de contexto registrado.")
 
+    async def cog_load(self):
+        """Reconstrói o registro de duelos ativos a partir do banco."""
+        active_duels = await self.duel_service.get_active_duels()
+        self.active_duels.load(active_duels)
+        logger.info(f"Registro de duelos ativos carregado com {len(self.active_duels)} duelos.")
+
+    def persistent_views(self) -> list[discord.ui.View]:
+        """Views persistentes registradas pelo bot na inicialização."""
+        return [DisputeDecisionView(duel_data={"_id":0, "challenger_id":0, "opponent_id":0})]
+
+    async def start_background_tasks(self):
+        """Chamado pelo bot após o carregamento dos cogs: prepara o pool de arenas e o agendador."""
+        self.startup_task = asyncio.create_task(self._start_background(self.active_duels.channel_ids()))
+
+    async def _start_background(self, active_channel_ids):
+        # O agendador só começa depois do pool: as arenas recuperadas já estão limpas (ociosas) ou registradas
+        # como em uso, e cleanup_duel_channels não apaga nenhuma delas
+        await self.arena_pool.start(in_use_channel_ids=active_channel_ids)
+        await self.scheduler.start()
+        await self.schedule_missing_deadlines()
+        if self.history_digest:
+            await self.history_digest.start()
+
+    async def schedule_missing_deadlines(self):
+        """
+        Agenda os prazos dos duelos ativos que não têm trabalho no agendador (ex.: duelos abertos antes
+        de o prazo existir), para que nenhum desafio ou resultado sem resposta prenda os jogadores.
+        """
+        scheduled = 0
+        for duel in self.active_duels.duels():
+            payload = {"duel_id": duel['_id']}
+            if duel['status'] == "pending":
+                delay = max(duel.get('created_at', 0) + CHALLENGE_EXPIRY_SECONDS - time.time(), 0)
+                created = await self.scheduler.ensure_scheduled("challenge_expiry", delay, payload, key=f"challenge_expiry:{duel['_id']}")
+            elif duel['status'] == "awaiting_screenshot":
+                created = await self.scheduler.ensure_scheduled(
+                    "screenshot_timeout", SCREENSHOT_TIMEOUT_SECONDS, payload, key=f"screenshot_timeout:{duel['_id']}"
+                )
+            elif duel['status'] == "awaiting_confirmation":
+                created = await self.scheduler.ensure_scheduled(
+                    "confirmation_timeout", CONFIRMATION_TIMEOUT_SECONDS, payload, key=f"confirmation_timeout:{duel['_id']}"
+                )
+            else:
+                continue
+            scheduled += created
+        if scheduled:
+            logger.info(f"{scheduled} prazos de duelos ativos sem agendamento foram recriados.")
+
     def cog_unload(self):
         self.bot.tree.remove_command(self.duel_context_menu.name, type=self.duel_context_menu.type)
+        if self.startup_task:
+            self.startup_task.cancel()
+        self.scheduler.stop()
+        if self.history_digest:
+            self.history_digest.stop()
+
+    def duel_lock(self, duel_id: Any) -> asyncio.Lock:
+        """Lock do duelo: serializa cliques, screenshots e prazos do mesmo duelo neste processo."""
+        lock = self._duel_locks.get(duel_id)
+        if lock is None:
+            lock = self._duel_locks[duel_id] = asyncio.Lock()
+        return lock
+
+    async def update_duel(self, duel_id: Any, updates: dict, expected_status: Optional[Union[str, Sequence[str]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atualiza o duelo no banco (como compare-and-set, se `expected_status` for informado)
+        e mantém o registro de duelos ativos em sincronia. Retorna None se a transição perdeu a corrida.
+        """
+        updated_duel = await self.duel_service.update_duel(duel_id, updates, expected_status=expected_status)
+        self.active_duels.track(updated_duel)
+        return updated_duel
 
     async def challenge_duel(self, interaction: discord.Interaction, target: discord.Member):
         challenger = interaction.user
@@ -53,21 +156,28 @@ class DuelCog(commands.Cog):
             return await interaction.followup.send("❌ Você não pode desafiar a si mesmo.", ephemeral=True)
         if target.bot:
             return await interaction.followup.send("❌ Você não pode desafiar um bot.", ephemeral=True)
-        if await self.duel_service.get_active_duel_for_player(challenger.id) or await self.duel_service.get_active_duel_for_player(target.id):
+        if self.active_duels.get_for_player(challenger.id) or self.active_duels.get_for_player(target.id):
             return await interaction.followup.send("❌ Um dos jogadores já está em um duelo ou tem um desafio pendente.", ephemeral=True)
-        challenger_data = await self.player_service.get_player_by_id(challenger.id)
-        target_data = await self.player_service.get_player_by_id(target.id)
+        players = await self.player_service.get_players_by_ids([challenger.id, target.id], profile="eligibility")
+        challenger_data, target_data = players.get(challenger.id), players.get(target.id)
         if not challenger_data or not target_data or not challenger_data.get('is_registered') or not target_data.get('is_registered'):
              return await interaction.followup.send("❌ Ambos os jogadores precisam estar registrados para duelar.", ephemeral=True)
         new_duel = await self.duel_service.create_duel(challenger.id, target.id, challenger_data['individual_elo_points'], target_data['individual_elo_points'])
+        self.active_duels.track(new_duel)
         try:
             embed = discord.Embed(title="⚔️ Você foi Desafiado! ⚔️", description=f"**{challenger.display_name}** te desafiou para um duelo 1v1!", color=discord.Color.gold())
             embed.set_footer(text="Você tem 1 hora para responder.")
-            await target.send(embed=embed, view=DuelChallengeView(duel_id=new_duel['_id']))
+            # Quem desafiou está esperando a confirmação: o convite passa na frente das escritas de fundo
+            await self.bot.rest_scheduler.submit(
+                PRIORITY_INTERACTION, "dm", lambda: target.send(embed=embed, view=DuelChallengeView(duel_id=new_duel['_id']))
+            )
+            await self.scheduler.schedule(
+                "challenge_expiry", CHALLENGE_EXPIRY_SECONDS, {"duel_id": new_duel['_id']}, key=f"challenge_expiry:{new_duel['_id']}"
+            )
             await interaction.followup.send(f"✅ Desafio enviado para **{target.display_name}**!", ephemeral=True)
         except discord.Forbidden:
             await interaction.followup.send(f"❌ Não consegui enviar o desafio para **{target.display_name}**. Ele pode ter as DMs desabilitadas.", ephemeral=True)
-            await self.duel_service.update_duel(new_duel['_id'], {"status": "cancelled"})
+            await self.update_duel(new_duel['_id'], {"status": "cancelled"}, expected_status="pending")
         except Exception as e:
             logger.error(f"Erro inesperado ao enviar DM de duelo: {e}")
             await interaction.followup.send("❌ Ocorreu um erro ao enviar o desafio.", ephemeral=True)
@@ -75,23 +185,30 @@ class DuelCog(commands.Cog):
     @commands.Cog.listener("on_message")
     async def on_duel_screenshot(self, message: discord.Message):
         if message.author.bot or not message.guild or not message.attachments: return
-        duel = await self.duel_service.collection.find_one({"channel_id": message.channel.id, "status": "awaiting_screenshot"})
-        if not duel: return
+        # Mensagens fora de canais de duelo são descartadas sem consultar o banco
+        duel = self.active_duels.get_for_channel(message.channel.id)
+        if not duel or duel['status'] != "awaiting_screenshot": return
         if message.author.id == duel.get('reported_winner_id'):
             screenshot = message.attachments[0]
-            if not screenshot.content_type.startswith("image/"): return
+            if not screenshot.content_type or not screenshot.content_type.startswith("image/"): return
+            async with self.duel_lock(duel['_id']):
+                updated_duel = await self.update_duel(
+                    duel['_id'], {"status": "awaiting_confirmation", "screenshot_url": screenshot.url}, expected_status="awaiting_screenshot"
+                )
+            if not updated_duel: return # O prazo expirou ou outro screenshot chegou antes
             logger.info(f"Screenshot recebido de {message.author.display_name} para o duelo {duel['_id']}")
-            await self.duel_service.update_duel(duel['_id'], {"status": "awaiting_confirmation", "screenshot_url": screenshot.url})
-            updated_duel = await self.duel_service.get_duel_by_id(duel['_id'])
+            await self.scheduler.cancel(f"screenshot_timeout:{duel['_id']}")
+            # Sem resposta do oponente, o resultado reportado é confirmado automaticamente
+            await self.scheduler.schedule(
+                "confirmation_timeout", CONFIRMATION_TIMEOUT_SECONDS, {"duel_id": duel['_id']}, key=f"confirmation_timeout:{duel['_id']}"
+            )
             opponent_id = duel['challenger_id'] if message.author.id == duel['opponent_id'] else duel['opponent_id']
-            opponent = message.guild.get_member(opponent_id)
+            opponent = await resolve_member(message.guild, opponent_id)
             try:
                 if panel_message_id := duel.get('panel_message_id'):
-                    panel_message = await message.channel.fetch_message(panel_message_id)
-                    await panel_message.edit(content=f"{opponent.mention}, seu oponente reportou vitória com a evidência acima. **Confirme ou dispute o resultado.**", view=DuelPanelView(updated_duel))
+                    await message.channel.get_partial_message(panel_message_id).edit(content=f"{opponent.mention}, seu oponente reportou vitória com a evidência acima. **Confirme ou dispute o resultado.** Sem resposta em {CONFIRMATION_TIMEOUT_SECONDS // 60} minutos, ele é confirmado automaticamente.", view=DuelPanelView(updated_duel))
                 if prompt_message_id := duel.get('prompt_message_id'):
-                    prompt_msg = await message.channel.fetch_message(prompt_message_id)
-                    await prompt_msg.delete()
+                    await message.channel.get_partial_message(prompt_message_id).delete()
                 await message.add_reaction("✅")
             except (discord.NotFound, discord.Forbidden) as e:
                 logger.error(f"Não foi possível encontrar ou editar a mensagem do painel/prompt de duelo: {e}")
@@ -104,140 +221,133 @@ class DuelCog(commands.Cog):
         try:
             parts = custom_id.split("_")
             action = parts[1]
-            duel_id = parts[2]
+            duel_id = ObjectId(parts[2])
             winner_id = int(parts[3]) if len(parts) > 3 else None
-        except (ValueError, IndexError):
+        except (ValueError, IndexError, InvalidId):
             return logger.error(f"custom_id malformado recebido: {custom_id}")
-        if action == "accept": await self.handle_duel_accept(interaction, duel_id)
-        elif action == "decline": await self.handle_duel_decline(interaction, duel_id)
-        elif action == "report": await self.handle_report_winner(interaction, duel_id)
-        elif action == "confirm": await self.handle_confirm_defeat(interaction, duel_id)
-        elif action == "dispute": await self.handle_dispute(interaction, duel_id)
-        elif action == "modwin": await self.handle_mod_decision(interaction, duel_id, winner_id)
-
-    async def handle_duel_accept(self, interaction: discord.Interaction, duel_id: str):
-        duel = await self.duel_service.get_duel_by_id(duel_id)
+        # Cliques no mesmo duelo são tratados um de cada vez; cada handler lê o estado já atualizado pelo anterior
+        async with self.duel_lock(duel_id):
+            if action == "accept": await self.handle_duel_accept(interaction, duel_id)
+            elif action == "decline": await self.handle_duel_decline(interaction, duel_id)
+            elif action == "report": await self.handle_report_winner(interaction, duel_id)
+            elif action == "confirm": await self.handle_confirm_defeat(interaction, duel_id)
+            elif action == "dispute": await self.handle_dispute(interaction, duel_id)
+            elif action == "modwin": await self.handle_mod_decision(interaction, duel_id, winner_id)
+
+    async def handle_duel_accept(self, interaction: discord.Interaction, duel_id: ObjectId):
+        accept_started = time.monotonic()
+        duel = self.active_duels.get(duel_id)
         if not duel or duel['status'] != 'pending' or interaction.user.id != duel['opponent_id']:
             return await interaction.response.send_message("❌ Este convite é inválido ou não é para você.", ephemeral=True, delete_after=10)
+        # Reivindica o desafio antes de criar a arena: um segundo clique ou a expiração não passam daqui
+        duel = await self.update_duel(duel_id, {"status": "in_progress", "accepted_at": time.time()}, expected_status="pending")
+        if not duel:
+            return await interaction.response.send_message("❌ Este convite não está mais disponível.", ephemeral=True, delete_after=10)
+        await self.scheduler.cancel(f"challenge_expiry:{duel['_id']}")
         await interaction.message.delete()
         await interaction.response.send_message(f"✅ Duelo aceito! Criando uma área privada para o confronto...", ephemeral=True)
-        server_id = int(os.getenv('SERVER_ID'))
-        guild = self.bot.get_guild(server_id)
-        if not guild: return logger.error(f"Erro crítico: Servidor com ID {server_id} não encontrado.")
-        challenger = guild.get_member(duel['challenger_id'])
-        opponent = guild.get_member(duel['opponent_id'])
+        guild = self.bot.get_guild(self.settings.server_id)
+        if not guild: return logger.error(f"Erro crítico: Servidor com ID {self.settings.server_id} não encontrado.")
+        challenger = await resolve_member(guild, duel['challenger_id'])
+        opponent = await resolve_member(guild, duel['opponent_id'])
         if not challenger or not opponent:
-            await self.duel_service.update_duel(duel_id, {"status": "cancelled"})
+            await self.update_duel(duel_id, {"status": "cancelled"}, expected_status="in_progress")
             return 
-        overwrites = {guild.default_role: discord.PermissionOverwrite(read_messages=False, connect=False), challenger: discord.PermissionOverwrite(read_messages=True, connect=True, speak=True), opponent: discord.PermissionOverwrite(read_messages=True, connect=True, speak=True), guild.me: discord.PermissionOverwrite(read_messages=True, manage_channels=True)}
         try:
-            category_name = f"⚔️ Duelo: {challenger.name} vs {opponent.name}"
-            category = await guild.create_category(name=category_name[:100], overwrites=overwrites, reason=f"Duelo {duel_id}")
-            text_channel = await category.create_text_channel(name="💬-chat-do-duelo")
-            await category.create_voice_channel(name="🔊 Call do Duelo")
-        except discord.Forbidden:
-            return logger.error("Bot sem permissão de 'Gerenciar Canais' para criar a categoria/canais de duelo.")
-        await self.duel_service.update_duel(duel_id, {"status": "in_progress", "channel_id": text_channel.id, "accepted_at": time.time()})
+            # Reaproveita uma arena ociosa do pool (ou cria uma nova se o pool estiver vazio)
+            arena = await self.arena_pool.acquire([challenger, opponent], reason=f"Duelo {duel_id}")
+            text_channel = arena.text_channel
+        except discord.HTTPException as e:
+            # Sem arena o duelo não tem onde acontecer: é cancelado para não prender os dois jogadores
+            await self.update_duel(duel_id, {"status": "cancelled"}, expected_status="in_progress")
+            await interaction.followup.send("❌ Não foi possível preparar a arena do duelo. Tente desafiar novamente.", ephemeral=True)
+            if isinstance(e, discord.Forbidden):
+                return logger.error("Bot sem permissão de 'Gerenciar Canais' para criar a categoria/canais de duelo.")
+            return logger.error(f"Falha ao preparar a arena do duelo {duel_id}: {e}")
+        duel = await self.update_duel(duel_id, {"channel_id": text_channel.id}, expected_status="in_progress")
         panel_embed = discord.Embed(title="🔥 Painel de Duelo 🔥", description=f"O duelo entre {challenger.mention} e {opponent.mention} começou!\nQue vença o melhor!", color=discord.Color.red())
         panel_embed.set_footer(text="Após a partida, o vencedor deve clicar no botão para reportar o resultado.")
-        duel_doc_for_panel = await self.duel_service.get_duel_by_id(duel_id)
-        await text_channel.send(embed=panel_embed, view=DuelPanelView(duel_doc_for_panel))
+        await self.bot.rest_scheduler.submit(
+            PRIORITY_DUEL_PANEL, channel_route(text_channel), lambda: text_channel.send(embed=panel_embed, view=DuelPanelView(duel))
+        )
+        self.arena_pool.record_accept_latency(time.monotonic() - accept_started)
     
-    async def handle_duel_decline(self, interaction: discord.Interaction, duel_id: str):
-        duel = await self.duel_service.get_duel_by_id(duel_id)
+    async def handle_duel_decline(self, interaction: discord.Interaction, duel_id: ObjectId):
+        duel = self.active_duels.get(duel_id)
         if not duel or interaction.user.id != duel['opponent_id']:
-            return await interaction.response.send_message("❌ Este convite não é para você.", ephemeral=True, delete_after=10)
-        await self.duel_service.update_duel(duel_id, {"status": "cancelled"})
+            return await interaction.response.send_message("❌ Este convite é inválido ou não é para você.", ephemeral=True, delete_after=10)
+        if not await self.update_duel(duel_id, {"status": "cancelled"}, expected_status="pending"):
+            return await interaction.response.send_message("❌ Este convite não está mais disponível.", ephemeral=True, delete_after=10)
+        await self.scheduler.cancel(f"challenge_expiry:{duel['_id']}")
         challenger = self.bot.get_user(duel['challenger_id'])
         await interaction.message.edit(content=f"Você recusou o desafio de {challenger.mention if challenger else 'um jogador'}.", view=None)
 
-    async def handle_report_winner(self, interaction: discord.Interaction, duel_id: str):
-        duel = await self.duel_service.get_duel_by_id(duel_id)
+    async def handle_report_winner(self, interaction: discord.Interaction, duel_id: ObjectId):
+        duel = self.active_duels.get(duel_id)
         if not duel or interaction.user.id not in [duel['challenger_id'], duel['opponent_id']] or duel['status'] != 'in_progress':
             return await interaction.response.send_message("❌ Você não pode reportar este resultado.", ephemeral=True)
-        await self.duel_service.update_duel(duel_id, {"status": "awaiting_screenshot", "reported_winner_id": interaction.user.id, "panel_message_id": interaction.message.id})
+        duel = await self.update_duel(
+            duel_id, {"status": "awaiting_screenshot", "reported_winner_id": interaction.user.id, "panel_message_id": interaction.message.id},
+            expected_status="in_progress"
+        )
+        if not duel:
+            return await interaction.response.send_message("❌ O resultado deste duelo já foi reportado.", ephemeral=True)
         await interaction.response.edit_message(view=None)
         prompt_message = await interaction.channel.send(f"📸 {interaction.user.mention}, por favor, envie o **screenshot da tela de vitória** para validar o resultado. Você tem 2 minutos.")
-        await self.duel_service.update_duel(duel_id, {"prompt_message_id": prompt_message.id})
+        await self.update_duel(duel_id, {"prompt_message_id": prompt_message.id}, expected_status="awaiting_screenshot")
+        await self.scheduler.schedule(
+            "screenshot_timeout", SCREENSHOT_TIMEOUT_SECONDS, {"duel_id": duel['_id']}, key=f"screenshot_timeout:{duel['_id']}"
+        )
 
-    async def handle_confirm_defeat(self, interaction: discord.Interaction, duel_id: str):
+    async def handle_confirm_defeat(self, interaction: discord.Interaction, duel_id: ObjectId):
         await interaction.response.defer()
-        duel = await self.duel_service.get_duel_by_id(duel_id)
-        reported_winner_id = duel.get('reported_winner_id')
-        if not duel or duel['status'] != 'awaiting_confirmation' or interaction.user.id == reported_winner_id:
+        duel = self.active_duels.get(duel_id)
+        reported_winner_id = duel.get('reported_winner_id') if duel else None
+        if not duel or duel['status'] != 'awaiting_confirmation' or interaction.user.id not in (duel['challenger_id'], duel['opponent_id']) or interaction.user.id == reported_winner_id:
             return await interaction.followup.send("❌ Você não pode confirmar este resultado.", ephemeral=True)
         winner_id, loser_id = reported_winner_id, interaction.user.id
+        await self.scheduler.cancel(f"confirmation_timeout:{duel['_id']}")
         await self.finalize_duel(interaction, duel, winner_id, loser_id)
 
     @app_commands.checks.has_permissions(manage_messages=True)
-    async def handle_mod_decision(self, interaction: discord.Interaction, duel_id: str, winner_id: int):
+    async def handle_mod_decision(self, interaction: discord.Interaction, duel_id: ObjectId, winner_id: int):
         await interaction.response.defer()
-        duel = await self.duel_service.get_duel_by_id(duel_id)
+        duel = self.active_duels.get(duel_id)
         if not duel or duel['status'] != 'disputed':
             return await interaction.followup.send("❌ Este duelo não está mais aguardando uma decisão.", ephemeral=True)
         loser_id = duel['opponent_id'] if winner_id == duel['challenger_id'] else duel['challenger_id']
         duel_channel = self.bot.get_channel(duel['channel_id'])
         await self.finalize_duel(interaction, duel, winner_id, loser_id, duel_channel=duel_channel)
 
-    async def handle_dispute(self, interaction: discord.Interaction, duel_id: str):
+    async def handle_dispute(self, interaction: discord.Interaction, duel_id: ObjectId):
         await interaction.response.defer()
-        duel = await self.duel_service.get_duel_by_id(duel_id)
-        if not duel: return
-        await self.duel_service.update_duel(duel_id, {"status": "disputed"})
-        mod_channel_id = int(os.getenv('MOD_CHANNEL_ID', 0))
-        mod_role = interaction.guild.get_role(MOD_ROLE_ID)
+        duel = await self.update_duel(duel_id, {"status": "disputed"}, expected_status="awaiting_confirmation")
+        if not duel:
+            return await interaction.followup.send("❌ Este resultado não pode mais ser disputado.", ephemeral=True)
+        await self.scheduler.cancel(f"confirmation_timeout:{duel['_id']}")
+        resources = self.bot.guild_resources
+        mod_role = resources.role(self.settings.mod_role_id)
         mod_ping = f"{mod_role.mention}, uma disputa foi aberta!" if mod_role else "**Atenção, @Moderadores!**"
-        challenger = interaction.guild.get_member(duel['challenger_id'])
-        opponent = interaction.guild.get_member(duel['opponent_id'])
-        reported_winner = interaction.guild.get_member(duel['reported_winner_id'])
+        challenger, opponent, reported_winner = await asyncio.gather(
+            *(resolve_member(interaction.guild, member_id) for member_id in (duel['challenger_id'], duel['opponent_id'], duel['reported_winner_id']))
+        )
         dispute_embed = discord.Embed(title=f"❗ Disputa de Duelo: {challenger.display_name} vs {opponent.display_name}", description=f"O resultado reportado por {reported_winner.mention} foi disputado por {interaction.user.mention}.", color=discord.Color.yellow())
         if screenshot_url := duel.get('screenshot_url'):
             dispute_embed.set_image(url=screenshot_url)
         dispute_embed.set_footer(text=f"ID do Duelo: {duel_id}")
-        mod_channel = interaction.guild.get_channel(mod_channel_id)
+        mod_channel = resources.channel(self.settings.mod_channel_id)
         if mod_channel:
             mod_panel_embed = discord.Embed(title="Painel de Moderação", description="Selecione o vencedor do duelo abaixo para finalizar a partida.", color=discord.Color.orange())
             await mod_channel.send(content=mod_ping, embed=dispute_embed)
-            await mod_channel.send(embed=mod_panel_embed, view=DisputeDecisionView(duel))
+            mod_panel = await mod_channel.send(embed=mod_panel_embed, view=DisputeDecisionView(duel))
+            await self.anchors.record(f"dispute_panel:{duel['_id']}", mod_panel)
         await interaction.message.edit(content="❗ **Disputa registrada!** A moderação foi notificada e irá analisar o caso. Este canal está agora trancado.", embed=None, view=None)
 
     async def finalize_duel(self, interaction: discord.Interaction, duel: Dict[str, Any], winner_id: int, loser_id: int, duel_channel: discord.TextChannel = None):
-        winner_data, loser_data = await self.player_service.get_player_by_id(winner_id), await self.player_service.get_player_by_id(loser_id)
-        winner_elo_before, loser_elo_before = winner_data['individual_elo_points'], loser_data['individual_elo_points']
-        K_FACTOR_NEW_PLAYER, K_FACTOR_ESTABLISHED = 40, 24
-        winner_k = K_FACTOR_NEW_PLAYER if len(winner_data.get('individual_match_history', [])) < 20 else K_FACTOR_ESTABLISHED
-        loser_k = K_FACTOR_NEW_PLAYER if len(loser_data.get('individual_match_history', [])) < 20 else K_FACTOR_ESTABLISHED
-        winner_points_change, loser_points_change = calculate_elo(winner_elo_before, loser_elo_before, winner_k, loser_k)
-        winner_result = await self.player_service.update_player_after_duel(winner_id, "win", winner_points_change, loser_id, loser_elo_before)
-        await self.player_service.update_player_after_duel(loser_id, "loss", loser_points_change, winner_id, winner_elo_before)
-        final_winner_points_gain = winner_result.get("points", 0)
-        updated_duel = await self.duel_service.update_duel(duel['_id'], {"status": "completed", "winner_id": winner_id, "loser_id": loser_id, "points_change": final_winner_points_gain, "completed_at": time.time()})
-        
-        server_id = int(os.getenv('SERVER_ID'))
-        player_card_channel_id = int(os.getenv('PLAYER_CARD_CHANNEL_ID'))
-        duel_history_channel_id = int(os.getenv('DUEL_HISTORY_CHANNEL_ID'))
-        guild = self.bot.get_guild(server_id)
-        winner, loser = guild.get_member(winner_id), guild.get_member(loser_id)
-        winner_new_data, loser_new_data = await self.player_service.get_player_by_id(winner_id), await self.player_service.get_player_by_id(loser_id)
-        
-        card_channel = guild.get_channel(player_card_channel_id)
-        if card_channel:
-            if winner_new_data and (msg_id := winner_new_data.get('player_card_message_id')) and (msg := await self.safe_fetch_message(card_channel, msg_id)):
-                await msg.edit(embed=await create_player_card_embed(winner, winner_new_data))
-            if loser_new_data and (msg_id := loser_new_data.get('player_card_message_id')) and (msg := await self.safe_fetch_message(card_channel, msg_id)):
-                await msg.edit(embed=await create_player_card_embed(loser, loser_new_data))
-        
-        history_channel = guild.get_channel(duel_history_channel_id)
-        if history_channel:
-            history_embed = await create_duel_result_embed(winner, loser, updated_duel, winner_new_data['individual_elo_points'], loser_new_data['individual_elo_points'])
-            await history_channel.send(embed=history_embed)
-            
-        description = f"**Vencedor:** {winner.mention}\n**Perdedor:** {loser.mention}\n\n**{winner.display_name}** ganhou **{final_winner_points_gain}** pontos de ELO!"
-        if winner_result.get("bonus", 0) > 0:
-            description += f" (incluindo **+{winner_result['bonus']}** de bônus por sequência de vitórias!)"
-        result_embed = discord.Embed(title=f"🏆 Duelo Finalizado!", description=description, color=discord.Color.green())
-        
-        channel_to_clean = duel_channel or interaction.channel
+        recorded = await self._record_result(duel, winner_id, loser_id, current_message=interaction.message)
+        if not recorded:
+            return await interaction.followup.send("❌ Este duelo já foi finalizado.", ephemeral=True)
+        result_embed = self._result_embed(*recorded)
         
         if interaction.response.is_done():
             await interaction.followup.send(embed=result_embed)
@@ -245,23 +355,192 @@ class DuelCog(commands.Cog):
             await interaction.response.send_message(embed=result_embed)
         
         await interaction.message.edit(view=None)
-        await channel_to_clean.send("Esta categoria e seus canais serão deletados em 30 segundos...")
-        await asyncio.sleep(30)
+        await self._schedule_arena_cleanup(duel, duel_channel or interaction.channel)
+
+    async def _record_result(self, duel: Dict[str, Any], winner_id: int, loser_id: int,
+                             current_message: Optional[discord.Message] = None) -> Optional[tuple]:
+        """
+        Grava o resultado do duelo e avisa o resto do bot (ranking, cards e histórico).
+        Retorna (resultado, vencedor, perdedor), ou None se o duelo já tinha sido finalizado.
+        """
+        # Pontos, status do duelo e histórico são gravados em uma única transação
+        result = await self.duel_service.finalize_duel(
+            duel['_id'], winner_id, loser_id, self.player_service, self.history_service,
+            expected_status=[duel['status']]
+        )
+        if not result:
+            return None
+        updated_duel = result['duel']
+        self.active_duels.track(updated_duel)
+        # Avisa os outros cogs (ex.: ranking) com os documentos já atualizados
+        self.bot.dispatch("duel_finalized", result)
+        if duel['status'] == 'disputed':
+            await self.close_dispute_panel(duel['_id'], current_message)
+        winner_new_data, loser_new_data = result['winner'], result['loser']
         
-        if category := channel_to_clean.category:
+        guild = self.bot.get_guild(self.settings.server_id)
+        winner, loser = await asyncio.gather(resolve_member(guild, winner_id), resolve_member(guild, loser_id))
+        
+        # Os cards são atualizados em lote pelo RegistrationCog (vários duelos seguidos viram uma edição)
+        self.bot.dispatch("player_updated", winner_id)
+        self.bot.dispatch("player_updated", loser_id)
+        
+        history_channel = self.bot.guild_resources.channel(self.settings.duel_history_channel_id)
+        if history_channel:
+            history_embed = await create_duel_result_embed(winner, loser, updated_duel, winner_new_data['individual_elo_points'], loser_new_data['individual_elo_points'])
+            if self.history_digest:
+                await self.history_digest.add(history_embed)
+            else:
+                await self.bot.rest_scheduler.submit(PRIORITY_CONTENT, channel_route(history_channel), lambda: history_channel.send(embed=history_embed))
+        return result, winner, loser
+
+    @staticmethod
+    def _result_embed(result: Dict[str, Any], winner: discord.Member, loser: discord.Member) -> discord.Embed:
+        description = f"**Vencedor:** {winner.mention}\n**Perdedor:** {loser.mention}\n\n**{winner.display_name}** ganhou **{result['winner_points']}** pontos de ELO!"
+        if result['bonus'] > 0:
+            description += f" (incluindo **+{result['bonus']}** de bônus por sequência de vitórias!)"
+        return discord.Embed(title=f"🏆 Duelo Finalizado!", description=description, color=discord.Color.green())
+
+    async def _schedule_arena_cleanup(self, duel: Dict[str, Any], channel_to_clean: discord.TextChannel):
+        await channel_to_clean.send(f"Esta categoria e seus canais serão encerrados em {ARENA_CLEANUP_DELAY_SECONDS} segundos...")
+        # A limpeza fica agendada no banco: a interação termina agora e um reinício não deixa a arena órfã
+        category = channel_to_clean.category
+        await self.scheduler.schedule(
+            "duel_cleanup", ARENA_CLEANUP_DELAY_SECONDS,
+            {"channel_id": channel_to_clean.id, "category_id": category.id if category else None},
+            key=f"duel_cleanup:{duel['_id']}"
+        )
+
+    async def close_dispute_panel(self, duel_id: Any, current_message: Optional[discord.Message] = None):
+        """Remove os botões do painel de disputa de um duelo resolvido e esquece a âncora."""
+        name = f"dispute_panel:{duel_id}"
+        anchor = await self.anchors.get(name)
+        if not anchor:
+            return
+        channel_id, message_id = anchor
+        # O painel em que a moderação clicou já é editado pelo finalize
+        if (channel := self.bot.get_channel(channel_id)) and (not current_message or current_message.id != message_id):
+            try:
+                await channel.get_partial_message(message_id).edit(view=None)
+            except (discord.NotFound, discord.Forbidden):
+                pass
+        await self.anchors.forget(name)
+
+    async def expire_challenge(self, payload: Dict[str, Any]):
+        """Cancela um desafio que não foi respondido dentro do prazo."""
+        async with self.duel_lock(payload['duel_id']):
+            duel = await self.update_duel(payload['duel_id'], {"status": "cancelled"}, expected_status="pending")
+        if not duel:
+            return
+        logger.info(f"Desafio {duel['_id']} expirou sem resposta.")
+        if challenger := await resolve_member(self.bot.get_guild(self.settings.server_id), duel['challenger_id']):
+            try:
+                await self.bot.rest_scheduler.submit(PRIORITY_CLEANUP, "dm", lambda: challenger.send("⌛ Seu desafio de duelo expirou sem resposta."))
+            except discord.HTTPException:
+                pass
+
+    async def expire_screenshot(self, payload: Dict[str, Any]):
+        """Devolve o duelo para 'em andamento' quando o vencedor não envia o screenshot a tempo."""
+        async with self.duel_lock(payload['duel_id']):
+            duel = self.active_duels.get(payload['duel_id'])
+            updated_duel = await self.update_duel(
+                payload['duel_id'], {"status": "in_progress", "reported_winner_id": None, "prompt_message_id": None}, expected_status="awaiting_screenshot"
+            )
+        if not duel or not updated_duel:
+            return
+        logger.info(f"Prazo do screenshot do duelo {duel['_id']} esgotado; resultado reaberto.")
+        channel = self.bot.get_channel(duel['channel_id'])
+        if not channel:
+            return
+        async def restore_panel():
+            if panel_message_id := duel.get('panel_message_id'):
+                await channel.get_partial_message(panel_message_id).edit(view=DuelPanelView(updated_duel))
+            if prompt_message_id := duel.get('prompt_message_id'):
+                await channel.get_partial_message(prompt_message_id).delete()
+            await channel.send("⌛ O prazo para enviar o screenshot acabou. O resultado pode ser reportado novamente pelo painel.")
+        try:
+            await self.bot.rest_scheduler.submit(PRIORITY_DUEL_PANEL, channel_route(channel), restore_panel)
+        except (discord.NotFound, discord.Forbidden) as e:
+            logger.error(f"Não foi possível restaurar o painel do duelo {duel['_id']}: {e}")
+
+    async def expire_confirmation(self, payload: Dict[str, Any]):
+        """Confirma o resultado reportado quando o oponente não confirma nem disputa dentro do prazo."""
+        async with self.duel_lock(payload['duel_id']):
+            duel = self.active_duels.get(payload['duel_id'])
+            if not duel or duel['status'] != "awaiting_confirmation":
+                return
+            loser_id = duel['opponent_id'] if duel['reported_winner_id'] == duel['challenger_id'] else duel['challenger_id']
+            recorded = await self._record_result(duel, duel['reported_winner_id'], loser_id)
+        if not recorded:
+            return
+        logger.info(f"Resultado do duelo {duel['_id']} confirmado automaticamente após o prazo.")
+        channel = self.bot.get_channel(duel['channel_id'])
+        if not channel:
+            return
+        result_embed = self._result_embed(*recorded)
+        result_embed.set_footer(text="Resultado confirmado automaticamente: o oponente não respondeu a tempo.")
+        async def close_panel():
+            if panel_message_id := duel.get('panel_message_id'):
+                await channel.get_partial_message(panel_message_id).edit(view=None)
+            await channel.send(embed=result_embed)
+        try:
+            await self.bot.rest_scheduler.submit(PRIORITY_DUEL_PANEL, channel_route(channel), close_panel)
+        except (discord.NotFound, discord.Forbidden) as e:
+            logger.error(f"Não foi possível atualizar o painel do duelo {duel['_id']}: {e}")
+        await self._schedule_arena_cleanup(duel, channel)
+
+    async def cleanup_duel_channels(self, payload: Dict[str, Any]):
+        """Devolve a arena de um duelo encerrado ao pool ou apaga seus canais."""
+        if self.active_duels.get_for_channel(payload['channel_id']):
+            return # A arena já foi entregue a outro duelo (ex.: recuperada e reciclada na inicialização)
+        category = self.bot.get_channel(payload['category_id']) if payload.get('category_id') else None
+        if category and self.arena_pool.owns(category.id):
+            # Arena do pool: é limpa e escondida para o próximo duelo, em vez de deletada
+            await self.arena_pool.release(category.id)
+        elif category and self.arena_pool.is_idle(category.id):
+            return # Arena recuperada na inicialização: já foi limpa e escondida
+        elif category:
+            # Exclusões são a classe de menor prioridade: não atrasam painéis nem respostas
             for channel in category.channels:
-                try: await channel.delete(reason="Duelo finalizado.")
+                try: await self.bot.rest_scheduler.submit(PRIORITY_CLEANUP, "guild:channels", lambda: channel.delete(reason="Duelo finalizado."))
                 except Exception as e: logger.error(f"Não foi possível deletar o canal {channel.name}: {e}")
-            try: await category.delete(reason="Duelo finalizado.")
+            try: await self.bot.rest_scheduler.submit(PRIORITY_CLEANUP, "guild:channels", lambda: category.delete(reason="Duelo finalizado."))
             except Exception as e: logger.error(f"Não foi possível deletar a categoria {category.name}: {e}")
-        else:
-             await channel_to_clean.delete(reason="Duelo finalizado.")
-        
-    async def safe_fetch_message(self, channel: discord.TextChannel, message_id: int):
-        try:
-            return await channel.fetch_message(message_id)
-        except (discord.NotFound, discord.Forbidden):
-            return None
+        elif channel := self.bot.get_channel(payload['channel_id']):
+            await self.bot.rest_scheduler.submit(PRIORITY_CLEANUP, "guild:channels", lambda: channel.delete(reason="Duelo finalizado."))
+
+    @commands.command(name="arenas")
+    @commands.is_owner()
+    async def arena_stats(self, ctx: commands.Context):
+        """Mostra o estado do pool de arenas de duelo (apenas para o dono do bot)."""
+        stats = self.arena_pool.stats()
+        await ctx.send(
+            f"🏟️ **Pool de arenas:** `{stats['idle']}` ociosas | `{stats['in_use']}` em uso\n"
+            f"Reaproveitadas: `{stats['hits']}` | Criadas na hora: `{stats['misses']}` | Taxa de acerto: `{stats['hit_rate']:.1%}`\n"
+            f"Aceite → painel: média `{stats['avg_accept_seconds']:.2f}s` | p95 `{stats['p95_accept_seconds']:.2f}s`"
+        )
+
+    @commands.command(name="jobs")
+    @commands.is_owner()
+    async def job_stats(self, ctx: commands.Context):
+        """Mostra as métricas do agendador de trabalhos (apenas para o dono do bot)."""
+        stats = self.scheduler.stats()
+        await ctx.send(
+            f"⏱️ **Agendador:** `{stats['completed']}` concluídos | `{stats['failed']}` falhos | `{stats['running']}` em execução\n"
+            f"Atraso médio após o vencimento: `{stats['avg_lateness_seconds']:.2f}s`"
+        )
+
+    @commands.command(name="digest")
+    @commands.is_owner()
+    async def digest_stats(self, ctx: commands.Context):
+        """Mostra o estado do modo resumo do canal de histórico (apenas para o dono do bot)."""
+        if not self.history_digest:
+            return await ctx.send("O modo resumo do histórico está desligado (HISTORY_DIGEST_MODE).")
+        stats = self.history_digest.stats()
+        await ctx.send(
+            f"🗞️ **Resumo do histórico:** `{stats['buffered']}` no buffer | `{stats['added']}` recebidos\n"
+            f"Mensagens enviadas: `{stats['messages_sent']}` com `{stats['embeds_sent']}` resultados | Falhas: `{stats['failed_flushes']}` | Descartados: `{stats['dead_lettered']}`"
+        )
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(DuelCog(bot))
\ No newline at end of file
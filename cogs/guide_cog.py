@@ -1,20 +1,18 @@
 import discord
 from discord.ext import commands
+import asyncio
 import logging
-import os
 
 # Importa os mapas de ELO para montar a tabela de progressão
 from database.models import ELO_TIERS_MAP, ELO_EMOJI_MAP
+from database.bot_state_service import BotStateService
+from database.connection import get_db
+from utils.anchor_messages import AnchorMessages
+from utils.rest_scheduler import PRIORITY_CONTENT, channel_route
+from utils.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
-# --- Configuração ---
-try:
-    GUIDE_CHANNEL_ID = int(os.getenv('GUIDE_CHANNEL_ID'))
-except (TypeError, ValueError):
-    logger.critical("ERRO CRÍTICO: GUIDE_CHANNEL_ID não está configurado ou é inválido no .env!")
-    GUIDE_CHANNEL_ID = 0
-
 class GuideCog(commands.Cog):
     """
     Este Cog é responsável por postar e manter uma mensagem guia
@@ -22,10 +20,18 @@ class GuideCog(commands.Cog):
     """
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Agenda a tarefa de postagem para rodar quando o bot iniciar
-        self.bot.loop.create_task(self.post_guide_on_startup())
+        self.post_task: asyncio.Task | None = None
+        self.anchors = AnchorMessages(bot, BotStateService(get_db().bot_state))
         logger.info("Cog do Guia carregado.")
 
+    async def start_background_tasks(self):
+        """Chamado pelo bot após o carregamento dos cogs: agenda a postagem do guia."""
+        self.post_task = asyncio.create_task(self.post_guide_on_startup())
+
+    def cog_unload(self):
+        if self.post_task:
+            self.post_task.cancel()
+
     def _create_guide_embed(self) -> discord.Embed:
         """Cria e retorna o embed com o guia completo do sistema de duelos e ranking."""
         
@@ -105,31 +111,31 @@ class GuideCog(commands.Cog):
         """Verifica se o guia já existe no canal e o posta ou edita se necessário."""
         await self.bot.wait_until_ready()
         
-        if GUIDE_CHANNEL_ID == 0:
+        channel_id = get_settings().guide_channel_id
+        if channel_id == 0:
             logger.warning("GUIDE_CHANNEL_ID não definido no .env. O guia não será postado.")
             return
             
-        channel = self.bot.get_channel(GUIDE_CHANNEL_ID)
+        channel = self.bot.guild_resources.channel(channel_id)
         if not channel:
-            logger.error(f"Não foi possível encontrar o canal do guia com o ID {GUIDE_CHANNEL_ID}.")
+            logger.error(f"Não foi possível encontrar o canal do guia com o ID {channel_id}.")
             return
 
         logger.info(f"Verificando a existência do guia no canal '{channel.name}'...")
         
         guide_embed = self._create_guide_embed()
         
-        # Procura por uma mensagem do bot que já seja o guia
-        async for message in channel.history(limit=10):
-            if message.author == self.bot.user and message.embeds and message.embeds[0].title == guide_embed.title:
-                # Se encontrar, edita a mensagem para garantir que está sempre atualizada
-                await message.edit(embed=guide_embed)
-                logger.info("Guia já existe e foi atualizado no canal.")
-                return
-
-        # Se não encontrou, posta um novo
-        logger.info("Guia não encontrado. Postando um novo...")
-        await channel.send(embed=guide_embed)
-        logger.info(f"Guia postado com sucesso no canal '{channel.name}'.")
+        # Edita o guia registrado para garantir que está sempre atualizado, ou posta um novo
+        _, posted = await self.bot.rest_scheduler.submit(
+            PRIORITY_CONTENT, channel_route(channel),
+            lambda: self.anchors.edit_or_post(
+                "guide", channel, match=lambda message: bool(message.embeds) and message.embeds[0].title == guide_embed.title, embed=guide_embed
+            )
+        )
+        if posted:
+            logger.info(f"Guia postado com sucesso no canal '{channel.name}'.")
+        else:
+            logger.info("Guia já existe e foi atualizado no canal.")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(GuideCog(bot))
\ No newline at end of file
@@ -2,12 +2,16 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
+import time
 from typing import Optional
 
 # Importa os componentes necessários
 from database.player_service import PlayerService
+from database.history_service import MatchHistoryService
 from database.connection import get_db
+from ui.history_ui import MatchHistoryView
 from utils.embeds import create_profile_embed
+from utils.leaderboard import get_rank_position
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +20,7 @@ class ProfileCog(commands.Cog):
         self.bot = bot
         db = get_db()
         self.player_service = PlayerService(db.players)
+        self.history_service = MatchHistoryService(db.duel_history)
         logger.info("Cog de Perfil carregado.")
 
     @app_commands.command(name="perfil", description="Exibe o perfil de um jogador da Arena.")
@@ -35,10 +40,33 @@ class ProfileCog(commands.Cog):
             return await interaction.followup.send(f"❌ O usuário **{target_member.display_name}** não possui um registro na Arena.", ephemeral=True)
 
         # Cria o embed do perfil usando nossa nova função
-        profile_embed = await create_profile_embed(target_member, player_data)
+        profile_embed = await create_profile_embed(target_member, player_data, get_rank_position(self.bot, target_member.id))
         
         await interaction.followup.send(embed=profile_embed)
 
+    @app_commands.command(name="historico", description="Exibe o histórico de duelos de um jogador da Arena.")
+    @app_commands.describe(usuario="O usuário do qual você quer ver o histórico (deixe em branco para ver o seu).")
+    async def history(self, interaction: discord.Interaction, usuario: Optional[discord.Member] = None):
+        """Exibe o histórico de duelos paginado do autor da interação ou do membro mencionado."""
+        target_member = usuario or interaction.user
+        
+        await interaction.response.defer()
+        
+        view = MatchHistoryView(self.history_service, target_member, author_id=interaction.user.id)
+        history_embed = await view.load_page()
+        await interaction.followup.send(embed=history_embed, view=view)
+
+
+    @commands.command(name="backfill_stats")
+    @commands.is_owner()
+    async def backfill_stats(self, ctx: commands.Context):
+        """Recalcula os contadores de vitórias/derrotas de todos os jogadores a partir do histórico (apenas para o dono do bot)."""
+        await ctx.send("⏳ Recalculando estatísticas dos jogadores a partir do histórico...")
+        started = time.perf_counter()
+        updated = await self.player_service.backfill_match_counters(self.history_service)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Estatísticas de {updated} jogadores recalculadas em {elapsed:.2f}s.")
+        await ctx.send(f"✅ Estatísticas de {updated} jogadores recalculadas em {elapsed:.2f}s.")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(ProfileCog(bot))
\ No newline at end of file
@@ -1,51 +1,116 @@
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 import logging
-import os
+import time
+import asyncio
 
 # Importa os módulos necessários
 from database.player_service import PlayerService
+from database.bot_state_service import BotStateService
 from database.connection import get_db
 from database.models import ELO_EMOJI_MAP
+from utils.leaderboard import LeaderboardIndex, LEADERBOARD_FIELDS
+from ui.ranking_ui import RankingPageView
+from utils.anchor_messages import AnchorMessages
+from utils.rest_scheduler import PRIORITY_CONTENT, channel_route
+from utils.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
-# Carrega a configuração do canal
-try:
-    RANKING_CHANNEL_ID = int(os.getenv('RANKING_CHANNEL_ID'))
-except (TypeError, ValueError):
-    logger.critical("ERRO CRÍTICO: RANKING_CHANNEL_ID não está configurado ou é inválido no .env!")
-    RANKING_CHANNEL_ID = 0
+# Quantidade de jogadores exibidos e intervalo mínimo entre edições da mensagem do ranking
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MIN_EDIT_INTERVAL = 30
+RANKING_PAGE_SIZE = 10
+RANKING_EMBED_TITLE = "🏆 Placar de Líderes da Arena 🏆"
 
 class RankingCog(commands.Cog):
     """
     Este Cog gerencia a postagem e atualização automática do placar de líderes.
+    O placar é mantido em memória e atualizado a cada duelo finalizado; a mensagem
+    só é editada quando o topo visível muda, respeitando um intervalo mínimo entre edições.
     """
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         db = get_db()
         self.player_service = PlayerService(db.players)
-        self.ranking_message_id = None # Armazenará o ID da mensagem do ranking
-        
-        # Inicia a tarefa em loop para rodar a cada 24 horas
+        # A mensagem do ranking é localizada pelo ID salvo no banco, inclusive após reinícios
+        self.anchors = AnchorMessages(bot, BotStateService(db.bot_state))
+        self.leaderboard = LeaderboardIndex()
+        self.published_signature = None
+        self.last_edit_at = 0.0
+        self.refresh_task: asyncio.Task | None = None
+        logger.info("Cog de Ranking carregado.")
+
+    async def cog_load(self):
+        """Carrega o placar em memória a partir do banco."""
+        await self.reload_leaderboard()
+
+    async def start_background_tasks(self):
+        """Chamado pelo bot após o carregamento dos cogs: inicia o loop que recarrega o placar a cada 24 horas."""
         self.update_leaderboard.start()
-        logger.info("Cog de Ranking carregado e tarefa diária iniciada.")
 
     def cog_unload(self):
         """Garante que a tarefa seja cancelada se o cog for descarregado."""
         self.update_leaderboard.cancel()
+        if self.refresh_task:
+            self.refresh_task.cancel()
+
+    async def reload_leaderboard(self):
+        """Recarrega o placar em memória com todos os jogadores registrados."""
+        players = [player async for player in self.player_service.iter_registered_players(LEADERBOARD_FIELDS)]
+        self.leaderboard.load(players)
+        logger.info(f"Placar em memória carregado com {len(self.leaderboard)} jogadores.")
+
+    @commands.Cog.listener()
+    async def on_duel_finalized(self, result: dict):
+        """Atualiza o placar com os documentos já gravados pelo finalize do duelo."""
+        for player in (result['winner'], result['loser']):
+            if player.get('is_registered'):
+                self.leaderboard.upsert(player)
+        self.schedule_refresh()
+
+    @commands.Cog.listener()
+    async def on_player_registered(self, player: dict):
+        """Inclui no placar um jogador que acabou de concluir o registro."""
+        self.leaderboard.upsert(player)
+        self.schedule_refresh()
+
+    def schedule_refresh(self):
+        """Agenda a edição do ranking se o topo visível mudou, agrupando atualizações próximas."""
+        if self.leaderboard.signature(LEADERBOARD_SIZE) == self.published_signature:
+            return
+        if self.refresh_task and not self.refresh_task.done():
+            return # Já existe uma edição agendada; ela usará o estado mais recente
+        self.refresh_task = asyncio.create_task(self._debounced_refresh())
+
+    async def _debounced_refresh(self):
+        delay = self.last_edit_at + LEADERBOARD_MIN_EDIT_INTERVAL - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.leaderboard.signature(LEADERBOARD_SIZE) == self.published_signature:
+            return
+        try:
+            await self.publish_leaderboard()
+        except Exception as e:
+            logger.error(f"Falha ao atualizar o placar de líderes: {e}")
 
     @tasks.loop(hours=24)
     async def update_leaderboard(self):
-        """A tarefa que busca os dados e atualiza a mensagem do ranking."""
+        """Tarefa de segurança: recarrega o placar do banco e republica a mensagem do ranking."""
         logger.info("Iniciando atualização diária do placar de líderes...")
-        
-        channel = self.bot.get_channel(RANKING_CHANNEL_ID)
+        await self.reload_leaderboard()
+        await self.publish_leaderboard()
+
+    async def publish_leaderboard(self):
+        """Edita (ou posta) a mensagem do ranking com o topo atual do placar em memória."""
+        channel_id = get_settings().ranking_channel_id
+        channel = self.bot.guild_resources.channel(channel_id)
         if not channel:
-            logger.error(f"Canal de ranking com ID {RANKING_CHANNEL_ID} não encontrado.")
+            logger.error(f"Canal de ranking com ID {channel_id} não encontrado.")
             return
 
-        top_players = await self.player_service.get_leaderboard_players(limit=10)
+        top_players = self.leaderboard.top(LEADERBOARD_SIZE)
 
         if not top_players:
             logger.info("Nenhum jogador registrado encontrado para o ranking.")
@@ -53,39 +118,79 @@ class RankingCog(commands.Cog):
 
         # Monta o embed com os dados mais recentes
         embed = self._create_leaderboard_embed(top_players)
+        signature = self.leaderboard.signature(LEADERBOARD_SIZE)
 
-        # Lógica para editar a mensagem antiga ou postar uma nova
-        ranking_message = await self.get_ranking_message(channel)
-        
-        if ranking_message:
-            try:
-                await ranking_message.edit(embed=embed)
-                logger.info("Placar de líderes atualizado com sucesso (mensagem editada).")
-            except discord.NotFound:
-                logger.warning("Mensagem de ranking anterior não encontrada. Postando uma nova.")
-                new_message = await channel.send(embed=embed)
-                self.ranking_message_id = new_message.id
-        else:
-            new_message = await channel.send(embed=embed)
-            self.ranking_message_id = new_message.id
+        # Edita a mensagem registrada ou posta uma nova (pela fila de escritas, atrás das respostas aos jogadores)
+        _, posted = await self.bot.rest_scheduler.submit(
+            PRIORITY_CONTENT, channel_route(channel),
+            lambda: self.anchors.edit_or_post("ranking", channel, match=self._is_ranking_message, embed=embed)
+        )
+        # Só conta como publicado depois que a edição deu certo: se ela falhar, o próximo refresh tenta de novo
+        self.published_signature = signature
+        self.last_edit_at = time.monotonic()
+        if posted:
             logger.info("Placar de líderes postado com sucesso (nova mensagem).")
+        else:
+            logger.info("Placar de líderes atualizado com sucesso (mensagem editada).")
 
     @update_leaderboard.before_loop
     async def before_update_leaderboard(self):
         """Espera o bot estar pronto antes de iniciar o loop."""
         await self.bot.wait_until_ready()
 
-    def _create_leaderboard_embed(self, top_players) -> discord.Embed:
+    @app_commands.command(name="ranking", description="Exibe o ranking completo da Arena, página por página.")
+    async def ranking(self, interaction: discord.Interaction):
+        """Mostra a primeira página do ranking com botões de navegação."""
+        await interaction.response.defer(ephemeral=True)
+        embed, view = await self.build_ranking_page(page=1)
+        await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+
+    @commands.Cog.listener("on_interaction")
+    async def on_ranking_interaction(self, interaction: discord.Interaction):
+        """Trata os botões de navegação do /ranking a partir do cursor guardado no custom_id."""
+        if interaction.type != discord.InteractionType.component or not interaction.data.get("custom_id"): return
+        custom_id = interaction.data["custom_id"]
+        if not custom_id.startswith("ranking_"): return
+        try:
+            _, direction, page, points, player_id = custom_id.split("_")
+            page, cursor = int(page), (int(points), int(player_id))
+        except ValueError:
+            return logger.error(f"custom_id malformado recebido: {custom_id}")
+
+        if direction == "next":
+            embed, view = await self.build_ranking_page(page + 1, after=cursor)
+        elif direction == "prev" and page > 1:
+            embed, view = await self.build_ranking_page(page - 1, before=cursor)
+        else:
+            return
+        await interaction.response.edit_message(embed=embed, view=view)
+
+    async def build_ranking_page(self, page: int, after: tuple[int, int] = None, before: tuple[int, int] = None) -> tuple[discord.Embed, RankingPageView]:
+        """Busca uma página do ranking com paginação por chave e monta o embed e os botões."""
+        # Pede um jogador a mais para saber se existe uma página seguinte
+        players = await self.player_service.get_leaderboard_players(limit=RANKING_PAGE_SIZE + 1, after=after, before=before)
+        if before is not None:
+            # Voltando, sempre existe a página seguinte (a que estava aberta)
+            players, has_next = players[-RANKING_PAGE_SIZE:], True
+        else:
+            has_next = len(players) > RANKING_PAGE_SIZE
+            players = players[:RANKING_PAGE_SIZE]
+
+        embed = self._create_leaderboard_embed(players, start_rank=(page - 1) * RANKING_PAGE_SIZE + 1)
+        embed.set_footer(text=f"Página {page}")
+        return embed, RankingPageView(page, players, has_next)
+
+    def _create_leaderboard_embed(self, top_players, start_rank: int = 1) -> discord.Embed:
         """Função auxiliar para criar o embed do ranking."""
         embed = discord.Embed(
-            title="🏆 Placar de Líderes da Arena 🏆",
-            description="Os 10 melhores duelistas do servidor, atualizado diariamente.",
+            title=RANKING_EMBED_TITLE,
+            description=f"Os {LEADERBOARD_SIZE} melhores duelistas do servidor, atualizado a cada duelo.",
             color=discord.Color.gold()
         )
         rank_emojis = {1: "🥇", 2: "🥈", 3: "🥉"}
         leaderboard_lines = []
 
-        for i, player_data in enumerate(top_players, 1):
+        for i, player_data in enumerate(top_players, start_rank):
             user = self.bot.get_user(player_data['_id'])
             user_name = user.display_name if user else player_data.get('username', 'Jogador Desconhecido')
             
@@ -99,26 +204,30 @@ class RankingCog(commands.Cog):
             )
             leaderboard_lines.append(line)
         
-        embed.description = "\n\n".join(leaderboard_lines)
+        embed.description = "\n\n".join(leaderboard_lines) or "Nenhum jogador nesta página."
         embed.set_footer(text=f"Atualizado em: {discord.utils.format_dt(discord.utils.utcnow(), style='f')}")
         return embed
         
-    async def get_ranking_message(self, channel: discord.TextChannel) -> discord.Message | None:
-        """Busca a mensagem do ranking no canal."""
-        # Se já temos o ID em memória, tenta buscá-lo
-        if self.ranking_message_id:
-            try:
-                return await channel.fetch_message(self.ranking_message_id)
-            except (discord.NotFound, discord.Forbidden):
-                pass
-        
-        # Se não, procura por uma mensagem do bot que seja o ranking
-        async for message in channel.history(limit=50):
-            if message.author == self.bot.user and message.embeds:
-                if message.embeds[0].title == "🏆 Placar de Líderes da Arena 🏆":
-                    self.ranking_message_id = message.id
-                    return message
-        return None
+    @staticmethod
+    def _is_ranking_message(message: discord.Message) -> bool:
+        """Reconhece a mensagem do ranking no histórico (usado só para reparar uma âncora ausente)."""
+        return bool(message.embeds) and message.embeds[0].title == RANKING_EMBED_TITLE
+
+    @commands.command(name="retier")
+    @commands.is_owner()
+    async def retier(self, ctx: commands.Context):
+        """Recalcula o elo de todos os jogadores com a tabela de elos atual (apenas para o dono do bot)."""
+        await ctx.send("⏳ Recalculando os elos de todos os jogadores...")
+        stats = await self.player_service.retier_players()
+        logger.info(f"Re-classificação concluída: {stats['changed']}/{stats['scanned']} jogadores alterados em {stats['elapsed']:.2f}s.")
+        if stats['changed']:
+            # O placar em memória ainda tem os elos antigos: recarrega e republica o ranking se o topo mudou
+            await self.reload_leaderboard()
+            self.schedule_refresh()
+        await ctx.send(
+            f"✅ {stats['scanned']} jogadores verificados, {stats['changed']} atualizados "
+            f"em {stats['elapsed']:.2f}s (`{stats['throughput']:.0f}` jogadores/s)."
+        )
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(RankingCog(bot))
\ No newline at end of file
@@ -1,27 +1,25 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
+import asyncio
 import logging
-import os
 import time
-import asyncio
 
 from database.player_service import PlayerService
+from database.dm_queue_service import DMQueueService
 from database.connection import get_db
-from ui.registration_ui import RegistrationView, RegistrationModal
+from ui.registration_ui import RegistrationView, RegistrationModal, ROUTE_ROLE_NAMES
 from ui.player_card_ui import PlayerCardView
+from utils.dm_dispatcher import DMDispatcher
+from utils.card_refresher import PlayerCardRefresher
+from utils.rest_scheduler import PRIORITY_CLEANUP
+from utils.members import forget_member, resolve_member
+from utils.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
-try:
-    MAX_REMINDERS = int(os.getenv('MAX_REMINDERS_BEFORE_KICK', 3))
-    REG_LOG_WEBHOOK_URL = os.getenv('REGISTRATION_LOG_WEBHOOK_URL')
-    SERVER_ID = int(os.getenv('SERVER_ID'))
-except (TypeError, ValueError):
-    logger.critical("Variáveis de ambiente de registro não configuradas!")
-    MAX_REMINDERS = 3
-    REG_LOG_WEBHOOK_URL = None
-    SERVER_ID = 0
+# Atraso da primeira DM para novos membros (dá tempo de lerem as regras antes)
+WELCOME_DM_DELAY = 10
 
 class RegistrationCog(commands.Cog):
     ROLE_COLORS = {
@@ -34,68 +32,96 @@ class RegistrationCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.settings = get_settings()
         db = get_db()
         self.player_service = PlayerService(db.players)
         
-        self.bot.add_view(RegistrationView())
-        self.bot.add_view(PlayerCardView())
-        
+        # Fila persistente de DMs de registro, enviada por workers com limite de taxa
+        self.dm_dispatcher = DMDispatcher(DMQueueService(db.dm_queue), worker_count=self.settings.dm_workers, rate_per_second=self.settings.dm_rate_per_second)
+        self.dm_dispatcher.register_handler("registration_reminder", self.deliver_registration_reminder)
+        self.dm_dispatcher.register_handler("registration_kick", self.deliver_registration_kick)
+        # Cards de jogadores: atualizações agrupadas por jogador, disparadas pelo evento 'player_updated'
+        self.card_refresher = PlayerCardRefresher(bot, self.player_service)
+        self.roles_task: asyncio.Task | None = None
+        logger.info("Cog de Registro Automático carregado.")
+
+    def persistent_views(self) -> list[discord.ui.View]:
+        """Views persistentes registradas pelo bot na inicialização."""
+        return [RegistrationView(), PlayerCardView()]
+
+    async def start_background_tasks(self):
+        """Chamado pelo bot após o carregamento dos cogs: inicia a fila de DMs e as tarefas periódicas."""
+        await self.dm_dispatcher.start()
+        self.card_refresher.start()
         self.kick_unregistered_task.start()
-        self.bot.loop.create_task(self.setup_roles_on_startup())
-        logger.info("Cog de Registro Automático carregado e tarefas iniciadas.")
+        self.roles_task = asyncio.create_task(self.setup_roles_on_startup())
 
     def cog_unload(self):
         self.kick_unregistered_task.cancel()
+        self.dm_dispatcher.stop()
+        self.card_refresher.stop()
+        if self.roles_task:
+            self.roles_task.cancel()
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        if member.bot or member.guild.id != SERVER_ID: return
+        if member.bot or member.guild.id != self.settings.server_id: return
         await self.player_service.get_or_create_player(member)
         logger.info(f"Registro inicial criado para o novo membro: {member.display_name}")
-        await asyncio.sleep(10)
-        await self.send_registration_dm(member)
+        await self.dm_dispatcher.enqueue(member.id, "registration_reminder", delay=WELCOME_DM_DELAY)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        forget_member(payload.guild_id, payload.user.id)
+
+    @commands.Cog.listener()
+    async def on_player_updated(self, player_id: int):
+        """Algo no card do jogador mudou (duelo, registro, botão de atualizar): agenda a atualização do card."""
+        self.card_refresher.request(player_id)
 
     @tasks.loop(hours=24)
     async def kick_unregistered_task(self):
         await self.bot.wait_until_ready()
         logger.info("[TAREFA] Iniciando verificação diária de registros...")
-        if SERVER_ID == 0:
+        if self.settings.server_id == 0:
             return logger.error("[TAREFA] SERVER_ID não configurado.")
-        guild = self.bot.get_guild(SERVER_ID)
+        guild = self.bot.get_guild(self.settings.server_id)
         if not guild: return
         
         logger.info("[TAREFA] Sincronizando membros do servidor com o banco de dados...")
-        for member in guild.members:
-            if not member.bot:
-                await self.player_service.get_or_create_player(member)
-        
-        unregistered_players = await self.player_service.get_unregistered_players()
-        logger.info(f"[TAREFA] Encontrados {len(unregistered_players)} jogadores não registrados para verificar.")
+        started = time.perf_counter()
+        # No modo lean os membros não ficam em memória: a lista é baixada só para esta tarefa
+        all_members = guild.members if guild.chunked else await guild.chunk(cache=False)
+        members = [member for member in all_members if not member.bot]
+        members_by_id = {member.id: member for member in members}
+        sync_stats = await self.player_service.sync_members(members)
+        logger.info(
+            f"[TAREFA] Sincronização concluída: {sync_stats['members']} membros, {sync_stats['inserted']} novos registros, "
+            f"{sync_stats['deleted']} órfãos removidos em {sync_stats['total_seconds']:.2f}s (upserts: {sync_stats['upsert_seconds']:.2f}s)."
+        )
         
-        for player_data in unregistered_players:
-            member = guild.get_member(player_data['_id'])
+        checked, enqueued = 0, 0
+        async for player_data in self.player_service.iter_unregistered_players():
+            checked += 1
+            member = members_by_id.get(player_data['_id'])
             if not member:
-                await self.player_service.delete_player(player_data['_id'])
                 continue
                 
             last_sent = player_data.get('last_reminder_sent_at')
             if not last_sent or (time.time() - last_sent) > 82800:
-                if player_data['registration_reminders_sent'] >= MAX_REMINDERS:
-                    try:
-                        await member.send("Você foi removido do servidor por não completar o registro a tempo.")
-                        await member.kick(reason="Não completou o registro.")
-                        await self.log_to_webhook(f"👢 Membro expulso: **{member.display_name}** (`{member.id}`)")
-                        await self.player_service.delete_player(member.id)
-                    except Exception as e:
-                        logger.error(f"Falha ao expulsar {member.display_name}: {e}")
+                # DMs e expulsões vão para a fila, que respeita o limite de taxa do Discord
+                if player_data.get('registration_reminders_sent', 0) >= self.settings.max_reminders_before_kick:
+                    await self.dm_dispatcher.enqueue(member.id, "registration_kick")
                 else:
-                    await self.send_registration_dm(member)
+                    await self.dm_dispatcher.enqueue(member.id, "registration_reminder")
+                enqueued += 1
+        logger.info(f"[TAREFA] {checked} jogadores não registrados verificados, {enqueued} DMs enfileiradas. Tarefa concluída em {time.perf_counter() - started:.2f}s.")
 
     @app_commands.command(name="editar_registro", description="Edita suas informações de registro na Arena.")
     async def edit_registration(self, interaction: discord.Interaction):
         """Abre o formulário de registro com os dados atuais do usuário para edição."""
         
-        player_data = await self.player_service.get_player_by_id(interaction.user.id)
+        player_data = await self.player_service.get_player_by_id(interaction.user.id, profile="card")
         
         if not player_data or not player_data.get('is_registered'):
             return await interaction.response.send_message(
@@ -106,9 +132,16 @@ class RegistrationCog(commands.Cog):
         # Abre o modal, passando os dados existentes para pré-preencher os campos
         await interaction.response.send_modal(RegistrationModal(existing_data=player_data))
 
-    async def send_registration_dm(self, member: discord.Member):
-        player_data = await self.player_service.get_player_by_id(member.id)
-        if not player_data: return
+    async def _get_guild_member(self, member_id: int) -> discord.Member | None:
+        return await resolve_member(self.bot.get_guild(self.settings.server_id), member_id)
+
+    async def deliver_registration_reminder(self, job: dict):
+        """Handler da fila de DMs: envia o lembrete de registro (as exceções voltam para o dispatcher)."""
+        await self.bot.wait_until_ready()
+        member = await self._get_guild_member(job['user_id'])
+        player_data = await self.player_service.get_player_by_id(job['user_id'], profile="registration")
+        # O membro pode ter saído ou se registrado enquanto a DM estava na fila
+        if not member or not player_data or player_data.get('is_registered'): return
         
         reminders_sent = player_data.get('registration_reminders_sent', 0)
         
@@ -118,7 +151,7 @@ class RegistrationCog(commands.Cog):
             color = discord.Color.blue()
             footer = "O registro é rápido e essencial para a comunidade."
         else:
-            title = f"OPA, CAMPEÃO! CUIDADO COM O GANK! (Aviso {reminders_sent + 1}/{MAX_REMINDERS})"
+            title = f"OPA, CAMPEÃO! CUIDADO COM O GANK! (Aviso {reminders_sent + 1}/{self.settings.max_reminders_before_kick})"
             description = "O Barão tá quase nascendo e você ainda não se registrou pra lutar com a gente! Não dê mole, clique no botão abaixo pra não tomar um gank da administração e ser kickado.\n\nFalta pouco pra virar lenda!"
             color = discord.Color.orange()
             footer = "Manter o registro em dia é a primeira call pra vitória!"
@@ -126,26 +159,66 @@ class RegistrationCog(commands.Cog):
         embed = discord.Embed(title=title, description=description, color=color)
         embed.set_footer(text=footer)
         
+        await self.bot.rest_scheduler.submit(PRIORITY_CLEANUP, "dm", lambda: member.send(embed=embed, view=RegistrationView()))
+        await self.player_service.increment_reminder(member.id)
+        logger.info(f"DM de registro (Lembrete #{reminders_sent + 1}) enviada para {member.display_name}")
+
+    async def deliver_registration_kick(self, job: dict):
+        """Handler da fila de DMs: avisa e expulsa um membro que não completou o registro."""
+        await self.bot.wait_until_ready()
+        member = await self._get_guild_member(job['user_id'])
+        player_data = await self.player_service.get_player_by_id(job['user_id'], profile="registration")
+        if not member or not player_data or player_data.get('is_registered'): return
+        
+        # Numa nova tentativa (ex.: a expulsão falhou com 5xx), o aviso já enviado não é repetido
+        if not job.get('payload', {}).get('dm_sent'):
+            try:
+                await self.bot.rest_scheduler.submit(
+                    PRIORITY_CLEANUP, "dm", lambda: member.send("Você foi removido do servidor por não completar o registro a tempo.")
+                )
+            except discord.Forbidden:
+                pass # A expulsão acontece mesmo sem conseguir avisar por DM
+            await self.dm_dispatcher.update_payload(job, {"dm_sent": True})
         try:
-            await member.send(embed=embed, view=RegistrationView())
-            await self.player_service.increment_reminder(member.id)
-            logger.info(f"DM de registro (Lembrete #{reminders_sent + 1}) enviada para {member.display_name}")
+            await self.bot.rest_scheduler.submit(PRIORITY_CLEANUP, "guild:members", lambda: member.kick(reason="Não completou o registro."))
         except discord.Forbidden:
-            logger.warning(f"Não foi possível enviar DM para {member.name}.")
+            # Não é problema de DM: o bot não tem permissão de expulsar (ou o cargo do membro é mais alto)
+            logger.error(f"Sem permissão para expulsar {member.display_name} ({member.id}). Verifique a permissão 'Expulsar Membros' e a hierarquia de cargos.")
+            return
+        await self.log_to_webhook(f"👢 Membro expulso: **{member.display_name}** (`{member.id}`)")
+        await self.player_service.delete_player(member.id)
+
+    @commands.command(name="dmqueue")
+    @commands.is_owner()
+    async def dm_queue_stats(self, ctx: commands.Context):
+        """Mostra o estado da fila de DMs de registro (apenas para o dono do bot)."""
+        stats = await self.dm_dispatcher.stats()
+        queue = stats['queue']
+        await ctx.send(
+            f"📬 **Fila de DMs:** pendentes `{queue.get('pending', 0)}` | em andamento `{queue.get('processing', 0)}` | falhas `{queue.get('failed', 0)}`\n"
+            f"Enviadas: `{stats['sent']}` (`{stats['per_minute']}`/min) | Novas tentativas: `{stats['retried']}` | Falhas: `{stats['failed']}` | Workers: `{stats['workers']}`"
+        )
+
+    @commands.command(name="cards")
+    @commands.is_owner()
+    async def card_stats(self, ctx: commands.Context):
+        """Mostra as métricas da atualização de cards de jogadores (apenas para o dono do bot)."""
+        stats = self.card_refresher.stats()
+        await ctx.send(
+            f"🪪 **Cards de jogadores:** pedidos `{stats['queued']}` | agrupados `{stats['coalesced']}` | pendentes `{stats['pending']}`\n"
+            f"Editados/enviados: `{stats['sent']}` (recriados `{stats['recreated']}`) | Ignorados: `{stats['skipped']}` | Falhas: `{stats['failed']}`"
+        )
 
     async def setup_roles_on_startup(self):
         await self.bot.wait_until_ready()
-        if SERVER_ID == 0: return
+        if self.settings.server_id == 0: return
         
-        guild = self.bot.get_guild(SERVER_ID)
+        guild = self.bot.get_guild(self.settings.server_id)
         if not guild: return
         
-        existing_roles = {role.name for role in guild.roles}
-        roles_to_create = ["Top", "Jungle", "Mid", "ADC", "Support"]
-        
         logger.info("Verificando a existência dos cargos de rota...")
-        for role_name in roles_to_create:
-            if role_name not in existing_roles:
+        for role_name in ROUTE_ROLE_NAMES:
+            if not self.bot.guild_resources.role(role_name):
                 try:
                     role_color = self.ROLE_COLORS.get(role_name, discord.Color.default())
                     await guild.create_role(name=role_name, colour=role_color, reason="Criação automática de cargo de rota.")
@@ -157,9 +230,9 @@ class RegistrationCog(commands.Cog):
                     logger.error(f"Erro ao criar o cargo '{role_name}': {e}")
 
     async def log_to_webhook(self, message: str):
-        if REG_LOG_WEBHOOK_URL:
+        if self.settings.registration_log_webhook_url:
             try:
-                webhook = discord.Webhook.from_url(REG_LOG_WEBHOOK_URL, client=self.bot)
+                webhook = discord.Webhook.from_url(self.settings.registration_log_webhook_url, client=self.bot)
                 await webhook.send(message)
             except Exception as e:
                 logger.error(f"Falha ao enviar log para webhook: {e}")
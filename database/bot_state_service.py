@@ -0,0 +1,31 @@
+import time
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+class BotStateService:
+    """
+    Estado persistente do próprio bot, na coleção 'bot_state'.
+    Guarda as mensagens-âncora (ranking, guia, painéis de disputa) como documentos
+    com _id "anchor:<nome>", para que sobrevivam a reinícios.
+    """
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    @staticmethod
+    def _anchor_id(name: str) -> str:
+        return f"anchor:{name}"
+
+    async def get_anchor(self, name: str) -> Optional[Dict[str, Any]]:
+        """Retorna {channel_id, message_id} da âncora, ou None se ela não foi registrada."""
+        return await self.collection.find_one({"_id": self._anchor_id(name)}, {"channel_id": 1, "message_id": 1})
+
+    async def set_anchor(self, name: str, channel_id: int, message_id: int):
+        await self.collection.update_one(
+            {"_id": self._anchor_id(name)},
+            {"$set": {"channel_id": channel_id, "message_id": message_id, "updated_at": time.time()}},
+            upsert=True
+        )
+
+    async def delete_anchor(self, name: str):
+        await self.collection.delete_one({"_id": self._anchor_id(name)})
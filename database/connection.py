@@ -2,6 +2,9 @@ from motor.motor_asyncio import AsyncIOMotorClient as MongoClient
 from pymongo.errors import ConnectionFailure
 import logging
 
+from .migrations import run_migrations
+from .monitoring import get_command_monitor
+
 logger = logging.getLogger(__name__)
 client: MongoClient = None
 db = None
@@ -10,13 +13,17 @@ async def connect_db(uri: str, db_name: str = 'Arena'):
     global client, db
     if client is None:
         try:
-            client = MongoClient(uri)
+            # O monitor de comandos mede a latência de cada operação por coleção
+            client = MongoClient(uri, event_listeners=[get_command_monitor()])
             await client.admin.command('ping')
             db = client[db_name]
             logger.info(f'Conectado ao banco de dados: {db_name}')
         except ConnectionFailure as e:
             logger.error(f'Erro ao conectar ao MONGODB: {e}')
             raise
+        # Garante que índices e migrações estejam aplicados antes dos cogs usarem o banco
+        schema_version = await run_migrations(db)
+        logger.info(f'Esquema do banco na versão {schema_version}.')
     return db
     
 async def close_db():
@@ -0,0 +1,88 @@
+import time
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+
+class DMQueueService:
+    """
+    Fila persistente de mensagens diretas a enviar, na coleção 'dm_queue'.
+    Os trabalhos sobrevivem a reinícios: os que estavam em andamento voltam para a fila na inicialização.
+    """
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    async def enqueue(self, user_id: int, kind: str, delay: float = 0, payload: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Enfileira uma DM. Se o usuário já tiver um trabalho do mesmo tipo pendente, nada é duplicado.
+        Retorna True se um novo trabalho foi criado.
+        """
+        now = time.time()
+        result = await self.collection.update_one(
+            {"user_id": user_id, "kind": kind, "status": {"$in": ["pending", "processing"]}},
+            {"$setOnInsert": {
+                "status": "pending",
+                "payload": payload or {},
+                "attempts": 0,
+                "last_error": None,
+                "created_at": now,
+                "next_attempt_at": now + delay
+            }},
+            upsert=True
+        )
+        return result.upserted_id is not None
+
+    async def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Reserva o próximo trabalho vencido, marcando-o como em andamento."""
+        return await self.collection.find_one_and_update(
+            {"status": "pending", "next_attempt_at": {"$lte": time.time()}},
+            {"$set": {"status": "processing", "claimed_at": time.time()}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def complete(self, job_id: Any):
+        """Remove um trabalho concluído da fila."""
+        await self.collection.delete_one({"_id": job_id})
+
+    async def update_payload(self, job_id: Any, updates: Dict[str, Any]):
+        """Grava o progresso de um trabalho no seu payload, para que uma nova tentativa não repita etapas já feitas."""
+        await self.collection.update_one({"_id": job_id}, {"$set": {f"payload.{key}": value for key, value in updates.items()}})
+
+    async def retry(self, job_id: Any, delay: float, error: str):
+        """Devolve um trabalho para a fila, para nova tentativa após `delay` segundos."""
+        await self.collection.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "pending", "next_attempt_at": time.time() + delay, "last_error": error}, "$inc": {"attempts": 1}}
+        )
+
+    async def fail(self, job_id: Any, error: str):
+        """
+        Marca um trabalho como falho definitivamente (mantido para consulta).
+        Só a falha mais recente de cada usuário/tipo é mantida, já que a tarefa diária volta a
+        enfileirar quem tem as DMs fechadas.
+        """
+        job = await self.collection.find_one_and_update(
+            {"_id": job_id},
+            {"$set": {"status": "failed", "last_error": error, "failed_at": time.time()}, "$inc": {"attempts": 1}},
+            projection={"user_id": 1, "kind": 1}
+        )
+        if job:
+            await self.collection.delete_many(
+                {"user_id": job["user_id"], "kind": job["kind"], "status": "failed", "_id": {"$ne": job_id}}
+            )
+
+    async def requeue_in_progress(self) -> int:
+        """Devolve para a fila os trabalhos que estavam em andamento quando o bot parou."""
+        result = await self.collection.update_many({"status": "processing"}, {"$set": {"status": "pending"}})
+        return result.modified_count
+
+    async def next_due_at(self) -> Optional[float]:
+        """Horário do próximo trabalho pendente, ou None se a fila estiver vazia."""
+        job = await self.collection.find_one({"status": "pending"}, {"next_attempt_at": 1}, sort=[("next_attempt_at", 1)])
+        return job["next_attempt_at"] if job else None
+
+    async def count_by_status(self) -> Dict[str, int]:
+        """Quantidade de trabalhos por status."""
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {row["_id"]: row["count"] async for row in self.collection.aggregate(pipeline)}
@@ -1,12 +1,26 @@
 import time
-from typing import Optional, Any
+import logging
+from typing import Optional, Any, Dict, List, Sequence, Union
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
 from bson import ObjectId # Importa o ObjectId do PyMongo
 from .models import DuelMatchData
+from .records import DuelRecord
+from .player_service import PlayerService
+from .history_service import MatchHistoryService
+from utils.elo_calculator import calculate_elo, get_k_factor
+from utils.duel_registry import ACTIVE_DUEL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Código de erro do MongoDB quando transações não são suportadas (servidor standalone)
+ILLEGAL_OPERATION_CODE = 20
 
 class DuelService:
     def __init__(self, collection: AsyncIOMotorCollection):
-        self.collection = collection
+        # Os duelos lidos já chegam como DuelRecord: é o que fica no registro de duelos ativos
+        self.collection = collection.with_options(codec_options=DuelRecord.codec_options(collection.codec_options))
 
     async def create_duel(self, challenger_id: int, opponent_id: int, challenger_elo: int, opponent_elo: int) -> DuelMatchData:
         duel_doc: DuelMatchData = {
@@ -20,11 +34,10 @@ class DuelService:
         result = await self.collection.insert_one(duel_doc)
         return await self.collection.find_one({"_id": result.inserted_id})
 
-    async def get_active_duel_for_player(self, player_id: int) -> Optional[DuelMatchData]:
-        return await self.collection.find_one({
-            "$or": [{"challenger_id": player_id}, {"opponent_id": player_id}],
-            "status": {"$in": ["pending", "in_progress"]}
-        })
+    async def get_active_duels(self) -> List[DuelMatchData]:
+        """Busca todos os duelos que ainda não foram concluídos ou cancelados."""
+        cursor = self.collection.find({"status": {"$in": list(ACTIVE_DUEL_STATUSES)}})
+        return await cursor.to_list(length=None)
 
     async def get_duel_by_id(self, duel_id: str) -> Optional[DuelMatchData]:
         """Busca um duelo pelo seu ID de documento, convertendo a string para ObjectId."""
@@ -36,11 +49,83 @@ class DuelService:
             # Retorna None se o ID for inválido e não puder ser convertido.
             return None
 
-    async def update_duel(self, duel_id: Any, updates: dict) -> Optional[DuelMatchData]:
+    async def update_duel(self, duel_id: Any, updates: dict, expected_status: Optional[Union[str, Sequence[str]]] = None) -> Optional[DuelMatchData]:
+        """
+        Aplica `updates` ao duelo e retorna o documento novo. Com `expected_status`, a atualização
+        é um compare-and-set: só acontece se o duelo ainda estiver em um desses status,
+        e retorna None caso outra transição tenha chegado antes.
+        """
         # Converte o ID aqui também por segurança.
         _id = ObjectId(duel_id) if not isinstance(duel_id, ObjectId) else duel_id
+        query: Dict[str, Any] = {"_id": _id}
+        if expected_status is not None:
+            query["status"] = {"$in": [expected_status] if isinstance(expected_status, str) else list(expected_status)}
         return await self.collection.find_one_and_update(
-            {"_id": _id},
+            query,
             {"$set": updates},
             return_document=True
-        )
\ No newline at end of file
+        )
+
+    async def finalize_duel(self, duel_id: Any, winner_id: int, loser_id: int, player_service: PlayerService, history_service: MatchHistoryService, expected_status: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Finaliza um duelo atomicamente: aplica o ELO dos dois jogadores, marca o duelo como
+        concluído e registra o histórico em uma única transação.
+        Retorna o duelo e os jogadores já atualizados, ou None se o duelo não estava em `expected_status`.
+        """
+        _id = ObjectId(duel_id) if not isinstance(duel_id, ObjectId) else duel_id
+
+        async def apply(session) -> Optional[Dict[str, Any]]:
+            # Lê os dois jogadores de uma vez; dentro da transação, qualquer escrita concorrente
+            # neles gera um conflito e a transação é refeita com os dados novos.
+            cursor = player_service.collection.find({"_id": {"$in": [winner_id, loser_id]}}, session=session)
+            players = {player["_id"]: player async for player in cursor}
+            winner, loser = players.get(winner_id), players.get(loser_id)
+            if not winner or not loser:
+                return None
+
+            winner_elo_before, loser_elo_before = winner['individual_elo_points'], loser['individual_elo_points']
+            winner_points_change, loser_points_change = calculate_elo(
+                winner_elo_before, loser_elo_before,
+                get_k_factor(winner.get('matches_played', 0)), get_k_factor(loser.get('matches_played', 0))
+            )
+
+            results = player_service.build_duel_results(winner, loser, winner_points_change, loser_points_change)
+
+            # Reivindica o duelo antes de aplicar os pontos: se outro finalize já o concluiu, nada é gravado
+            duel = await self.collection.find_one_and_update(
+                {"_id": _id, "status": {"$in": expected_status}},
+                {"$set": {
+                    "status": "completed", "winner_id": winner_id, "loser_id": loser_id,
+                    "points_change": results['winner_points'], "completed_at": time.time()
+                }},
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            if not duel:
+                return None
+
+            await player_service.apply_duel_results(results, session=session)
+            await history_service.record_duel_result(
+                winner_id, loser_id, winner_elo_before, loser_elo_before,
+                results['winner_points'], results['loser_points'], duel_id=_id, session=session
+            )
+            return {
+                "duel": duel, "winner": results['winner'], "loser": results['loser'],
+                "winner_points": results['winner_points'], "loser_points": results['loser_points'], "bonus": results['bonus']
+            }
+
+        client = self.collection.database.client
+        async with await client.start_session() as session:
+            try:
+                result = await session.with_transaction(apply)
+            except OperationFailure as e:
+                if e.code != ILLEGAL_OPERATION_CODE:
+                    raise
+                # Servidor sem suporte a transações: mantém a ordem (duelo reivindicado primeiro)
+                logger.warning("MongoDB sem suporte a transações; finalizando o duelo sem transação.")
+                result = await apply(None)
+
+        # Só depois do commit os documentos atualizados entram no cache
+        if result:
+            player_service.prime_cache([result['winner'], result['loser']])
+        return result
@@ -0,0 +1,45 @@
+import time
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+class HistoryDigestService:
+    """
+    Buffer persistente do modo resumo do canal de histórico, na coleção 'history_digest'.
+    Cada documento é um embed de resultado (embed.to_dict()) ainda não publicado;
+    ele só é apagado depois que a mensagem com o lote foi enviada. Entradas que o Discord
+    recusa repetidamente ganham `dead_at` e ficam guardadas para análise, fora do buffer.
+    """
+    # Filtro das entradas ainda na fila (as descartadas têm dead_at)
+    PENDING_FILTER = {"dead_at": {"$exists": False}}
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    async def add(self, embed: Dict[str, Any]):
+        await self.collection.insert_one({"embed": embed, "created_at": time.time()})
+
+    async def pending(self, limit: int) -> List[Dict[str, Any]]:
+        """Os embeds mais antigos ainda não publicados, em ordem de chegada."""
+        cursor = self.collection.find(self.PENDING_FILTER).sort([("created_at", 1), ("_id", 1)]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def count(self) -> int:
+        return await self.collection.count_documents(self.PENDING_FILTER)
+
+    async def remove(self, entry_ids: List[Any]):
+        await self.collection.delete_many({"_id": {"$in": entry_ids}})
+
+    async def record_failure(self, entry_ids: List[Any], error: str, max_failures: int) -> int:
+        """
+        Conta uma falha de envio para as entradas do lote e descarta (dead_at) as que
+        chegaram a `max_failures`. Retorna quantas foram descartadas.
+        """
+        await self.collection.update_many(
+            {"_id": {"$in": entry_ids}}, {"$inc": {"failures": 1}, "$set": {"last_error": error}}
+        )
+        result = await self.collection.update_many(
+            {"_id": {"$in": entry_ids}, "failures": {"$gte": max_failures}, **self.PENDING_FILTER},
+            {"$set": {"dead_at": time.time()}}
+        )
+        return result.modified_count
@@ -0,0 +1,56 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from .models import MatchHistoryEntry
+
+class MatchHistoryService:
+    """Acesso à coleção de histórico de duelos, indexada por (player_id, timestamp, _id)."""
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    async def record_duel_result(self, winner_id: int, loser_id: int, winner_elo_before: int, loser_elo_before: int, winner_points_change: int, loser_points_change: int, duel_id: Any = None, session=None):
+        """Registra a partida no histórico dos dois jogadores com uma única inserção."""
+        timestamp = time.time()
+        entries: List[MatchHistoryEntry] = [
+            {"player_id": winner_id, "opponent_id": loser_id, "opponent_elo_at_match": loser_elo_before,
+             "points_change": winner_points_change, "duel_id": duel_id, "timestamp": timestamp},
+            {"player_id": loser_id, "opponent_id": winner_id, "opponent_elo_at_match": winner_elo_before,
+             "points_change": loser_points_change, "duel_id": duel_id, "timestamp": timestamp}
+        ]
+        await self.collection.insert_many(entries, ordered=True, session=session)
+
+    async def get_history_page(self, player_id: int, before: Optional[Tuple[float, Any]] = None, limit: int = 10) -> List[MatchHistoryEntry]:
+        """
+        Retorna uma página do histórico, do mais recente para o mais antigo.
+        `before` é o (timestamp, _id) da última partida da página anterior (paginação por chave).
+        O _id desempata partidas com o mesmo timestamp, para que nenhuma fique de fora na virada de página.
+        """
+        query: Dict[str, Any] = {"player_id": player_id}
+        if before is not None:
+            timestamp, entry_id = before
+            query["$or"] = [{"timestamp": {"$lt": timestamp}}, {"timestamp": timestamp, "_id": {"$lt": entry_id}}]
+        cursor = self.collection.find(query).sort([("timestamp", -1), ("_id", -1)]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def count_matches(self, player_id: int) -> int:
+        """Conta quantas partidas um jogador já disputou."""
+        return await self.collection.count_documents({"player_id": player_id})
+
+    async def iter_player_summaries(self):
+        """
+        Percorre o histórico agrupado por jogador, em ordem cronológica.
+        Cada item traz vitórias, total de partidas, a última partida e a lista de variações de pontos.
+        """
+        pipeline = [
+            {"$sort": {"player_id": 1, "timestamp": 1}},
+            {"$group": {
+                "_id": "$player_id",
+                "wins": {"$sum": {"$cond": [{"$gt": ["$points_change", 0]}, 1, 0]}},
+                "matches": {"$sum": 1},
+                "last_match_at": {"$max": "$timestamp"},
+                "changes": {"$push": "$points_change"}
+            }}
+        ]
+        async for summary in self.collection.aggregate(pipeline, allowDiskUse=True):
+            yield summary
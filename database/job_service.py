@@ -0,0 +1,93 @@
+import time
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+class JobService:
+    """
+    Trabalhos agendados persistentes, na coleção 'scheduled_jobs', indexada por (status, run_at).
+    Cada trabalho pode ter uma chave, usada para reagendar ou cancelar (ex.: "challenge_expiry:<duelo>").
+    A chave é única só entre os pendentes: reagendar enquanto a execução anterior ainda roda cria um
+    trabalho novo, sem mexer no documento que está em execução.
+    """
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    async def schedule(self, kind: str, run_at: float, payload: Dict[str, Any], key: Optional[str] = None):
+        """Agenda um trabalho. Com `key`, substitui um trabalho pendente com a mesma chave."""
+        job = {"kind": kind, "run_at": run_at, "payload": payload, "status": "pending", "attempts": 0, "created_at": time.time()}
+        if key is None:
+            await self.collection.insert_one(job)
+        else:
+            try:
+                await self.collection.update_one({"key": key, "status": "pending"}, {"$set": job}, upsert=True)
+            except DuplicateKeyError:
+                # Outro schedule com a mesma chave inseriu o pendente primeiro: substitui o dele
+                await self.collection.update_one({"key": key, "status": "pending"}, {"$set": job})
+
+    async def ensure_scheduled(self, kind: str, run_at: float, payload: Dict[str, Any], key: str) -> bool:
+        """
+        Agenda um trabalho só se ainda não houver um pendente ou em execução com a mesma chave.
+        Retorna True se um trabalho novo foi criado.
+        """
+        job = {"kind": kind, "run_at": run_at, "payload": payload, "status": "pending", "attempts": 0, "created_at": time.time()}
+        try:
+            result = await self.collection.update_one(
+                {"key": key, "status": {"$in": ["pending", "running"]}}, {"$setOnInsert": job}, upsert=True
+            )
+        except DuplicateKeyError:
+            return False # Outro processo criou o pendente no meio do caminho
+        return result.upserted_id is not None
+
+    async def cancel(self, key: str):
+        """Cancela um trabalho pendente pela sua chave."""
+        await self.collection.delete_one({"key": key, "status": "pending"})
+
+    async def claim_due(self) -> Optional[Dict[str, Any]]:
+        """Reserva o trabalho vencido mais antigo, marcando-o como em execução."""
+        return await self.collection.find_one_and_update(
+            {"status": "pending", "run_at": {"$lte": time.time()}},
+            {"$set": {"status": "running", "started_at": time.time()}},
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def complete(self, job_id: Any):
+        """Remove um trabalho concluído."""
+        await self.collection.delete_one({"_id": job_id})
+
+    async def retry(self, job_id: Any, delay: float, error: str):
+        """
+        Devolve um trabalho para a fila, para nova tentativa após `delay` segundos.
+        Se a chave dele já foi reagendada durante a execução, o trabalho novo prevalece e este é removido.
+        """
+        try:
+            await self.collection.update_one(
+                {"_id": job_id},
+                {"$set": {"status": "pending", "run_at": time.time() + delay, "last_error": error}, "$inc": {"attempts": 1}}
+            )
+        except DuplicateKeyError:
+            await self.collection.delete_one({"_id": job_id})
+
+    async def fail(self, job_id: Any, error: str):
+        """Marca um trabalho como falho definitivamente (mantido para consulta)."""
+        await self.collection.update_one({"_id": job_id}, {"$set": {"status": "failed", "last_error": error}, "$inc": {"attempts": 1}})
+
+    async def requeue_running(self) -> int:
+        """Devolve para a fila os trabalhos que estavam em execução quando o bot parou."""
+        requeued = 0
+        async for job in self.collection.find({"status": "running"}, {"_id": 1}):
+            try:
+                await self.collection.update_one({"_id": job["_id"], "status": "running"}, {"$set": {"status": "pending"}})
+                requeued += 1
+            except DuplicateKeyError:
+                # A chave já tem um trabalho pendente mais novo
+                await self.collection.delete_one({"_id": job["_id"]})
+        return requeued
+
+    async def next_run_at(self) -> Optional[float]:
+        """Horário do próximo trabalho pendente, ou None se não houver nenhum."""
+        job = await self.collection.find_one({"status": "pending"}, {"run_at": 1}, sort=[("run_at", 1)])
+        return job["run_at"] if job else None
@@ -0,0 +1,210 @@
+import logging
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Coleção que guarda a versão do esquema já aplicada no banco
+SCHEMA_STATE_COLLECTION = "schema_state"
+SCHEMA_STATE_ID = "schema_version"
+
+Migration = Callable[[AsyncIOMotorDatabase], Awaitable[None]]
+
+
+async def _create_indexes(collection, indexes: List[IndexModel]):
+    """Cria os índices informados, registrando quanto tempo cada um levou."""
+    for index in indexes:
+        started = time.perf_counter()
+        name = await collection.create_indexes([index])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Índice {collection.name}.{name[0]} criado em {elapsed_ms:.1f} ms")
+
+
+async def _migration_001_initial_indexes(db: AsyncIOMotorDatabase):
+    """Índices das consultas quentes de duelos e do placar de líderes."""
+    # get_active_duel_for_player: cada ramo do $or usa o seu próprio índice
+    # on_duel_screenshot: busca por canal + status (apenas duelos com canal criado)
+    await _create_indexes(db.duels, [
+        IndexModel([("challenger_id", ASCENDING), ("status", ASCENDING)], name="challenger_status"),
+        IndexModel([("opponent_id", ASCENDING), ("status", ASCENDING)], name="opponent_status"),
+        IndexModel(
+            [("channel_id", ASCENDING), ("status", ASCENDING)],
+            name="channel_status",
+            partialFilterExpression={"channel_id": {"$gt": 0}},
+        ),
+    ])
+    # get_leaderboard_players: filtra registrados e ordena por pontos
+    await _create_indexes(db.players, [
+        IndexModel(
+            [("individual_elo_points", DESCENDING)],
+            name="leaderboard_points",
+            partialFilterExpression={"is_registered": True},
+        ),
+    ])
+
+
+async def _migration_002_duel_history_collection(db: AsyncIOMotorDatabase):
+    """Move o array individual_match_history dos jogadores para a coleção duel_history."""
+    await _create_indexes(db.duel_history, [
+        IndexModel([("player_id", ASCENDING), ("timestamp", DESCENDING)], name="player_timestamp"),
+    ])
+
+    started = time.perf_counter()
+    players_migrated, entries_migrated = 0, 0
+    cursor = db.players.find(
+        {"individual_match_history": {"$exists": True}},
+        {"individual_match_history": 1}
+    )
+    async for player in cursor:
+        entries = [
+            {
+                "player_id": player["_id"],
+                "opponent_id": match.get("opponent_id"),
+                "opponent_elo_at_match": match.get("opponent_elo_at_match", 0),
+                "points_change": match.get("points_change", 0),
+                "duel_id": None,
+                "timestamp": match.get("timestamp", 0),
+                "migrated": True
+            }
+            for match in player.get("individual_match_history") or []
+        ]
+        # Remove cópias de uma execução interrompida antes de reinserir, mantendo a migração idempotente
+        await db.duel_history.delete_many({"player_id": player["_id"], "migrated": True})
+        if entries:
+            await db.duel_history.insert_many(entries, ordered=False)
+        await db.players.update_one({"_id": player["_id"]}, {"$unset": {"individual_match_history": ""}})
+        players_migrated += 1
+        entries_migrated += len(entries)
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"{entries_migrated} partidas de {players_migrated} jogadores movidas para duel_history em {elapsed:.2f}s")
+
+
+async def _migration_003_leaderboard_keyset_index(db: AsyncIOMotorDatabase):
+    """Troca o índice do placar por um que também ordena por _id, para a paginação por chave."""
+    await _create_indexes(db.players, [
+        IndexModel(
+            [("individual_elo_points", DESCENDING), ("_id", ASCENDING)],
+            name="leaderboard_points_id",
+            partialFilterExpression={"is_registered": True},
+        ),
+    ])
+    if "leaderboard_points" in await db.players.index_information():
+        await db.players.drop_index("leaderboard_points")
+
+
+async def _migration_004_unregistered_players_index(db: AsyncIOMotorDatabase):
+    """Índice parcial para a sincronização diária, que percorre só os jogadores não registrados."""
+    await _create_indexes(db.players, [
+        IndexModel(
+            [("is_registered", ASCENDING)],
+            name="unregistered_players",
+            partialFilterExpression={"is_registered": False},
+        ),
+    ])
+
+
+async def _migration_005_dm_queue_indexes(db: AsyncIOMotorDatabase):
+    """Índices da fila persistente de DMs."""
+    await _create_indexes(db.dm_queue, [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+        IndexModel([("user_id", ASCENDING), ("kind", ASCENDING), ("status", ASCENDING)], name="user_kind_status"),
+    ])
+
+
+async def _migration_006_scheduled_jobs_indexes(db: AsyncIOMotorDatabase):
+    """Índices dos trabalhos agendados (expiração de desafios, prazos de print e limpeza de arenas)."""
+    await _create_indexes(db.scheduled_jobs, [
+        IndexModel([("status", ASCENDING), ("run_at", ASCENDING)], name="status_run_at"),
+        IndexModel(
+            [("key", ASCENDING)],
+            name="job_key",
+            unique=True,
+            partialFilterExpression={"key": {"$exists": True}},
+        ),
+    ])
+
+
+async def _migration_007_history_digest_index(db: AsyncIOMotorDatabase):
+    """Índice do buffer do modo resumo do histórico (lido em ordem de chegada)."""
+    await _create_indexes(db.history_digest, [
+        IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)], name="created_at"),
+    ])
+
+
+async def _migration_008_pending_job_key_index(db: AsyncIOMotorDatabase):
+    """Restringe a chave única dos trabalhos agendados aos pendentes (um em execução pode ter sucessor)."""
+    await _create_indexes(db.scheduled_jobs, [
+        IndexModel(
+            [("key", ASCENDING)],
+            name="pending_job_key",
+            unique=True,
+            partialFilterExpression={"key": {"$exists": True}, "status": "pending"},
+        ),
+    ])
+    if "job_key" in await db.scheduled_jobs.index_information():
+        await db.scheduled_jobs.drop_index("job_key")
+
+
+async def _migration_009_history_keyset_index(db: AsyncIOMotorDatabase):
+    """Troca o índice do histórico por um que também ordena por _id, para desempatar timestamps iguais na paginação."""
+    await _create_indexes(db.duel_history, [
+        IndexModel(
+            [("player_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="player_timestamp_id",
+        ),
+    ])
+    if "player_timestamp" in await db.duel_history.index_information():
+        await db.duel_history.drop_index("player_timestamp")
+
+
+# Lista ordenada de migrações: (versão, descrição, função).
+# Novas migrações devem sempre ser adicionadas ao final, com a próxima versão.
+MIGRATIONS: List[Tuple[int, str, Migration]] = [
+    (1, "Índices iniciais de duelos e ranking", _migration_001_initial_indexes),
+    (2, "Histórico de duelos em coleção própria", _migration_002_duel_history_collection),
+    (3, "Índice do placar com desempate por _id", _migration_003_leaderboard_keyset_index),
+    (4, "Índice de jogadores não registrados", _migration_004_unregistered_players_index),
+    (5, "Fila persistente de DMs", _migration_005_dm_queue_indexes),
+    (6, "Trabalhos agendados", _migration_006_scheduled_jobs_indexes),
+    (7, "Buffer do resumo do histórico de duelos", _migration_007_history_digest_index),
+    (8, "Chave única só entre trabalhos pendentes", _migration_008_pending_job_key_index),
+    (9, "Índice do histórico com desempate por _id", _migration_009_history_keyset_index),
+]
+
+
+async def get_schema_version(db: AsyncIOMotorDatabase) -> int:
+    """Retorna a versão do esquema já aplicada (0 se nenhuma migração rodou)."""
+    state = await db[SCHEMA_STATE_COLLECTION].find_one({"_id": SCHEMA_STATE_ID})
+    return state.get("version", 0) if state else 0
+
+
+async def run_migrations(db: AsyncIOMotorDatabase) -> int:
+    """
+    Aplica, em ordem, todas as migrações com versão maior que a registrada no banco.
+    A versão é gravada após cada migração, então uma falha no meio do caminho
+    não faz as anteriores rodarem de novo. Retorna a versão final do esquema.
+    """
+    current_version = await get_schema_version(db)
+    pending = [m for m in MIGRATIONS if m[0] > current_version]
+    if not pending:
+        logger.info(f"Esquema do banco já está na versão {current_version}.")
+        return current_version
+
+    for version, description, migration in pending:
+        logger.info(f"Aplicando migração {version}: {description}...")
+        started = time.perf_counter()
+        await migration(db)
+        elapsed = time.perf_counter() - started
+        await db[SCHEMA_STATE_COLLECTION].update_one(
+            {"_id": SCHEMA_STATE_ID},
+            {"$set": {"version": version, "description": description, "applied_at": time.time(), "duration_seconds": elapsed}},
+            upsert=True
+        )
+        logger.info(f"Migração {version} aplicada em {elapsed:.2f}s.")
+        current_version = version
+
+    return current_version
@@ -51,11 +51,31 @@ class PlayerData(TypedDict):
     win_streak: int                      # Contagem de vitórias consecutivas
     demotion_shield_games: int           # Jogos restantes de proteção contra rebaixamento
     
-    individual_match_history: List[Dict[str, Any]]
+    # Resumo das partidas, mantido incrementalmente a cada duelo
+    wins: int
+    losses: int
+    matches_played: int
+    peak_elo_points: int
+    last_match_at: Optional[float]
+    
+    # O histórico de partidas fica na coleção 'duel_history' (ver MatchHistoryEntry)
     created_at: float
     last_updated: float
     player_card_message_id: Optional[int]
 
+class MatchHistoryEntry(TypedDict):
+    """
+    Uma partida no histórico individual de um jogador.
+    Armazenada na coleção 'duel_history', indexada por (player_id, timestamp, _id).
+    """
+    _id: Optional[Any]
+    player_id: int
+    opponent_id: int
+    opponent_elo_at_match: int
+    points_change: int
+    duel_id: Optional[Any]
+    timestamp: float
+
 class DuelMatchData(TypedDict):
     """Representa uma partida de duelo 1v1."""
     _id: Optional[Any]
@@ -80,6 +100,9 @@ class DuelMatchData(TypedDict):
     
     # ID do canal privado do duelo
     channel_id: Optional[int]
+    # Mensagens do painel do duelo e do pedido de screenshot (no canal do duelo)
+    panel_message_id: Optional[int]
+    prompt_message_id: Optional[int]
 
     # Metadados
     created_at: float
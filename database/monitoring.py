@@ -0,0 +1,191 @@
+import time
+import heapq
+import logging
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from utils.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Limites (em ms) dos baldes do histograma de latência; o último balde é "acima de 5s"
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Comandos internos do driver que não interessam para a análise de desempenho
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue", "buildInfo"}
+
+class OperationStats:
+    """Histograma de latência e contagem de erros de uma operação (coleção.comando)."""
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, duration_ms: float, failed: bool):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        if failed:
+            self.errors += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Estimativa do percentil pelo limite superior do balde (o último balde usa o máximo observado)."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+class CommandLatencyMonitor(monitoring.CommandListener):
+    """
+    Listener de comandos do PyMongo que mede a latência de cada operação por (coleção, comando).
+    O Motor executa o PyMongo em threads, por isso o estado é protegido por um lock.
+    """
+    def __init__(self, slow_threshold_ms: float, slowest_kept: int = 10):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slowest_kept = slowest_kept
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[object, int], str] = {}
+        self._stats: Dict[str, OperationStats] = {}
+        self._slowest: List[Tuple[float, float, str]] = []  # heap de (ms, quando, operação)
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else event.database_name
+        with self._lock:
+            self._in_flight[(event.connection_id, event.request_id)] = f"{collection}.{event.command_name}"
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            operation = self._in_flight.pop((event.connection_id, event.request_id), None)
+            if operation is None:
+                return
+            stats = self._stats.get(operation)
+            if stats is None:
+                stats = self._stats[operation] = OperationStats()
+            stats.record(duration_ms, failed)
+
+            entry = (duration_ms, time.time(), operation)
+            if len(self._slowest) < self.slowest_kept:
+                heapq.heappush(self._slowest, entry)
+            elif duration_ms > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+        if failed:
+            logger.warning(f"Operação MongoDB {operation} falhou após {duration_ms:.1f} ms: {getattr(event, 'failure', '')}")
+        elif duration_ms >= self.slow_threshold_ms:
+            logger.warning(f"Operação MongoDB lenta: {operation} levou {duration_ms:.1f} ms (limite {self.slow_threshold_ms:.0f} ms)")
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        """Resumo por operação, ordenado pela latência p95 (maior primeiro)."""
+        with self._lock:
+            rows = [
+                {
+                    "operation": operation,
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "avg_ms": stats.total_ms / stats.count if stats.count else 0.0,
+                    "p50_ms": stats.percentile(0.50),
+                    "p95_ms": stats.percentile(0.95),
+                    "p99_ms": stats.percentile(0.99),
+                    "max_ms": stats.max_ms
+                }
+                for operation, stats in self._stats.items()
+            ]
+        return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+    def slowest_operations(self) -> List[Tuple[float, float, str]]:
+        """As operações individuais mais lentas já observadas, da mais lenta para a mais rápida."""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slowest.clear()
+            self.started_at = time.time()
+
+
+class ReadProfileStats:
+    """
+    Volume lido por perfil de leitura de jogadores: chamadas, acertos de cache, documentos,
+    bytes BSON recebidos e tempo gasto decodificando-os. Serve para comparar os perfis projetados com o 'full'.
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self._profiles: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, profile: str) -> Dict[str, float]:
+        entry = self._profiles.get(profile)
+        if entry is None:
+            entry = self._profiles[profile] = {"calls": 0, "cache_hits": 0, "documents": 0, "bytes": 0, "decode_seconds": 0.0}
+        return entry
+
+    def record_call(self, profile: str, cache_hits: int = 0):
+        entry = self._entry(profile)
+        entry["calls"] += 1
+        entry["cache_hits"] += cache_hits
+
+    def record_batch(self, profile: str, documents: int, size: int, decode_seconds: float):
+        entry = self._entry(profile)
+        entry["documents"] += documents
+        entry["bytes"] += size
+        entry["decode_seconds"] += decode_seconds
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        """Resumo por perfil, com médias por documento lido do banco."""
+        rows = []
+        for profile, entry in self._profiles.items():
+            documents = entry["documents"]
+            rows.append({
+                "profile": profile, **entry,
+                "bytes_per_doc": entry["bytes"] / documents if documents else 0.0,
+                "decode_us_per_doc": entry["decode_seconds"] * 1_000_000 / documents if documents else 0.0
+            })
+        return sorted(rows, key=lambda row: row["bytes"], reverse=True)
+
+    def reset(self):
+        self._profiles.clear()
+        self.started_at = time.time()
+
+
+_command_monitor: Optional[CommandLatencyMonitor] = None
+_read_stats: Optional[ReadProfileStats] = None
+
+def get_command_monitor() -> CommandLatencyMonitor:
+    """Retorna o monitor de comandos compartilhado, criando-o a partir do .env na primeira chamada."""
+    global _command_monitor
+    if _command_monitor is None:
+        _command_monitor = CommandLatencyMonitor(slow_threshold_ms=get_settings().mongo_slow_query_ms)
+    return _command_monitor
+
+def get_read_stats() -> ReadProfileStats:
+    """Retorna as estatísticas compartilhadas dos perfis de leitura de jogadores."""
+    global _read_stats
+    if _read_stats is None:
+        _read_stats = ReadProfileStats()
+    return _read_stats
@@ -0,0 +1,113 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.settings import get_settings
+from .records import PlayerRecord
+
+logger = logging.getLogger(__name__)
+
+class PlayerCache:
+    """
+    Cache LRU em memória para documentos de jogadores, com expiração por tempo (TTL).
+    Os documentos ficam guardados como PlayerRecord (slots), bem menores que um dict por jogador.
+    É compartilhado por todas as instâncias de PlayerService, para que a invalidação
+    feita por um cog valha também para os outros.
+    Cada jogador tem uma geração, incrementada a cada invalidação: quem lê do banco captura a geração
+    antes da consulta e a passa para `set`, que descarta o documento se uma escrita aconteceu no meio.
+    """
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, tuple[float, PlayerRecord]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0  # incrementada por clear(), que zera as gerações individuais
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_skips = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, player_id: int) -> Optional[Dict[str, Any]]:
+        """Retorna uma cópia do documento em cache, ou None se ausente/expirado."""
+        entry = self._entries.get(player_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, document = entry
+        if expires_at < time.monotonic():
+            del self._entries[player_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(player_id)
+        self.hits += 1
+        return document.copy()
+
+    def generation(self, player_id: int) -> Tuple[int, int]:
+        """Geração atual do jogador, a capturar antes de ler do banco."""
+        return self._epoch, self._generations.get(player_id, 0)
+
+    def set(self, player_id: int, document: Dict[str, Any], generation: Optional[Tuple[int, int]] = None):
+        """
+        Armazena um documento, descartando o menos usado recentemente se o cache estiver cheio.
+        Com `generation`, o documento só é guardado se o jogador não foi invalidado desde a leitura.
+        """
+        if not self.enabled:
+            return
+        if generation is not None and generation != self.generation(player_id):
+            self.stale_skips += 1
+            return
+        self._entries[player_id] = (time.monotonic() + self.ttl_seconds, PlayerRecord(document))
+        self._entries.move_to_end(player_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, player_id: int):
+        """Remove um jogador do cache após uma escrita."""
+        self._generations[player_id] = self._generations.get(player_id, 0) + 1
+        if self._entries.pop(player_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        """Esvazia o cache (usado após escritas em massa)."""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._generations.clear()
+        self._epoch += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para dimensionar o cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_skips": self.stale_skips
+        }
+
+
+_player_cache: Optional[PlayerCache] = None
+
+def get_player_cache() -> PlayerCache:
+    """Retorna o cache compartilhado de jogadores, criando-o a partir do .env na primeira chamada."""
+    global _player_cache
+    if _player_cache is None:
+        settings = get_settings()
+        max_size, ttl_seconds = settings.player_cache_max_size, settings.player_cache_ttl_seconds
+        _player_cache = PlayerCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        logger.info(f"Cache de jogadores {'ativado' if _player_cache.enabled else 'desativado'} (máx. {max_size}, TTL {ttl_seconds}s).")
+    return _player_cache
@@ -1,36 +1,109 @@
 import time
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable
 
+import bson
 from motor.motor_asyncio import AsyncIOMotorCollection
-from .models import PlayerData, ELO_TIERS_MAP
+from pymongo import UpdateOne
+from .history_service import MatchHistoryService
+from .player_cache import PlayerCache, get_player_cache
+from .monitoring import ReadProfileStats, get_read_stats
+from .models import PlayerData
+from .records import PlayerRecord
+from .rank_tiers import TIER_TABLE
+from utils.leaderboard import LEADERBOARD_FIELDS
+
+# Perfis de leitura: quais campos cada tipo de consulta precisa (None = documento completo).
+# Um acerto no cache devolve o documento completo, que atende a qualquer perfil.
+READ_PROFILES: Dict[str, Optional[Dict[str, int]]] = {
+    # Pode desafiar/ser desafiado? (e com quantos pontos o duelo começa)
+    "eligibility": {"is_registered": 1, "individual_elo_points": 1},
+    # Lembretes e expulsão de quem não se registrou
+    "registration": {"is_registered": 1, "registration_reminders_sent": 1, "last_reminder_sent_at": 1},
+    # Posição no placar e cálculo de ELO
+    "rating": {field: 1 for field in (*LEADERBOARD_FIELDS, "is_registered", "matches_played", "win_streak", "peak_elo_points")},
+    # Card de jogador (e o formulário de edição do registro)
+    "card": {field: 1 for field in (
+        *LEADERBOARD_FIELDS, "is_registered", "wr_nickname", "wr_region", "preferred_roles", "player_card_message_id"
+    )},
+    "full": None,
+}
 
 class PlayerService:
-    def __init__(self, collection: AsyncIOMotorCollection):
+    def __init__(self, collection: AsyncIOMotorCollection, cache: Optional[PlayerCache] = None, read_stats: Optional[ReadProfileStats] = None):
         self.collection = collection
+        # Cache compartilhado entre os cogs; toda escrita abaixo invalida a entrada do jogador
+        self.cache = cache or get_player_cache()
+        self.read_stats = read_stats or get_read_stats()
+        self._record_codec_options = PlayerRecord.codec_options(collection.codec_options)
 
     def _get_rank_from_points(self, points: int) -> tuple[str, str]:
         """
         Função auxiliar para determinar o nome do elo e divisão com base nos pontos.
         """
-        for rank_full, min_points in sorted(ELO_TIERS_MAP.items(), key=lambda item: item[1], reverse=True):
-            if points >= min_points:
-                rank_parts = rank_full.split()
-                elo_name = rank_parts[0]
-                division = rank_parts[1] if len(rank_parts) > 1 else ""
-                return elo_name, division
-        return "Ferro", "IV"
+        return TIER_TABLE.rank_for(points)
 
-    async def get_player_by_id(self, member_id: int) -> Optional[PlayerData]:
-        """Busca um jogador pelo seu ID do Discord."""
-        return await self.collection.find_one({"_id": member_id})
+    async def _find_with_profile(self, query: Dict[str, Any], profile: str, limit: int = 0) -> List[PlayerData]:
+        """
+        Executa a consulta com a projeção do perfil, recebendo os lotes em BSON bruto
+        para medir quantos bytes chegaram e quanto tempo levou decodificá-los (direto para PlayerRecord).
+        """
+        if profile not in READ_PROFILES:
+            raise ValueError(f"Perfil de leitura desconhecido: {profile}")
+        players: List[PlayerData] = []
+        cursor = self.collection.find_raw_batches(query, READ_PROFILES[profile], limit=limit)
+        async for batch in cursor:
+            decode_started = time.perf_counter()
+            documents = bson.decode_all(batch, self._record_codec_options)
+            self.read_stats.record_batch(profile, len(documents), len(batch), time.perf_counter() - decode_started)
+            players.extend(documents)
+        return players
 
-    async def get_or_create_player(self, member) -> PlayerData:
-        """Busca um jogador ou cria um registro inicial com todos os campos necessários."""
-        player_data = await self.get_player_by_id(member.id)
-        if player_data:
-            return player_data
-        
-        new_player: PlayerData = {
+    async def get_player_by_id(self, member_id: int, profile: str = "full") -> Optional[PlayerData]:
+        """
+        Busca um jogador pelo seu ID do Discord, passando primeiro pelo cache.
+        Com um `profile` diferente de 'full', só os campos do perfil vêm do banco (e o resultado não vai para o cache).
+        """
+        if self.cache.enabled and (cached := self.cache.get(member_id)) is not None:
+            self.read_stats.record_call(profile, cache_hits=1)
+            return cached
+        self.read_stats.record_call(profile)
+        generation = self.cache.generation(member_id)
+        players = await self._find_with_profile({"_id": member_id}, profile, limit=1)
+        player_data = players[0] if players else None
+        if player_data and READ_PROFILES[profile] is None:
+            self.cache.set(member_id, player_data, generation=generation)
+        return player_data
+
+    async def get_players_by_ids(self, member_ids: Iterable[int], profile: str = "full") -> Dict[int, PlayerData]:
+        """
+        Busca vários jogadores de uma vez: os que estão no cache saem dele e o restante
+        vem em uma única consulta $in. Retorna {id: documento} só com os jogadores encontrados.
+        """
+        found: Dict[int, PlayerData] = {}
+        missing: List[int] = []
+        for member_id in dict.fromkeys(member_ids):
+            if self.cache.enabled and (cached := self.cache.get(member_id)) is not None:
+                found[member_id] = cached
+            else:
+                missing.append(member_id)
+        self.read_stats.record_call(profile, cache_hits=len(found))
+        if missing:
+            generations = {member_id: self.cache.generation(member_id) for member_id in missing}
+            for player in await self._find_with_profile({"_id": {"$in": missing}}, profile):
+                found[player["_id"]] = player
+                if READ_PROFILES[profile] is None:
+                    self.cache.set(player["_id"], player, generation=generations[player["_id"]])
+        return found
+
+    def prime_cache(self, players: List[PlayerData]):
+        """Guarda no cache documentos que acabaram de ser gravados (write-through)."""
+        for player in players:
+            self.cache.set(player["_id"], player)
+
+    def _new_player_document(self, member) -> PlayerData:
+        """Monta o registro inicial de um jogador com todos os campos necessários."""
+        now = time.time()
+        return {
             "_id": member.id,
             "discord_id": member.id,
             "username": member.name,
@@ -49,18 +122,76 @@ class PlayerService:
             "promo_losses": 0,
             "win_streak": 0,
             "demotion_shield_games": 0,
-            "individual_match_history": [],
-            "created_at": time.time(),
-            "last_updated": time.time(),
+            "wins": 0,
+            "losses": 0,
+            "matches_played": 0,
+            "peak_elo_points": 0,
+            "last_match_at": None,
+            "created_at": now,
+            "last_updated": now,
             "player_card_message_id": None
         }
+
+    async def get_or_create_player(self, member) -> PlayerData:
+        """Busca um jogador ou cria um registro inicial com todos os campos necessários."""
+        player_data = await self.get_player_by_id(member.id)
+        if player_data:
+            return player_data
+        
+        new_player = self._new_player_document(member)
         await self.collection.insert_one(new_player)
+        self.cache.set(member.id, new_player)
         return new_player
 
-    async def get_unregistered_players(self) -> List[PlayerData]:
-        """Busca todos os jogadores que ainda não se registraram."""
-        cursor = self.collection.find({"is_registered": False})
-        return await cursor.to_list(length=None)
+    async def sync_members(self, members: List[Any], chunk_size: int = 1000) -> Dict[str, Any]:
+        """
+        Garante que todos os membros tenham um registro e remove jogadores não registrados
+        que já saíram do servidor. Os IDs gravados são lidos uma única vez: só os membros
+        que ainda não têm registro recebem upsert (com $setOnInsert, em lotes), e só os
+        não registrados fora do servidor são apagados.
+        """
+        started = time.perf_counter()
+        stored_ids, stored_unregistered = set(), set()
+        async for player in self.collection.find({}, {"_id": 1, "is_registered": 1}, batch_size=chunk_size):
+            stored_ids.add(player["_id"])
+            if not player.get("is_registered"):
+                stored_unregistered.add(player["_id"])
+
+        member_ids = {member.id for member in members}
+        new_members = [member for member in members if member.id not in stored_ids]
+        upsert_started = time.perf_counter()
+        inserted = 0
+        for start in range(0, len(new_members), chunk_size):
+            operations = []
+            for member in new_members[start:start + chunk_size]:
+                new_player = self._new_player_document(member)
+                del new_player["_id"] # O _id vem do filtro do upsert
+                operations.append(UpdateOne({"_id": member.id}, {"$setOnInsert": new_player}, upsert=True))
+            result = await self.collection.bulk_write(operations, ordered=False)
+            inserted += result.upserted_count
+        upsert_elapsed = time.perf_counter() - upsert_started
+
+        # Jogadores não registrados cujo ID não está mais entre os membros são órfãos
+        orphan_ids = list(stored_unregistered - member_ids)
+        deleted = 0
+        for start in range(0, len(orphan_ids), chunk_size):
+            chunk = orphan_ids[start:start + chunk_size]
+            result = await self.collection.delete_many({"_id": {"$in": chunk}, "is_registered": False})
+            deleted += result.deleted_count
+            for player_id in chunk:
+                self.cache.invalidate(player_id)
+
+        return {
+            "members": len(members), "inserted": inserted, "deleted": deleted,
+            "upsert_seconds": upsert_elapsed, "total_seconds": time.perf_counter() - started
+        }
+
+    async def iter_unregistered_players(self, batch_size: int = 1000):
+        """Percorre os jogadores que ainda não se registraram, trazendo só os campos dos lembretes."""
+        projection = {"registration_reminders_sent": 1, "last_reminder_sent_at": 1}
+        cursor = self.collection.find({"is_registered": False}, projection, batch_size=batch_size)
+        async for player in cursor:
+            yield player
 
     async def update_player_registration(self, member_id: int, nickname: str, region: str, roles: List[str]):
         """Finaliza o registro de um jogador, atualizando seus dados."""
@@ -74,15 +205,13 @@ class PlayerService:
                 "last_updated": time.time()
             }}
         )
+        self.cache.invalidate(member_id)
 
-    async def update_player_after_duel(self, player_id: int, result: str, points_change: int, opponent_id: int, opponent_elo_before_match: int) -> Dict[str, Any]:
+    def _build_duel_update(self, player: PlayerData, result: str, points_change: int) -> tuple[Dict[str, Any], PlayerData, int, int]:
         """
-        Atualiza o ELO de um jogador após um duelo, recalcula seu rank e salva a partida no histórico.
+        Calcula a atualização de um jogador após um duelo a partir do documento atual.
+        Retorna (operação de update, documento resultante, pontos finais, bônus).
         """
-        player = await self.get_player_by_id(player_id)
-        if not player:
-            return {"status": "error", "message": "Jogador não encontrado."}
-
         # Lógica de Sequência de Vitórias (Win Streak)
         current_streak = player.get('win_streak', 0)
         if result == "win":
@@ -99,30 +228,138 @@ class PlayerService:
         new_points = player.get("individual_elo_points", 0) + final_points_change
         new_elo, new_division = self._get_rank_from_points(new_points)
 
+        now = time.time()
         updates = {
             "individual_elo_points": new_points,
             "individual_current_elo": new_elo,
             "individual_current_division": new_division,
             "win_streak": new_streak,
-            "last_updated": time.time()
+            "last_match_at": now,
+            "last_updated": now
         }
+        counter_field = "wins" if result == "win" else "losses"
         
-        match_result = {
-            "opponent_id": opponent_id,
-            "opponent_elo_at_match": opponent_elo_before_match,
-            "points_change": final_points_change,
-            "timestamp": time.time()
+        # Os contadores de resumo são atualizados na mesma escrita, sem reler o histórico
+        update_doc = {
+            "$set": updates,
+            "$inc": {counter_field: 1, "matches_played": 1},
+            "$max": {"peak_elo_points": new_points}
         }
-        
-        await self.collection.update_one(
-            {"_id": player_id},
-            {
-                "$set": updates,
-                "$push": { "individual_match_history": match_result }
-            }
-        )
-        
-        return {"status": "updated", "points": final_points_change, "bonus": points_bonus}
+
+        updated_player: PlayerData = {**player, **updates}
+        updated_player[counter_field] = player.get(counter_field, 0) + 1
+        updated_player["matches_played"] = player.get("matches_played", 0) + 1
+        updated_player["peak_elo_points"] = max(player.get("peak_elo_points", 0), new_points)
+        return update_doc, updated_player, final_points_change, points_bonus
+
+    def build_duel_results(self, winner: PlayerData, loser: PlayerData, winner_points_change: int, loser_points_change: int) -> Dict[str, Any]:
+        """
+        Calcula o resultado de um duelo para os dois jogadores, sem gravar nada.
+        Retorna os documentos atualizados, os pontos finais de cada um e as operações a aplicar.
+        """
+        winner_update, winner_after, winner_final, winner_bonus = self._build_duel_update(winner, "win", winner_points_change)
+        loser_update, loser_after, loser_final, _ = self._build_duel_update(loser, "loss", loser_points_change)
+        return {
+            "winner": winner_after, "loser": loser_after,
+            "winner_points": winner_final, "loser_points": loser_final,
+            "bonus": winner_bonus,
+            "operations": [UpdateOne({"_id": winner["_id"]}, winner_update), UpdateOne({"_id": loser["_id"]}, loser_update)]
+        }
+
+    async def apply_duel_results(self, results: Dict[str, Any], session=None):
+        """Grava, em uma única escrita em lote, o resultado calculado por build_duel_results."""
+        # Invalida antes de gravar: se a transação for abortada, o cache não guarda dados não confirmados
+        self.cache.invalidate(results["winner"]["_id"])
+        self.cache.invalidate(results["loser"]["_id"])
+        await self.collection.bulk_write(results["operations"], ordered=True, session=session)
+
+    async def backfill_match_counters(self, history_service: MatchHistoryService, batch_size: int = 500) -> int:
+        """
+        Recalcula wins, losses, matches_played, peak_elo_points e last_match_at
+        de todos os jogadores a partir da coleção de histórico. Retorna quantos jogadores foram atualizados.
+        """
+        updated = 0
+        batch = []
+        async for summary in history_service.iter_player_summaries():
+            batch.append(summary)
+            if len(batch) >= batch_size:
+                updated += await self._apply_counter_backfill(batch)
+                batch = []
+        if batch:
+            updated += await self._apply_counter_backfill(batch)
+        return updated
+
+    async def _apply_counter_backfill(self, summaries: List[Dict[str, Any]]) -> int:
+        """Grava um lote de resumos do histórico nos documentos dos jogadores."""
+        cursor = self.collection.find({"_id": {"$in": [s["_id"] for s in summaries]}}, {"individual_elo_points": 1})
+        current_points = {player["_id"]: player.get("individual_elo_points", 0) async for player in cursor}
+
+        operations = []
+        for summary in summaries:
+            if summary["_id"] not in current_points:
+                continue
+            # Reconstrói a pontuação após cada partida, partindo dos pontos atuais
+            changes = summary["changes"]
+            running_points = current_points[summary["_id"]] - sum(changes)
+            peak_points = running_points
+            for change in changes:
+                running_points += change
+                peak_points = max(peak_points, running_points)
+
+            operations.append(UpdateOne({"_id": summary["_id"]}, {"$set": {
+                "wins": summary["wins"],
+                "losses": summary["matches"] - summary["wins"],
+                "matches_played": summary["matches"],
+                "peak_elo_points": max(peak_points, 0),
+                "last_match_at": summary["last_match_at"]
+            }}))
+
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        self.cache.clear()
+        return result.matched_count
+
+    async def retier_players(self, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Recalcula o elo/divisão de todos os jogadores com a tabela de elos atual
+        e grava, em lotes, apenas os que mudaram. Útil após alterar ELO_TIERS_MAP.
+        """
+        started = time.perf_counter()
+        scanned, changed = 0, 0
+        projection = {"individual_elo_points": 1, "individual_current_elo": 1, "individual_current_division": 1}
+        cursor = self.collection.find({}, projection, batch_size=batch_size)
+
+        batch: List[Dict[str, Any]] = []
+        async for player in cursor:
+            batch.append(player)
+            if len(batch) >= batch_size:
+                changed += await self._apply_retier_batch(batch)
+                scanned += len(batch)
+                batch = []
+        if batch:
+            changed += await self._apply_retier_batch(batch)
+            scanned += len(batch)
+
+        if changed:
+            self.cache.clear()
+        elapsed = time.perf_counter() - started
+        return {
+            "scanned": scanned, "changed": changed, "elapsed": elapsed,
+            "throughput": (scanned / elapsed) if elapsed > 0 else 0.0
+        }
+
+    async def _apply_retier_batch(self, players: List[Dict[str, Any]]) -> int:
+        """Compara o elo salvo com o calculado e grava só as diferenças."""
+        ranks = TIER_TABLE.rank_many(player.get("individual_elo_points", 0) for player in players)
+        operations = [
+            UpdateOne({"_id": player["_id"]}, {"$set": {"individual_current_elo": elo, "individual_current_division": division}})
+            for player, (elo, division) in zip(players, ranks)
+            if (player.get("individual_current_elo"), player.get("individual_current_division")) != (elo, division)
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
 
     async def increment_reminder(self, member_id: int):
         """Incrementa a contagem de lembretes de registro enviados."""
@@ -130,6 +367,7 @@ class PlayerService:
             {"_id": member_id},
             {"$inc": {"registration_reminders_sent": 1}, "$set": {"last_reminder_sent_at": time.time()}}
         )
+        self.cache.invalidate(member_id)
 
     async def set_player_card_message_id(self, member_id: int, message_id: int):
         """Salva o ID da mensagem do card do jogador no banco de dados."""
@@ -137,20 +375,41 @@ class PlayerService:
             {"_id": member_id},
             {"$set": {"player_card_message_id": message_id}}
         )
+        self.cache.invalidate(member_id)
 
     async def delete_player(self, member_id: int):
         """Deleta um jogador do banco de dados."""
         await self.collection.delete_one({"_id": member_id})
+        self.cache.invalidate(member_id)
 
-    async def get_leaderboard_players(self, limit: int = 10) -> List[PlayerData]:
+    async def get_leaderboard_players(self, limit: int = 10, after: Optional[tuple[int, int]] = None, before: Optional[tuple[int, int]] = None) -> List[PlayerData]:
         """
-        Busca os jogadores com o maior ELO no banco de dados.
+        Busca os jogadores com o maior ELO no banco de dados, em ordem (pontos desc, _id asc).
+        Paginação por chave: `after`/`before` são o (pontos, _id) do último/primeiro jogador
+        da página atual, então qualquer página custa o mesmo que a primeira.
         """
         # Filtra para pegar apenas jogadores registrados
-        query = {"is_registered": True}
-        
-        # .sort("individual_elo_points", -1) ordena do maior para o menor
-        # .limit(10) pega apenas os 10 primeiros resultados
-        cursor = self.collection.find(query).sort("individual_elo_points", -1).limit(limit)
+        query: Dict[str, Any] = {"is_registered": True}
+
+        if before is not None:
+            # Página anterior: percorre o índice no sentido inverso e desfaz a inversão no final
+            points, player_id = before
+            query["$or"] = [{"individual_elo_points": {"$gt": points}}, {"individual_elo_points": points, "_id": {"$lt": player_id}}]
+            cursor = self.collection.find(query).sort([("individual_elo_points", 1), ("_id", -1)]).limit(limit)
+            players = await cursor.to_list(length=limit)
+            players.reverse()
+            return players
+
+        if after is not None:
+            points, player_id = after
+            query["$or"] = [{"individual_elo_points": {"$lt": points}}, {"individual_elo_points": points, "_id": {"$gt": player_id}}]
+
+        cursor = self.collection.find(query).sort([("individual_elo_points", -1), ("_id", 1)]).limit(limit)
         
-        return await cursor.to_list(length=limit)
\ No newline at end of file
+        return await cursor.to_list(length=limit)
+
+    async def iter_registered_players(self, fields: tuple[str, ...], batch_size: int = 1000):
+        """Percorre todos os jogadores registrados trazendo apenas os campos pedidos."""
+        cursor = self.collection.find({"is_registered": True}, {field: 1 for field in fields}, batch_size=batch_size)
+        async for player in cursor:
+            yield player
@@ -0,0 +1,36 @@
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Tuple
+
+from .models import ELO_TIERS_MAP
+
+class RankTierTable:
+    """
+    Tabela imutável de elos, pré-calculada a partir de ELO_TIERS_MAP.
+    Os limites ficam ordenados, então a busca do elo de uma pontuação é O(log n) via bisect.
+    """
+    __slots__ = ("_thresholds", "_ranks")
+
+    def __init__(self, tiers_map: Dict[str, int]):
+        ordered = sorted(tiers_map.items(), key=lambda item: item[1])
+        self._thresholds: Tuple[int, ...] = tuple(min_points for _, min_points in ordered)
+        ranks = []
+        for rank_full, _ in ordered:
+            rank_parts = rank_full.split()
+            ranks.append((rank_parts[0], rank_parts[1] if len(rank_parts) > 1 else ""))
+        self._ranks: Tuple[Tuple[str, str], ...] = tuple(ranks)
+
+    def rank_for(self, points: int) -> Tuple[str, str]:
+        """Retorna (elo, divisão) para uma pontuação."""
+        index = bisect_right(self._thresholds, points) - 1
+        if index < 0:
+            # Abaixo do menor limite (pontos negativos): fica no primeiro elo
+            return self._ranks[0]
+        return self._ranks[index]
+
+    def rank_many(self, points_list: Iterable[int]) -> List[Tuple[str, str]]:
+        """Retorna (elo, divisão) para cada pontuação, na mesma ordem."""
+        thresholds, ranks = self._thresholds, self._ranks
+        return [ranks[max(bisect_right(thresholds, points) - 1, 0)] for points in points_list]
+
+
+TIER_TABLE = RankTierTable(ELO_TIERS_MAP)
@@ -0,0 +1,120 @@
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+from bson.codec_options import CodecOptions
+
+from .models import DuelMatchData, PlayerData
+
+_MISSING = object()
+
+class SlottedRecord(MutableMapping):
+    """
+    Documento do MongoDB guardado em __slots__ em vez de um dict por instância.
+    Os campos do esquema (anotações do TypedDict correspondente) ocupam um slot cada;
+    campos fora do esquema vão para um dict auxiliar criado só quando aparecem.
+    Continua sendo um Mapping, então o acesso por chave (doc['campo'], doc.get(...), dict(doc), {**doc})
+    funciona como antes e o driver consegue decodificar BSON direto para a classe (ver `codec_options`).
+    """
+    __slots__ = ("_extra_fields",)
+    FIELDS: tuple = ()
+    _FIELD_SET: frozenset = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, document: Optional[Dict[str, Any]] = None, **fields: Any):
+        self._extra_fields = None
+        if document:
+            for key, value in document.items():
+                self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "SlottedRecord":
+        """Converte um documento já decodificado (dict) no registro compacto."""
+        return document if type(document) is cls else cls(document)
+
+    def to_document(self) -> Dict[str, Any]:
+        """Documento em dict simples, pronto para gravar ou serializar."""
+        return dict(self.items())
+
+    def copy(self) -> "SlottedRecord":
+        return type(self)(self)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._FIELD_SET:
+            value = getattr(self, key, _MISSING)
+        elif self._extra_fields is not None:
+            value = self._extra_fields.get(key, _MISSING)
+        else:
+            value = _MISSING
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Atalho do caminho quente: evita a exceção de KeyError do Mapping.get
+        if key in self._FIELD_SET:
+            return getattr(self, key, default)
+        if self._extra_fields is not None:
+            return self._extra_fields.get(key, default)
+        return default
+
+    def __setitem__(self, key: str, value: Any):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra_fields is None:
+                self._extra_fields = {}
+            self._extra_fields[key] = value
+
+    def __delitem__(self, key: str):
+        try:
+            if key in self._FIELD_SET:
+                delattr(self, key)
+            elif self._extra_fields is not None:
+                del self._extra_fields[key]
+            else:
+                raise KeyError(key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._FIELD_SET:
+            return hasattr(self, key)
+        return self._extra_fields is not None and key in self._extra_fields
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra_fields:
+            yield from self._extra_fields
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    @classmethod
+    def codec_options(cls, base: Optional[CodecOptions] = None) -> CodecOptions:
+        """
+        Opções de codec que fazem o driver decodificar os documentos direto para esta classe.
+        Subdocumentos também viram registros (com todos os campos no dict auxiliar).
+        """
+        return (base or CodecOptions()).with_options(document_class=cls)
+
+
+class PlayerRecord(SlottedRecord):
+    """Jogador em memória (cache, placar, lotes de leitura) com os campos de PlayerData."""
+    FIELDS = tuple(PlayerData.__annotations__)
+    __slots__ = FIELDS
+
+
+class DuelRecord(SlottedRecord):
+    """Duelo em memória (registro de duelos ativos) com os campos de DuelMatchData."""
+    FIELDS = tuple(DuelMatchData.__annotations__)
+    __slots__ = FIELDS
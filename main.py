@@ -3,7 +3,10 @@ from discord.ext import commands
 import os
 from dotenv import load_dotenv
 import asyncio
+import datetime
 import logging
+import time
+from contextlib import contextmanager
 
 # Configurações de Logs para o bot Discord
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -11,60 +14,129 @@ logger = logging.getLogger('discord')
 
 # Carrega as ariáveis de ambiente do arquivo .env
 load_dotenv()
-DISCORD_BOT_TOKEN = os.getenv('BOT_DICORD_TOKEN')
-MONGO_URI=str(os.getenv('MONGO_URI_NEW'))
-BOT_PREFIX=os.getenv('BOT_PREFIX')
 
 # importa a função de conexão do banco de dados
 from database.connection import connect_db, close_db
+from database.player_cache import get_player_cache
+from database.monitoring import get_command_monitor, get_read_stats
+from utils.members import build_client_options
+from utils.settings import get_settings
+from utils.guild_resources import GuildResources
+from utils.rest_scheduler import RestScheduler
 
-# Configura as Intents do Discord
-intents = discord.Intents.default()
-intents.members = True          # Garante que a intent SERVER MEMBERS INTENT seja solicitada
-intents.message_content = True  # Garante que a intent MESSAGE CONTENT INTENT seja solicitada
-intents.guilds = True           # Já inclui acesso básico a guildas
-intents.presences = True   
+# Configuração lida e validada uma única vez (ver utils/settings.py)
+settings = get_settings()
+
+def list_cog_extensions() -> list[str]:
+    """Nomes das extensões encontradas no diretório 'cogs'."""
+    return [f'cogs.{filename[:-3]}' for filename in sorted(os.listdir('./cogs')) if filename.endswith('.py') and not filename.startswith('__')]
+
+class ArenaBot(commands.Bot):
+    """
+    Bot da Arena. Toda a inicialização acontece uma única vez em `setup_hook`, antes da conexão
+    com o gateway: reconexões disparam `on_ready` de novo, mas não refazem nada disso.
+    Cada cog pode expor `persistent_views()` (views persistentes a registrar) e
+    `start_background_tasks()` (tarefas iniciadas depois que todos os cogs estão carregados).
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.startup_timings: dict[str, float] = {}
+        # Cargos e canais do servidor indexados por ID e nome, invalidados pelos eventos do gateway
+        self.guild_resources = GuildResources(self, settings.server_id)
+        self.guild_resources.register_listeners()
+        # Fila com prioridade para os envios/edições/exclusões feitos pelo bot (ver utils/rest_scheduler.py)
+        self.rest_scheduler = RestScheduler(workers=settings.rest_workers)
+
+    @contextmanager
+    def _startup_phase(self, name: str):
+        started = time.perf_counter()
+        yield
+        self.startup_timings[name] = time.perf_counter() - started
+
+    async def setup_hook(self):
+        logger.info('Conectando ao MongoDB...')
+        with self._startup_phase('db_connect'):
+            try:
+                await connect_db(settings.mongo_uri, 'Arena')
+            except Exception as e:
+                logger.error(f'Erro ao conectar ao MongoDB: {e}')
+                raise
+        logger.info('Conectado ao MongoDB!')
+        self.rest_scheduler.start()
+
+        with self._startup_phase('cog_import'):
+            await self.load_cogs()
+        with self._startup_phase('view_registration'):
+            self.register_persistent_views(self.cogs.values())
+        with self._startup_phase('background_tasks'):
+            await self.start_background_tasks(self.cogs.values())
+        if settings.sync_commands_on_startup and settings.server_id:
+            with self._startup_phase('command_sync'):
+                guild = discord.Object(id=settings.server_id)
+                self.tree.copy_global_to(guild=guild)
+                synced = await self.tree.sync(guild=guild)
+            logger.info(f'Sincronizados {len(synced)} comandos para o servidor {settings.server_id}.')
+
+        timings = ' | '.join(f'{phase}: {seconds * 1000:.0f} ms' for phase, seconds in self.startup_timings.items())
+        logger.info(f'Inicialização concluída em {sum(self.startup_timings.values()):.2f}s ({timings})')
+
+    async def load_cogs(self):
+        """Carrega todos os cogs do diretório 'cogs' em paralelo."""
+        async def load(extension: str):
+            started = time.perf_counter()
+            try:
+                await self.load_extension(extension)
+                logger.info(f'Cog {extension[5:]} carregado em {(time.perf_counter() - started) * 1000:.0f} ms')
+            except Exception as e:
+                logger.error(f'Falha ao carregar cog "{extension[5:]}": {e}')
+        await asyncio.gather(*(load(extension) for extension in list_cog_extensions()))
+
+    def register_persistent_views(self, cogs):
+        """Registra as views persistentes declaradas pelos cogs."""
+        for cog in cogs:
+            for view in getattr(cog, 'persistent_views', lambda: [])():
+                self.add_view(view)
+
+    async def start_background_tasks(self, cogs):
+        """Inicia as tarefas de fundo declaradas pelos cogs."""
+        for cog in cogs:
+            if start := getattr(cog, 'start_background_tasks', None):
+                try:
+                    await start()
+                except Exception as e:
+                    logger.error(f'Falha ao iniciar as tarefas do cog "{cog.qualified_name}": {e}')
+
+    async def activate_extension(self, extension: str):
+        """Registra as views e inicia as tarefas dos cogs de uma extensão recarregada."""
+        cogs = [cog for cog in self.cogs.values() if cog.__module__ == extension]
+        self.register_persistent_views(cogs)
+        await self.start_background_tasks(cogs)
+
+    async def close(self):
+        """Fecha a conexão com o MongoDB só quando o bot é encerrado de fato."""
+        await super().close()
+        self.rest_scheduler.stop()
+        await close_db()
 
 # Inicializa o cliente do bot
-bot = commands.Bot(
-    command_prefix=BOT_PREFIX,
-    intents=intents,
-    member_cache_flags=discord.MemberCacheFlags.all() # <-- ESTA LINHA É CRÍTICA!
+# Intents e cache de membros dependem do modo configurado (ver utils/members.py)
+bot = ArenaBot(
+    command_prefix=settings.bot_prefix,
+    **build_client_options(settings.member_cache_mode)
 )
 
 @bot.event
 async def on_ready():
-    """Evento disparado quando o bot está pronto e connectado ao Discord"""
+    """Evento disparado quando o bot está pronto; também dispara após reconexões, por isso não inicializa nada."""
     logger.info(f'Logged in as {bot.user.name} (ID: {bot.user.id})')
-    logger.info(f'Prefix commands: {BOT_PREFIX}')
-    logger.info('Conectando ao MongoDB...')
-    try:
-        await connect_db(MONGO_URI, 'Arena')
-        logger.info('Conectado ao MongoDB!')
-    except Exception as e:
-        logger.error(f'Erro ao conectar ao MongoDB: {e}')
-        await close_db()
-        return
-    
-    await load_cogs()
-    logger.info('Todos os cogs foram carregados com sucesso')
+    logger.info(f'Prefix commands: {settings.bot_prefix}')
+    logger.info(f'Modo de cache de membros: {settings.member_cache_mode}')
     logger.info('Bot pronto para uso!')
 
 @bot.event
 async def on_disconnect():
-    """Evento disparado quando o bot é desconectado do Discord"""
-    logger.info('Bot desconectado do Discord. Fechando conexão com MongoDB')
-    await close_db()
-
-async def load_cogs():
-    """Carrega todos os cogs do diretório 'cogs'"""
-    for filename in os.listdir('./cogs'):
-        if filename.endswith('.py') and not filename.startswith('__'):
-            try:
-                await bot.load_extension(f'cogs.{filename[:-3]}')
-                logger.info(f'Cog {filename[:-3]} carregado com sucesso')
-            except Exception as e:
-                logger.info(f'Falha ao carregar cog "{filename[:-3]}": {e}')
+    """Evento disparado quando o bot é desconectado do Discord (a biblioteca reconecta sozinha)"""
+    logger.info('Bot desconectado do Discord. Aguardando reconexão...')
 
 @bot.command()
 @commands.is_owner()
@@ -76,6 +148,7 @@ async def reload(ctx: commands.Context, cog_name: str = None):
     if cog_name:
         try:
             await bot.reload_extension(f'cogs.{cog_name}')
+            await bot.activate_extension(f'cogs.{cog_name}')
             await ctx.send(f'Cog {cog_name} recarregado com sucesso')
             logger.info(f'Cog {cog_name} recarregado com sucesso')
         except commands.ExtensionNotLoaded:
@@ -86,13 +159,13 @@ async def reload(ctx: commands.Context, cog_name: str = None):
     
     else:
         # Recarregar todos os cogs
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py') and not filename.startswith('__'):
-                try:
-                    await bot.reload_extension(f'cogs.{filename[:-3]}')
-                    logger.info(f'Cog {filename[:-3]} recarregado com sucesso')
-                except Exception as e:
-                    logger.info(f'Falha ao recarregar cog "{filename[:-3]}": {e}')
+        for extension in list_cog_extensions():
+            try:
+                await bot.reload_extension(extension)
+                await bot.activate_extension(extension)
+                logger.info(f'Cog {extension[5:]} recarregado com sucesso')
+            except Exception as e:
+                logger.info(f'Falha ao recarregar cog "{extension[5:]}": {e}')
         await ctx.send('Todos os cogs foram recarregados com sucesso')
 
 @bot.command()
@@ -111,9 +184,98 @@ async def sync(ctx: commands.Context):
         await ctx.send(f"❌ Falha ao sincronizar comandos: {e}")
         print(f"Falha ao sincronizar comandos: {e}")
 
+@bot.command(name="cache")
+@commands.is_owner()
+async def cache_stats(ctx: commands.Context):
+    """Mostra os contadores do cache de jogadores (apenas para o dono do bot)."""
+    stats = get_player_cache().stats()
+    await ctx.send(
+        f"🗃️ **Cache de jogadores:** {stats['size']}/{stats['max_size']} entradas (TTL {stats['ttl_seconds']:.0f}s)\n"
+        f"Acertos: `{stats['hits']}` | Falhas: `{stats['misses']}` | Taxa de acerto: `{stats['hit_rate']:.1%}`\n"
+        f"Despejos (LRU): `{stats['evictions']}` | Expirados: `{stats['expirations']}` | Invalidações: `{stats['invalidations']}` | Leituras obsoletas descartadas: `{stats['stale_skips']}`"
+    )
+
+@bot.command(name="startup")
+@commands.is_owner()
+async def startup_stats(ctx: commands.Context):
+    """Mostra quanto tempo cada fase da inicialização levou (apenas para o dono do bot)."""
+    lines = [f"`{phase}`: {seconds * 1000:.0f} ms" for phase, seconds in bot.startup_timings.items()]
+    await ctx.send("🚀 **Fases da inicialização:**\n" + "\n".join(lines))
+
+@bot.command(name="rest")
+@commands.is_owner()
+async def rest_stats(ctx: commands.Context):
+    """Mostra a fila de escritas REST por classe de prioridade (apenas para o dono do bot)."""
+    lines = [f"{'classe':<12} {'env':>6} {'ok':>6} {'erro':>5} {'fila':>5} {'ativas':>6} {'espera':>8} {'máx':>8}"]
+    for name, row in bot.rest_scheduler.stats().items():
+        lines.append(
+            f"{name:<12} {row['submitted']:>6} {row['completed']:>6} {row['failed']:>5} {row['queued']:>5} "
+            f"{row['in_flight']:>6} {row['avg_wait_ms']:>8.1f} {row['max_wait_ms']:>8.1f}"
+        )
+    await ctx.send("🚦 **Escritas REST do bot** (espera na fila em ms)\n```\n" + "\n".join(lines) + "\n```")
+
+@bot.command(name="dbstats")
+@commands.is_owner()
+async def db_stats(ctx: commands.Context, reset: str = None):
+    """
+    Mostra a latência das operações do MongoDB por coleção/comando (apenas para o dono do bot).
+    Uso: !dbstats [reset]
+    """
+    monitor = get_command_monitor()
+    if reset == "reset":
+        monitor.reset()
+        return await ctx.send("✅ Estatísticas do MongoDB zeradas.")
+
+    rows = monitor.snapshot()
+    if not rows:
+        return await ctx.send("Nenhuma operação do MongoDB registrada ainda.")
+
+    lines = [f"{'operação':<32} {'n':>6} {'err':>4} {'p50':>7} {'p95':>7} {'p99':>7} {'máx':>8}"]
+    for row in rows[:15]:
+        lines.append(
+            f"{row['operation'][:32]:<32} {row['count']:>6} {row['errors']:>4} "
+            f"{row['p50_ms']:>7.1f} {row['p95_ms']:>7.1f} {row['p99_ms']:>7.1f} {row['max_ms']:>8.1f}"
+        )
+    slowest = "\n".join(
+        f"`{duration_ms:.1f} ms` {operation} ({discord.utils.format_dt(datetime.datetime.fromtimestamp(when), style='R')})"
+        for duration_ms, when, operation in monitor.slowest_operations()[:5]
+    )
+    await ctx.send(
+        f"📊 **Latência do MongoDB (ms)** desde {discord.utils.format_dt(datetime.datetime.fromtimestamp(monitor.started_at), style='R')}\n"
+        f"```\n" + "\n".join(lines) + "\n```\n"
+        f"🐢 **Operações mais lentas:**\n{slowest}"
+    )
+
+@bot.command(name="reads")
+@commands.is_owner()
+async def read_stats(ctx: commands.Context, reset: str = None):
+    """
+    Mostra o volume lido por perfil de leitura de jogadores (apenas para o dono do bot).
+    Uso: !reads [reset]
+    """
+    stats = get_read_stats()
+    if reset == "reset":
+        stats.reset()
+        return await ctx.send("✅ Estatísticas de leitura zeradas.")
+
+    rows = stats.snapshot()
+    if not rows:
+        return await ctx.send("Nenhuma leitura de jogadores registrada ainda.")
+
+    lines = [f"{'perfil':<13} {'chamadas':>8} {'cache':>6} {'docs':>6} {'KiB':>9} {'B/doc':>7} {'µs/doc':>7}"]
+    for row in rows:
+        lines.append(
+            f"{row['profile']:<13} {row['calls']:>8} {row['cache_hits']:>6} {row['documents']:>6} "
+            f"{row['bytes'] / 1024:>9.1f} {row['bytes_per_doc']:>7.0f} {row['decode_us_per_doc']:>7.1f}"
+        )
+    await ctx.send(
+        f"📦 **Leituras de jogadores por perfil** desde {discord.utils.format_dt(datetime.datetime.fromtimestamp(stats.started_at), style='R')}\n"
+        f"```\n" + "\n".join(lines) + "\n```"
+    )
+
 async def main():
     """Função principal para iniciar o bot"""
-    await bot.start(DISCORD_BOT_TOKEN)
+    await bot.start(settings.discord_token)
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
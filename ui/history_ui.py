@@ -0,0 +1,54 @@
+import discord
+from discord import ui
+from typing import Any, List, Optional, Tuple
+
+from database.history_service import MatchHistoryService
+from utils.embeds import create_match_history_embed
+
+HISTORY_PAGE_SIZE = 10
+
+class MatchHistoryView(ui.View):
+    """
+    Navega pelo histórico de duelos de um jogador, página por página.
+    Usa paginação por chave ((timestamp, _id) da última partida exibida) em vez de skip.
+    """
+    def __init__(self, history_service: MatchHistoryService, member: discord.Member, author_id: int):
+        super().__init__(timeout=180)
+        self.history_service = history_service
+        self.member = member
+        self.author_id = author_id
+        # Cursores das páginas já visitadas: cursors[i] é o "before" da página i + 1
+        self.cursors: List[Optional[Tuple[float, Any]]] = [None]
+        self.has_next = False
+
+    async def load_page(self) -> discord.Embed:
+        """Busca a página atual e atualiza o estado dos botões."""
+        # Pede um item a mais para saber se existe uma próxima página
+        matches = await self.history_service.get_history_page(self.member.id, before=self.cursors[-1], limit=HISTORY_PAGE_SIZE + 1)
+        self.has_next = len(matches) > HISTORY_PAGE_SIZE
+        matches = matches[:HISTORY_PAGE_SIZE]
+        self.last_key = (matches[-1]['timestamp'], matches[-1]['_id']) if matches else None
+
+        self.previous_button.disabled = len(self.cursors) == 1
+        self.next_button.disabled = not self.has_next
+        return await create_match_history_embed(self.member, matches, page=len(self.cursors))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Apenas quem abriu o histórico pode navegar por ele.", ephemeral=True)
+            return False
+        return True
+
+    @ui.button(label="Anterior", style=discord.ButtonStyle.secondary, emoji="⬅️")
+    async def previous_button(self, interaction: discord.Interaction, button: ui.Button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        embed = await self.load_page()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @ui.button(label="Próxima", style=discord.ButtonStyle.secondary, emoji="➡️")
+    async def next_button(self, interaction: discord.Interaction, button: ui.Button):
+        if self.has_next and self.last_key is not None:
+            self.cursors.append(self.last_key)
+        embed = await self.load_page()
+        await interaction.response.edit_message(embed=embed, view=self)
@@ -53,7 +53,7 @@ class RegistrationModal(ui.Modal, title="Formulário de Registro"):
             if card_channel:
                 try:
                     # Busca os dados mais recentes para garantir que tudo está atualizado
-                    player_data = await player_service.get_player_by_id(member.id)
+                    player_data = await player_service.get_player_by_id(member.id, profile="card")
                     if player_data:
                         card_embed = await create_player_card_embed(member, player_data)
                         await card_channel.send(embed=card_embed)
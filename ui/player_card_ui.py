@@ -1,9 +1,6 @@
 import discord
 from discord import ui
 
-# Importamos a função de criar o embed para poder reutilizá-la
-from utils.embeds import create_player_card_embed
-
 class PlayerCardView(ui.View):
     """
     A View que contém os botões para o card de um jogador.
@@ -15,7 +12,7 @@ class PlayerCardView(ui.View):
     async def update_button(self, interaction: discord.Interaction, button: ui.Button):
         """
         Callback para o botão de atualizar.
-        Busca os dados mais recentes do jogador e edita a mensagem.
+        Pede a atualização do card do jogador com os dados mais recentes.
         """
         await interaction.response.defer(ephemeral=True)
 
@@ -26,18 +23,8 @@ class PlayerCardView(ui.View):
         except (IndexError, ValueError, AttributeError):
             return await interaction.followup.send("❌ Não foi possível identificar o jogador a partir deste card.", ephemeral=True)
             
-        # Pega o cog para acessar o serviço de jogadores
-        reg_cog = interaction.client.get_cog("RegistrationCog")
-        if not reg_cog:
+        # A edição fica com o atualizador de cards do RegistrationCog, que agrupa cliques repetidos
+        if not interaction.client.get_cog("RegistrationCog"):
             return await interaction.followup.send("❌ Erro interno do bot.", ephemeral=True)
-
-        member = interaction.guild.get_member(member_id)
-        player_data = await reg_cog.player_service.get_player_by_id(member_id)
-
-        if member and player_data:
-            # Cria o novo embed com os dados atualizados
-            new_embed = await create_player_card_embed(member, player_data)
-            await interaction.message.edit(embed=new_embed)
-            await interaction.followup.send("✅ Card atualizado!", ephemeral=True)
-        else:
-            await interaction.followup.send("❌ Não foi possível encontrar os dados deste jogador.", ephemeral=True)
\ No newline at end of file
+        interaction.client.dispatch("player_updated", member_id)
+        await interaction.followup.send("✅ O card será atualizado em instantes!", ephemeral=True)
\ No newline at end of file
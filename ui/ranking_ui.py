@@ -0,0 +1,22 @@
+import discord
+from discord import ui
+from typing import Dict, Any, List
+
+class RankingPageView(ui.View):
+    """
+    Botões de navegação do /ranking. O cursor da página (pontos e ID do primeiro/último
+    jogador) vai no custom_id, então a navegação continua funcionando após reinícios.
+    Os cliques são tratados pelo listener de interações do RankingCog.
+    """
+    def __init__(self, page: int, players: List[Dict[str, Any]], has_next: bool):
+        super().__init__(timeout=None)
+
+        if players:
+            first, last = players[0], players[-1]
+            previous_id = f"ranking_prev_{page}_{first['individual_elo_points']}_{first['_id']}"
+            next_id = f"ranking_next_{page}_{last['individual_elo_points']}_{last['_id']}"
+        else:
+            previous_id, next_id = f"ranking_prev_{page}_0_0", f"ranking_next_{page}_0_0"
+
+        self.add_item(ui.Button(label="Anterior", style=discord.ButtonStyle.secondary, emoji="⬅️", custom_id=previous_id, disabled=page <= 1))
+        self.add_item(ui.Button(label="Próxima", style=discord.ButtonStyle.secondary, emoji="➡️", custom_id=next_id, disabled=not has_next))
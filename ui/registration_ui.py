@@ -1,19 +1,15 @@
 import discord
 from discord import ui
 import logging
-import os
 
-from utils.embeds import create_player_card_embed
+from utils.members import resolve_member
+from utils.settings import get_settings
 from database.player_service import PlayerService
 
 logger = logging.getLogger(__name__)
 
-try:
-    PLAYER_CARD_CHANNEL_ID = int(os.getenv('PLAYER_CARD_CHANNEL_ID'))
-    SERVER_ID = int(os.getenv('SERVER_ID'))
-except (TypeError, ValueError):
-    PLAYER_CARD_CHANNEL_ID = 0
-    SERVER_ID = 0
+# Cargos de rota gerenciados pelo registro
+ROUTE_ROLE_NAMES = ["Top", "Jungle", "Mid", "ADC", "Support"]
 
 class RegistrationModal(ui.Modal, title="Formulário de Registro"):
     # --- MUDANÇA AQUI: O construtor agora aceita dados existentes ---
@@ -48,38 +44,27 @@ class RegistrationModal(ui.Modal, title="Formulário de Registro"):
             region=self.wr_region.value.upper(), roles=roles_list
         )
         
-        guild = interaction.client.get_guild(SERVER_ID)
-        member = guild.get_member(interaction.user.id) if guild else None
+        settings = get_settings()
+        resources = interaction.client.guild_resources
+        guild = interaction.client.get_guild(settings.server_id)
+        member = await resolve_member(guild, interaction.user.id)
 
         if guild and member:
             # Lógica para atualizar cargos: remove os antigos e adiciona os novos
-            all_role_names = ["Top", "Jungle", "Mid", "ADC", "Support"]
-            roles_to_remove = [role for role_name in all_role_names if (role := discord.utils.get(guild.roles, name=role_name)) and role in member.roles]
+            roles_to_remove = [role for role in resources.roles(ROUTE_ROLE_NAMES) if member.get_role(role.id)]
             if roles_to_remove:
                 await member.remove_roles(*roles_to_remove, reason="Atualização de rotas de registro.")
 
-            roles_to_add = [role for role_name in roles_list if (role := discord.utils.find(lambda r: r.name.lower() == role_name.lower(), guild.roles))]
+            roles_to_add = resources.roles(roles_list)
             if roles_to_add:
                 await member.add_roles(*roles_to_add, reason="Atualização de rotas de registro.")
 
-        # Lógica para atualizar ou enviar o card do jogador
-        if PLAYER_CARD_CHANNEL_ID != 0 and guild and member:
-            card_channel = guild.get_channel(PLAYER_CARD_CHANNEL_ID)
-            player_data = await player_service.get_player_by_id(member.id)
-            if card_channel and player_data:
-                card_embed = await create_player_card_embed(member, player_data)
-                
-                # Se o card já existe, edita. Se não, envia um novo.
-                if card_message_id := player_data.get('player_card_message_id'):
-                    try:
-                        card_message = await card_channel.fetch_message(card_message_id)
-                        await card_message.edit(embed=card_embed)
-                    except discord.NotFound:
-                        new_card_message = await card_channel.send(embed=card_embed)
-                        await player_service.set_player_card_message_id(member.id, new_card_message.id)
-                else:
-                    new_card_message = await card_channel.send(embed=card_embed)
-                    await player_service.set_player_card_message_id(member.id, new_card_message.id)
+        # Avisa os outros cogs que o jogador está registrado: o ranking o inclui no placar
+        # e o atualizador de cards edita (ou cria, no primeiro registro) o card dele
+        player_data = await player_service.get_player_by_id(interaction.user.id, profile="rating")
+        if player_data:
+            interaction.client.dispatch("player_registered", player_data)
+            interaction.client.dispatch("player_updated", interaction.user.id)
         
         await interaction.followup.send("✅ Seu registro foi atualizado com sucesso!", ephemeral=True)
 
@@ -0,0 +1,68 @@
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import discord
+
+from database.bot_state_service import BotStateService
+
+logger = logging.getLogger(__name__)
+
+# Quantas mensagens o reparo procura no histórico quando uma âncora nunca foi registrada
+REPAIR_HISTORY_LIMIT = 50
+
+class AnchorMessages:
+    """
+    Mensagens fixas do bot (ranking, guia, painéis de disputa) localizadas pelo ID salvo em 'bot_state'.
+    A edição usa mensagens parciais, sem buscar a mensagem antes; o histórico do canal só é
+    percorrido uma vez, como reparo, quando a âncora ainda não existe no banco.
+    """
+    def __init__(self, bot: discord.Client, state: BotStateService):
+        self.bot = bot
+        self.state = state
+        self._anchors: Dict[str, Tuple[int, int]] = {}  # nome -> (channel_id, message_id)
+
+    async def get(self, name: str) -> Optional[Tuple[int, int]]:
+        if name not in self._anchors:
+            anchor = await self.state.get_anchor(name)
+            if not anchor:
+                return None
+            self._anchors[name] = (anchor['channel_id'], anchor['message_id'])
+        return self._anchors[name]
+
+    async def record(self, name: str, message: discord.Message):
+        """Registra (ou substitui) a mensagem de uma âncora."""
+        self._anchors[name] = (message.channel.id, message.id)
+        await self.state.set_anchor(name, message.channel.id, message.id)
+
+    async def forget(self, name: str):
+        self._anchors.pop(name, None)
+        await self.state.delete_anchor(name)
+
+    async def _repair(self, name: str, channel: discord.TextChannel, match: Callable[[discord.Message], bool]) -> Optional[discord.Message]:
+        async for message in channel.history(limit=REPAIR_HISTORY_LIMIT):
+            if message.author == self.bot.user and match(message):
+                logger.info(f"Âncora '{name}' recuperada do histórico do canal '{channel.name}'.")
+                await self.record(name, message)
+                return message
+        return None
+
+    async def edit_or_post(self, name: str, channel: discord.TextChannel, match: Optional[Callable[[discord.Message], bool]] = None,
+                           **fields: Any) -> Tuple[discord.Message, bool]:
+        """
+        Edita a mensagem da âncora com `fields` (embed, content, view...) ou posta uma nova se ela não existir mais.
+        `match` identifica a mensagem no histórico para o reparo de uma âncora nunca registrada.
+        Retorna (mensagem, True se uma nova mensagem foi postada).
+        """
+        anchor = await self.get(name)
+        if anchor and anchor[0] == channel.id:
+            try:
+                return await channel.get_partial_message(anchor[1]).edit(**fields), False
+            except discord.NotFound:
+                logger.warning(f"Mensagem da âncora '{name}' não existe mais. Postando uma nova.")
+        elif anchor is None and match is not None:
+            if message := await self._repair(name, channel, match):
+                return await message.edit(**fields), False
+
+        message = await channel.send(**fields)
+        await self.record(name, message)
+        return message, True
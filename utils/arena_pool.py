@@ -0,0 +1,199 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+import discord
+
+from utils.rest_scheduler import PRIORITY_DUEL_PANEL, PRIORITY_CLEANUP, channel_route
+
+logger = logging.getLogger(__name__)
+
+ARENA_CATEGORY_NAME = "⚔️ Arena de Duelo"
+ARENA_TEXT_CHANNEL_NAME = "💬-chat-do-duelo"
+ARENA_VOICE_CHANNEL_NAME = "🔊 Call do Duelo"
+
+class Arena:
+    """Uma categoria de duelo com seus canais de texto e voz."""
+    __slots__ = ("category", "text_channel", "voice_channel")
+
+    def __init__(self, category: discord.CategoryChannel, text_channel: discord.TextChannel, voice_channel: discord.VoiceChannel):
+        self.category = category
+        self.text_channel = text_channel
+        self.voice_channel = voice_channel
+
+class ArenaPool:
+    """
+    Mantém categorias de duelo prontas e ocultas para evitar criar/deletar canais a cada duelo.
+    Entregar uma arena custa apenas a troca das permissões dos dois canais; ao fim do duelo
+    ela é limpa e escondida de novo. O pool repõe arenas ociosas até `min_idle` e
+    descarta as que passarem de `max_idle`.
+    Todas as chamadas REST passam pelo bot.rest_scheduler: entregar uma arena tem a prioridade dos painéis
+    de duelo; repor, reciclar e apagar arenas são limpeza de fundo.
+    """
+    def __init__(self, bot: discord.Client, guild_id: int, min_idle: int = 2, max_idle: int = 5):
+        self.bot = bot
+        self.guild_id = guild_id
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self._idle: List[Arena] = []
+        self._in_use: Dict[int, Arena] = {}  # category_id -> arena
+        self._replenish_task: Optional[asyncio.Task] = None
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.accept_latencies: deque = deque(maxlen=200)
+
+    @property
+    def guild(self) -> Optional[discord.Guild]:
+        return self.bot.get_guild(self.guild_id)
+
+    def _hidden_overwrites(self, guild: discord.Guild) -> dict:
+        return {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False, connect=False),
+            guild.me: discord.PermissionOverwrite(read_messages=True, manage_channels=True, manage_messages=True, read_message_history=True)
+        }
+
+    def _duel_overwrites(self, guild: discord.Guild, players: Iterable[discord.Member]) -> dict:
+        overwrites = self._hidden_overwrites(guild)
+        for player in players:
+            overwrites[player] = discord.PermissionOverwrite(read_messages=True, connect=True, speak=True)
+        return overwrites
+
+    async def start(self, in_use_channel_ids: Iterable[int] = ()):
+        """
+        Recupera as arenas existentes no servidor e completa o pool. As que não pertencem a um duelo ativo
+        podem ser de duelos recém-encerrados (com a limpeza ainda pendente), então são limpas e escondidas
+        antes de voltar para o pool.
+        """
+        await self.bot.wait_until_ready()
+        guild = self.guild
+        if not guild:
+            return logger.error(f"Pool de arenas: servidor {self.guild_id} não encontrado.")
+
+        in_use_channel_ids = set(in_use_channel_ids)
+        for category in guild.categories:
+            if category.name != ARENA_CATEGORY_NAME:
+                continue
+            if len(category.text_channels) != 1 or len(category.voice_channels) != 1:
+                continue
+            arena = Arena(category, category.text_channels[0], category.voice_channels[0])
+            if arena.text_channel.id in in_use_channel_ids:
+                self._in_use[category.id] = arena
+            elif await self._recycle(arena, "Recuperando arena de duelo."):
+                self._idle.append(arena)
+        logger.info(f"Pool de arenas: {len(self._idle)} ociosas e {len(self._in_use)} em uso recuperadas.")
+        self._schedule_replenish()
+
+    async def _submit(self, priority: int, route: str, factory):
+        return await self.bot.rest_scheduler.submit(priority, route, factory)
+
+    async def _edit_overwrites(self, arena: Arena, overwrites: dict, reason: str, priority: int):
+        await asyncio.gather(
+            self._submit(priority, "guild:channels", lambda: arena.text_channel.edit(overwrites=overwrites, reason=reason)),
+            self._submit(priority, "guild:channels", lambda: arena.voice_channel.edit(overwrites=overwrites, reason=reason))
+        )
+
+    async def _create_arena(self, guild: discord.Guild, overwrites: dict, reason: str, priority: int) -> Arena:
+        category = await self._submit(
+            priority, "guild:channels", lambda: guild.create_category(name=ARENA_CATEGORY_NAME, overwrites=overwrites, reason=reason)
+        )
+        text_channel = await self._submit(priority, "guild:channels", lambda: category.create_text_channel(name=ARENA_TEXT_CHANNEL_NAME))
+        voice_channel = await self._submit(priority, "guild:channels", lambda: category.create_voice_channel(name=ARENA_VOICE_CHANNEL_NAME))
+        return Arena(category, text_channel, voice_channel)
+
+    def _schedule_replenish(self):
+        if len(self._idle) >= self.min_idle:
+            return
+        if self._replenish_task and not self._replenish_task.done():
+            return
+        self._replenish_task = asyncio.create_task(self._replenish())
+
+    async def _replenish(self):
+        """Cria arenas ociosas, uma de cada vez, até atingir `min_idle`."""
+        guild = self.guild
+        while guild and len(self._idle) < self.min_idle:
+            try:
+                arena = await self._create_arena(guild, self._hidden_overwrites(guild), "Arena de duelo em espera", PRIORITY_CLEANUP)
+            except discord.HTTPException as e:
+                return logger.error(f"Pool de arenas: falha ao criar arena ociosa: {e}")
+            self._idle.append(arena)
+
+    async def acquire(self, players: List[discord.Member], reason: str) -> Arena:
+        """
+        Entrega uma arena aos jogadores, reaproveitando uma ociosa quando houver.
+        Uma arena ociosa cujos canais foram apagados por fora é descartada e a próxima é tentada.
+        """
+        guild = self.guild
+        overwrites = self._duel_overwrites(guild, players)
+        arena = None
+        while arena is None and self._idle:
+            candidate = self._idle.pop()
+            try:
+                await self._edit_overwrites(candidate, overwrites, reason, PRIORITY_DUEL_PANEL)
+            except discord.NotFound:
+                logger.warning(f"Pool de arenas: arena {candidate.category.id} não existe mais; descartada.")
+                continue
+            arena = candidate
+            self.hits += 1
+        if arena is None:
+            self.misses += 1
+            arena = await self._create_arena(guild, overwrites, reason, PRIORITY_DUEL_PANEL)
+        self._in_use[arena.category.id] = arena
+        self._schedule_replenish()
+        return arena
+
+    def owns(self, category_id: int) -> bool:
+        """Se a categoria é uma arena entregue a um duelo."""
+        return category_id in self._in_use
+
+    def is_idle(self, category_id: int) -> bool:
+        """Se a categoria é uma arena ociosa do pool (já limpa e escondida)."""
+        return any(arena.category.id == category_id for arena in self._idle)
+
+    async def _recycle(self, arena: Arena, reason: str) -> bool:
+        """Apaga as mensagens, esconde os canais e desconecta quem estiver na call. Retorna False se falhar."""
+        hidden = self._hidden_overwrites(self.guild)
+        try:
+            await self._submit(PRIORITY_CLEANUP, channel_route(arena.text_channel), lambda: arena.text_channel.purge(limit=None, reason=reason))
+            await self._edit_overwrites(arena, hidden, reason, PRIORITY_CLEANUP)
+            # Quem ainda estiver na call perde a conexão junto com a permissão
+            for member in arena.voice_channel.members:
+                await self._submit(PRIORITY_CLEANUP, "guild:members", lambda: member.move_to(None, reason="Duelo finalizado."))
+        except discord.HTTPException as e:
+            logger.error(f"Pool de arenas: falha ao reciclar a arena {arena.category.id}: {e}")
+            return False
+        return True
+
+    async def release(self, category_id: int):
+        """Limpa e esconde a arena de um duelo encerrado, devolvendo-a ao pool (ou descartando o excedente)."""
+        arena = self._in_use.pop(category_id, None)
+        if not arena:
+            return
+        if len(self._idle) >= self.max_idle:
+            try:
+                for channel in (arena.text_channel, arena.voice_channel, arena.category):
+                    await self._submit(PRIORITY_CLEANUP, "guild:channels", lambda: channel.delete(reason="Excedente do pool de arenas."))
+            except discord.HTTPException as e:
+                logger.error(f"Pool de arenas: falha ao apagar a arena excedente {category_id}: {e}")
+            return
+        if await self._recycle(arena, "Reciclando arena de duelo."):
+            self._idle.append(arena)
+
+    def record_accept_latency(self, seconds: float):
+        """Registra o tempo entre o aceite do duelo e o envio do painel."""
+        self.accept_latencies.append(seconds)
+
+    def stats(self) -> dict:
+        acquired = self.hits + self.misses
+        latencies = sorted(self.accept_latencies)
+        return {
+            "idle": len(self._idle),
+            "in_use": len(self._in_use),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / acquired) if acquired else 0.0,
+            "avg_accept_seconds": (sum(latencies) / len(latencies)) if latencies else 0.0,
+            "p95_accept_seconds": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+        }
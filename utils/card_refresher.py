@@ -0,0 +1,119 @@
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import discord
+
+from database.player_service import PlayerService
+from utils.embeds import create_player_card_embed
+from utils.leaderboard import get_rank_position
+from utils.members import resolve_member
+from utils.rest_scheduler import PRIORITY_CONTENT, channel_route
+from utils.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+class PlayerCardRefresher:
+    """
+    Atualiza os cards do canal de cards de forma agrupada. Cada aviso de "jogador X mudou"
+    entra em um conjunto de pendentes; `window` segundos após o pedido mais antigo, todos os pendentes
+    são lidos em uma única consulta e cada card é editado uma vez pela mensagem parcial, sem buscá-la antes.
+    O card só é recriado quando a edição responde NotFound (mensagem apagada) ou o jogador ainda não tem card.
+    """
+    def __init__(self, bot: discord.Client, player_service: PlayerService, window: float = 5.0):
+        self.bot = bot
+        self.player_service = player_service
+        self.window = window
+        self.settings = get_settings()
+        self._pending: Dict[int, float] = {}  # jogador -> momento do primeiro pedido
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Métricas
+        self.queued = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.recreated = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def request(self, player_id: int):
+        """Marca o card do jogador para atualização; pedidos repetidos dentro da janela viram um só."""
+        self.queued += 1
+        if player_id in self._pending:
+            self.coalesced += 1
+            return
+        self._pending[player_id] = time.monotonic()
+        self._wakeup.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run_loop())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run_loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            delay = min(self._pending.values()) + self.window - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            player_ids = list(self._pending)
+            self._pending.clear()
+            try:
+                await self.flush(player_ids)
+            except Exception:
+                self.failed += len(player_ids)
+                logger.exception(f"Erro ao atualizar {len(player_ids)} cards de jogadores.")
+
+    async def flush(self, player_ids: List[int]):
+        """Atualiza agora os cards dos jogadores informados."""
+        card_channel = self.bot.guild_resources.channel(self.settings.player_card_channel_id)
+        guild = self.bot.get_guild(self.settings.server_id)
+        if not card_channel or not guild:
+            self.skipped += len(player_ids)
+            return
+        players = await self.player_service.get_players_by_ids(player_ids, profile="card")
+        for player_id in player_ids:
+            player = players.get(player_id)
+            member = await resolve_member(guild, player_id) if player and player.get('is_registered') else None
+            if not member:
+                self.skipped += 1
+                continue
+            embed = await create_player_card_embed(member, player, get_rank_position(self.bot, player_id))
+            try:
+                await self.bot.rest_scheduler.submit(
+                    PRIORITY_CONTENT, channel_route(card_channel), lambda: self._publish(card_channel, player, embed)
+                )
+            except discord.HTTPException as e:
+                self.failed += 1
+                logger.error(f"Falha ao atualizar o card de {member.display_name}: {e}")
+
+    async def _publish(self, card_channel: discord.TextChannel, player: dict, embed: discord.Embed):
+        if message_id := player.get('player_card_message_id'):
+            try:
+                await card_channel.get_partial_message(message_id).edit(embed=embed)
+                self.sent += 1
+                return
+            except discord.NotFound:
+                pass # O card foi apagado: cria outro abaixo
+        new_card_message = await card_channel.send(embed=embed)
+        await self.player_service.set_player_card_message_id(player['_id'], new_card_message.id)
+        self.sent += 1
+        self.recreated += 1
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "sent": self.sent,
+            "recreated": self.recreated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "pending": len(self._pending)
+        }
@@ -0,0 +1,158 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+from database.dm_queue_service import DMQueueService
+
+logger = logging.getLogger(__name__)
+
+DMHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class TokenBucket:
+    """Limitador de taxa: libera até `capacity` envios de uma vez e repõe `rate` envios por segundo."""
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class DMDispatcher:
+    """
+    Envia as DMs da fila persistente com um número fixo de workers, respeitando
+    um limite de taxa global e aplicando backoff exponencial em caso de 429/erros.
+    Cada tipo de trabalho ('kind') tem o seu handler, registrado pelo cog dono.
+    """
+    def __init__(self, queue: DMQueueService, worker_count: int = 3, rate_per_second: float = 1.0, burst: int = 5,
+                 max_attempts: int = 5, base_backoff: float = 30, max_backoff: float = 3600, poll_interval: float = 30):
+        self.queue = queue
+        self.worker_count = worker_count
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, DMHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        # Métricas
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._recent_sends: deque = deque()
+
+    def register_handler(self, kind: str, handler: DMHandler):
+        self._handlers[kind] = handler
+
+    async def enqueue(self, user_id: int, kind: str, delay: float = 0, payload: Optional[Dict[str, Any]] = None) -> bool:
+        """Enfileira uma DM e acorda os workers."""
+        created = await self.queue.enqueue(user_id, kind, delay=delay, payload=payload)
+        self._wakeup.set()
+        return created
+
+    async def update_payload(self, job: Dict[str, Any], updates: Dict[str, Any]):
+        """Marca o progresso de um trabalho em andamento (usado por handlers com mais de uma etapa)."""
+        job.setdefault('payload', {}).update(updates)
+        await self.queue.update_payload(job['_id'], updates)
+
+    async def start(self):
+        """Recoloca na fila os trabalhos interrompidos e inicia os workers."""
+        requeued = await self.queue.requeue_in_progress()
+        if requeued:
+            logger.info(f"{requeued} DMs interrompidas voltaram para a fila.")
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+
+    def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    async def _wait_for_work(self):
+        """Dorme até o próximo trabalho vencer, um novo ser enfileirado ou o intervalo de verificação passar."""
+        self._wakeup.clear()
+        next_due = await self.queue.next_due_at()
+        timeout = self.poll_interval if next_due is None else min(max(next_due - time.time(), 0.1), self.poll_interval)
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self, worker_id: int):
+        while True:
+            try:
+                job = await self.queue.claim_next()
+                if not job:
+                    await self._wait_for_work()
+                    continue
+                await self.bucket.acquire()
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro inesperado no worker de DMs {worker_id}: {e}")
+                await asyncio.sleep(5)
+
+    async def _run(self, job: Dict[str, Any]):
+        handler = self._handlers.get(job['kind'])
+        if not handler:
+            logger.error(f"Nenhum handler registrado para DMs do tipo '{job['kind']}'.")
+            return await self.queue.fail(job['_id'], "handler ausente")
+        try:
+            await handler(job)
+        except discord.Forbidden as e:
+            # DMs fechadas: tentar de novo não adianta
+            self.failed += 1
+            logger.warning(f"Não foi possível enviar DM ({job['kind']}) para {job['user_id']}: DMs desabilitadas.")
+            await self.queue.fail(job['_id'], str(e))
+        except (discord.HTTPException, discord.RateLimited) as e:
+            retry_after = getattr(e, 'retry_after', None)
+            await self._retry_or_fail(job, str(e), retry_after)
+        except Exception as e:
+            await self._retry_or_fail(job, str(e))
+        else:
+            self.sent += 1
+            self._recent_sends.append(time.monotonic())
+            await self.queue.complete(job['_id'])
+
+    async def _retry_or_fail(self, job: Dict[str, Any], error: str, retry_after: Optional[float] = None):
+        attempts = job.get('attempts', 0) + 1
+        if attempts >= self.max_attempts:
+            self.failed += 1
+            logger.error(f"DM ({job['kind']}) para {job['user_id']} falhou após {attempts} tentativas: {error}")
+            return await self.queue.fail(job['_id'], error)
+        delay = retry_after if retry_after else min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+        self.retried += 1
+        logger.warning(f"DM ({job['kind']}) para {job['user_id']} será tentada de novo em {delay:.0f}s: {error}")
+        await self.queue.retry(job['_id'], delay, error)
+
+    def send_rate_per_minute(self) -> int:
+        """Quantidade de DMs enviadas no último minuto."""
+        cutoff = time.monotonic() - 60
+        while self._recent_sends and self._recent_sends[0] < cutoff:
+            self._recent_sends.popleft()
+        return len(self._recent_sends)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "queue": await self.queue.count_by_status(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "per_minute": self.send_rate_per_minute(),
+            "workers": len(self._workers)
+        }
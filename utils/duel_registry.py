@@ -0,0 +1,72 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+# Status em que um duelo ainda ocupa os jogadores (e, se houver, o seu canal)
+ACTIVE_DUEL_STATUSES = ("pending", "in_progress", "awaiting_screenshot", "awaiting_confirmation", "disputed")
+
+class ActiveDuelRegistry:
+    """
+    Índice em memória dos duelos ativos, por ID do duelo, por jogador e por canal.
+    É reconstruído a partir da coleção 'duels' na inicialização e atualizado
+    com o documento retornado a cada transição de status.
+    """
+    def __init__(self):
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+        self._by_player: Dict[int, Any] = {}
+        self._by_channel: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def load(self, duels: Iterable[Dict[str, Any]]):
+        """Substitui o conteúdo do registro pelos duelos informados."""
+        self._by_id.clear()
+        self._by_player.clear()
+        self._by_channel.clear()
+        for duel in duels:
+            self.track(duel)
+
+    def track(self, duel: Optional[Dict[str, Any]]):
+        """Registra o estado mais recente de um duelo, removendo-o se ele não estiver mais ativo."""
+        if not duel:
+            return
+        self.remove(duel['_id'])
+        if duel.get('status') not in ACTIVE_DUEL_STATUSES:
+            return
+        self._by_id[duel['_id']] = duel
+        self._by_player[duel['challenger_id']] = duel['_id']
+        self._by_player[duel['opponent_id']] = duel['_id']
+        if channel_id := duel.get('channel_id'):
+            self._by_channel[channel_id] = duel['_id']
+
+    def remove(self, duel_id: Any):
+        """Remove um duelo e todas as suas entradas de jogador/canal."""
+        duel = self._by_id.pop(duel_id, None)
+        if not duel:
+            return
+        for player_id in (duel['challenger_id'], duel['opponent_id']):
+            if self._by_player.get(player_id) == duel_id:
+                del self._by_player[player_id]
+        if (channel_id := duel.get('channel_id')) and self._by_channel.get(channel_id) == duel_id:
+            del self._by_channel[channel_id]
+
+    def get(self, duel_id: Any) -> Optional[Dict[str, Any]]:
+        """Duelo ativo pelo seu ID, se houver."""
+        return self._by_id.get(duel_id)
+
+    def get_for_player(self, player_id: int) -> Optional[Dict[str, Any]]:
+        """Duelo ativo de um jogador, se houver."""
+        duel_id = self._by_player.get(player_id)
+        return self._by_id.get(duel_id) if duel_id is not None else None
+
+    def duels(self) -> List[Dict[str, Any]]:
+        """Todos os duelos ativos."""
+        return list(self._by_id.values())
+
+    def channel_ids(self) -> List[int]:
+        """Canais ocupados por duelos ativos."""
+        return list(self._by_channel)
+
+    def get_for_channel(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        """Duelo ativo que usa o canal informado, se houver."""
+        duel_id = self._by_channel.get(channel_id)
+        return self._by_id.get(duel_id) if duel_id is not None else None
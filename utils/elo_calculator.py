@@ -1,3 +1,12 @@
+# Jogadores com menos partidas que o limite usam um Fator K maior para encontrar seu ranking mais rápido
+K_FACTOR_NEW_PLAYER = 40
+K_FACTOR_ESTABLISHED = 24
+NEW_PLAYER_MATCH_LIMIT = 20
+
+def get_k_factor(matches_played: int) -> int:
+    """Retorna o Fator K de um jogador com base na quantidade de partidas disputadas."""
+    return K_FACTOR_NEW_PLAYER if matches_played < NEW_PLAYER_MATCH_LIMIT else K_FACTOR_ESTABLISHED
+
 def calculate_elo(winner_rating: int, loser_rating: int, winner_k: int, loser_k: int) -> tuple[int, int]:
     """
     Calcula a mudança de ELO para o vencedor e o perdedor,
@@ -1,11 +1,18 @@
 import discord
 import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
 # Importamos o mapa de emojis para usá-lo aqui
 from database.models import ELO_EMOJI_MAP
 
-async def create_player_card_embed(member: discord.Member, player_data: Dict[str, Any]) -> discord.Embed:
+def format_rank_position(rank_position: Optional[Tuple[int, int]]) -> str:
+    """Formata a posição no ranking como "#137 de 4.210"."""
+    if not rank_position:
+        return "Sem posição"
+    position, total = rank_position
+    return f"#{position:,} de {total:,}".replace(",", ".")
+
+async def create_player_card_embed(member: discord.Member, player_data: Dict[str, Any], rank_position: Optional[Tuple[int, int]] = None) -> discord.Embed:
     """Cria e retorna um embed de apresentação para um jogador recém-registrado."""
     
     player_elo_str = player_data.get('individual_current_elo', 'N/A')
@@ -35,6 +42,8 @@ async def create_player_card_embed(member: discord.Member, player_data: Dict[str
         value=f"{elo_emoji} **{player_elo_str} {elo_division}**\n`{elo_points}` Pontos", 
         inline=False
     )
+    if rank_position:
+        embed.add_field(name="Posição no Ranking", value=f"🏅 **{format_rank_position(rank_position)}**", inline=False)
     
     embed.set_footer(text=f"ID do Usuário: {member.id}")
     embed.timestamp = datetime.datetime.now(datetime.timezone.utc)
@@ -70,14 +79,14 @@ async def create_duel_result_embed(winner: discord.Member, loser: discord.Member
     
     return embed
 
-async def create_profile_embed(member: discord.Member, player_data: Dict[str, Any]) -> discord.Embed:
+async def create_profile_embed(member: discord.Member, player_data: Dict[str, Any], rank_position: Optional[Tuple[int, int]] = None) -> discord.Embed:
     """Cria e retorna um embed com o perfil detalhado de um jogador."""
     
     # --- Cálculos de Estatísticas ---
-    match_history = player_data.get('individual_match_history', [])
-    wins = sum(1 for match in match_history if match.get('points_change', 0) > 0)
-    losses = len(match_history) - wins
-    win_rate = (wins / len(match_history) * 100) if match_history else 0
+    wins = player_data.get('wins', 0)
+    losses = player_data.get('losses', 0)
+    total_matches = player_data.get('matches_played', wins + losses)
+    win_rate = (wins / total_matches * 100) if total_matches else 0
     win_streak = player_data.get('win_streak', 0)
     
     # --- Montagem do Embed ---
@@ -94,7 +103,7 @@ async def create_profile_embed(member: discord.Member, player_data: Dict[str, An
 
     embed.add_field(
         name="Rank",
-        value=f"{elo_emoji} **{player_elo_str} {player_data.get('individual_current_division', '')}**\n`{player_data.get('individual_elo_points', 0)}` Pontos",
+        value=f"{elo_emoji} **{player_elo_str} {player_data.get('individual_current_division', '')}**\n`{player_data.get('individual_elo_points', 0)}` Pontos\n🏅 {format_rank_position(rank_position)}",
         inline=True
     )
     embed.add_field(
@@ -118,4 +127,28 @@ async def create_profile_embed(member: discord.Member, player_data: Dict[str, An
     registered_at_ts = player_data['created_at']
     embed.set_footer(text=f"Membro desde {discord.utils.format_dt(datetime.datetime.fromtimestamp(registered_at_ts), style='D')}")
 
-    return embed
\ No newline at end of file
+    return embed
+
+async def create_match_history_embed(member: discord.Member, matches: List[Dict[str, Any]], page: int) -> discord.Embed:
+    """Cria o embed com uma página do histórico de duelos de um jogador."""
+    embed = discord.Embed(
+        title=f"📜 Histórico de Duelos de {member.display_name}",
+        color=member.accent_color or discord.Color.blurple()
+    )
+
+    if not matches:
+        embed.description = "Nenhum duelo encontrado nesta página."
+    else:
+        lines = []
+        for match in matches:
+            points_change = match.get('points_change', 0)
+            result_icon = "🏆" if points_change > 0 else "💔"
+            played_at = discord.utils.format_dt(datetime.datetime.fromtimestamp(match['timestamp']), style='R')
+            lines.append(
+                f"{result_icon} vs <@{match['opponent_id']}> (`{match.get('opponent_elo_at_match', 0)}` Pontos) "
+                f"— **{points_change:+d}** {played_at}"
+            )
+        embed.description = "\n".join(lines)
+
+    embed.set_footer(text=f"Página {page}")
+    return embed
@@ -0,0 +1,104 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Union
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+class GuildResources:
+    """
+    Índices de cargos e canais do servidor por ID e por nome (sem diferenciar maiúsculas).
+    São montados na primeira consulta e descartados pelos eventos de criação/edição/remoção
+    de cargos e canais, então as consultas nos caminhos quentes são O(1).
+    """
+    def __init__(self, bot: discord.Client, guild_id: int):
+        self.bot = bot
+        self.guild_id = guild_id
+        self._roles_by_id: Optional[Dict[int, discord.Role]] = None
+        self._roles_by_name: Dict[str, discord.Role] = {}
+        self._channels_by_id: Optional[Dict[int, discord.abc.GuildChannel]] = None
+        self._channels_by_name: Dict[str, discord.abc.GuildChannel] = {}
+        self.rebuilds = 0
+
+    @property
+    def guild(self) -> Optional[discord.Guild]:
+        return self.bot.get_guild(self.guild_id)
+
+    def invalidate_roles(self):
+        self._roles_by_id = None
+
+    def invalidate_channels(self):
+        self._channels_by_id = None
+
+    def _ensure_roles(self) -> bool:
+        if self._roles_by_id is None:
+            guild = self.guild
+            if not guild:
+                return False
+            self._roles_by_id = {role.id: role for role in guild.roles}
+            # Em nomes repetidos vale o primeiro cargo, como no discord.utils.get
+            self._roles_by_name = {}
+            for role in guild.roles:
+                self._roles_by_name.setdefault(role.name.lower(), role)
+            self.rebuilds += 1
+        return True
+
+    def _ensure_channels(self) -> bool:
+        if self._channels_by_id is None:
+            guild = self.guild
+            if not guild:
+                return False
+            self._channels_by_id = {channel.id: channel for channel in guild.channels}
+            self._channels_by_name = {}
+            for channel in guild.channels:
+                self._channels_by_name.setdefault(channel.name.lower(), channel)
+            self.rebuilds += 1
+        return True
+
+    def role(self, key: Union[int, str]) -> Optional[discord.Role]:
+        """Cargo pelo ID ou pelo nome."""
+        if not key or not self._ensure_roles():
+            return None
+        return self._roles_by_id.get(key) if isinstance(key, int) else self._roles_by_name.get(key.lower())
+
+    def roles(self, keys: Iterable[Union[int, str]]) -> List[discord.Role]:
+        """Cargos existentes entre os IDs/nomes informados, sem repetições."""
+        found = {}
+        for key in keys:
+            if role := self.role(key):
+                found[role.id] = role
+        return list(found.values())
+
+    def channel(self, key: Union[int, str]) -> Optional[discord.abc.GuildChannel]:
+        """Canal pelo ID ou pelo nome."""
+        if not key or not self._ensure_channels():
+            return None
+        return self._channels_by_id.get(key) if isinstance(key, int) else self._channels_by_name.get(key.lower())
+
+    def register_listeners(self):
+        """Liga a invalidação dos índices aos eventos de cargos e canais do bot."""
+        async def on_role_change(role: discord.Role, *_):
+            if role.guild.id == self.guild_id:
+                self.invalidate_roles()
+
+        async def on_channel_change(channel: discord.abc.GuildChannel, *_):
+            if channel.guild.id == self.guild_id:
+                self.invalidate_channels()
+
+        async def on_guild_available(guild: discord.Guild):
+            if guild.id == self.guild_id:
+                self.invalidate_roles()
+                self.invalidate_channels()
+
+        for event in ('on_guild_role_create', 'on_guild_role_delete', 'on_guild_role_update'):
+            self.bot.add_listener(on_role_change, event)
+        for event in ('on_guild_channel_create', 'on_guild_channel_delete', 'on_guild_channel_update'):
+            self.bot.add_listener(on_channel_change, event)
+        self.bot.add_listener(on_guild_available, 'on_guild_available')
+
+    def stats(self) -> dict:
+        return {
+            "roles": len(self._roles_by_id) if self._roles_by_id is not None else None,
+            "channels": len(self._channels_by_id) if self._channels_by_id is not None else None,
+            "rebuilds": self.rebuilds
+        }
@@ -0,0 +1,157 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import discord
+
+from database.history_digest_service import HistoryDigestService
+from utils.rest_scheduler import PRIORITY_CONTENT, channel_route
+
+logger = logging.getLogger(__name__)
+
+# Limites do Discord por mensagem
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+# Recusas do Discord (4xx, exceto 429) antes de um lote ser descartado do buffer
+MAX_SEND_FAILURES = 5
+
+class HistoryDigest:
+    """
+    Modo resumo do canal de histórico: os embeds de resultado ficam em um buffer persistente
+    e são publicados juntos, até 10 por mensagem. Um lote sai quando o buffer enche (`max_embeds`)
+    ou quando o embed mais antigo já esperou `flush_interval` segundos.
+    Um embed só sai do banco depois do envio, então um reinício no meio do caminho não perde resultados
+    (no pior caso, o último lote é publicado de novo). Um lote que o Discord recusa `MAX_SEND_FAILURES`
+    vezes é descartado (fica no banco com dead_at) para não travar o resto do buffer.
+    """
+    def __init__(self, bot: discord.Client, service: HistoryDigestService, channel_id: int,
+                 max_embeds: int = MAX_EMBEDS_PER_MESSAGE, flush_interval: float = 60):
+        self.bot = bot
+        self.service = service
+        self.channel_id = channel_id
+        self.max_embeds = min(max_embeds, MAX_EMBEDS_PER_MESSAGE)
+        self.flush_interval = flush_interval
+        self._buffered = 0
+        self._oldest_at: Optional[float] = None
+        self._full = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Métricas
+        self.added = 0
+        self.messages_sent = 0
+        self.embeds_sent = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+
+    async def add(self, embed: discord.Embed):
+        """Guarda o embed no buffer; o envio acontece no próximo lote."""
+        await self.service.add(embed.to_dict())
+        self.added += 1
+        self._buffered += 1
+        if self._oldest_at is None:
+            # Primeiro embed do buffer: acorda o loop para ele armar o prazo do lote
+            self._oldest_at = time.monotonic()
+            self._wakeup.set()
+        if self._buffered >= self.max_embeds:
+            self._full.set()
+
+    async def start(self):
+        """Recupera o que ficou no buffer antes de um reinício e inicia o loop de envio."""
+        self._buffered = await self.service.count()
+        if self._buffered:
+            logger.info(f"{self._buffered} resultados de duelo pendentes no resumo do histórico.")
+            self._oldest_at = time.monotonic() - self.flush_interval # Publica assim que o bot estiver pronto
+        self._task = asyncio.create_task(self._run_loop())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run_loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            if self._oldest_at is None:
+                # Buffer vazio: dorme até o próximo add()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            timeout = self._oldest_at + self.flush_interval - time.monotonic()
+            full_only = True
+            if timeout <= 0:
+                full_only = False # Prazo vencido: publica também o lote incompleto
+            elif not self._full.is_set():
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    full_only = False
+            self._full.clear()
+            try:
+                await self.flush(full_only=full_only)
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"Falha ao publicar o resumo do histórico de duelos: {e}")
+                await asyncio.sleep(self.flush_interval) # Tenta de novo depois, sem perder o buffer
+
+    async def flush(self, full_only: bool = False):
+        """
+        Publica o buffer em mensagens de até `max_embeds` embeds.
+        Com `full_only`, o resto que não completa um lote continua esperando o prazo.
+        """
+        channel = self.bot.guild_resources.channel(self.channel_id)
+        if not channel:
+            raise RuntimeError(f"canal de histórico {self.channel_id} não encontrado")
+        while True:
+            # Um add() que termine depois desta consulta muda `added`: aí o buffer não pode ser dado como vazio
+            added_before = self.added
+            entries = await self.service.pending(self.max_embeds)
+            if not entries:
+                break
+            if full_only and len(entries) < self.max_embeds:
+                self._buffered = len(entries)
+                return
+            batch = self._fit_message(entries)
+            entry_ids = [entry["_id"] for entry in batch]
+            embeds = [discord.Embed.from_dict(entry["embed"]) for entry in batch]
+            try:
+                await self.bot.rest_scheduler.submit(PRIORITY_CONTENT, channel_route(channel), lambda: channel.send(embeds=embeds))
+            except discord.HTTPException as e:
+                if e.status == 429 or e.status >= 500:
+                    raise # Falha passageira: o loop tenta de novo depois
+                dropped = await self.service.record_failure(entry_ids, str(e), MAX_SEND_FAILURES)
+                if not dropped:
+                    raise
+                self.dead_lettered += dropped
+                self._buffered = max(0, self._buffered - dropped)
+                logger.error(f"{dropped} resultados descartados do resumo do histórico após {MAX_SEND_FAILURES} recusas: {e}")
+                continue
+            await self.service.remove(entry_ids)
+            self.messages_sent += 1
+            self.embeds_sent += len(batch)
+            self._buffered = max(0, self._buffered - len(batch))
+        if self.added != added_before:
+            return # Chegou resultado novo durante a consulta: o prazo dele continua valendo
+        self._buffered = 0
+        self._oldest_at = None
+
+    @staticmethod
+    def _fit_message(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Maior prefixo do lote que cabe no limite de caracteres de uma mensagem (sempre ao menos um embed)."""
+        total = 0
+        for index, entry in enumerate(entries):
+            total += len(discord.Embed.from_dict(entry["embed"]))
+            if total > MAX_EMBED_CHARS_PER_MESSAGE and index > 0:
+                return entries[:index]
+        return entries
+
+    def stats(self) -> dict:
+        return {
+            "buffered": self._buffered,
+            "added": self.added,
+            "messages_sent": self.messages_sent,
+            "embeds_sent": self.embeds_sent,
+            "failed_flushes": self.failed_flushes,
+            "dead_lettered": self.dead_lettered
+        }
@@ -0,0 +1,117 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from database.job_service import JobService
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class JobScheduler:
+    """
+    Executa os trabalhos agendados da coleção persistente com um único loop:
+    dorme até o próximo vencimento (ou até um trabalho mais próximo ser agendado),
+    reserva os vencidos e roda cada um em sua própria tarefa.
+    Cada tipo de trabalho ('kind') tem o seu handler, registrado pelo cog dono.
+    """
+    def __init__(self, jobs: JobService, max_attempts: int = 3, retry_delay: float = 30, poll_interval: float = 300):
+        self.jobs = jobs
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, JobHandler] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        # Métricas
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_lateness = 0.0
+
+    def register_handler(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def schedule(self, kind: str, delay: float, payload: Dict[str, Any], key: Optional[str] = None):
+        """Agenda um trabalho para daqui a `delay` segundos e acorda o loop."""
+        await self.jobs.schedule(kind, time.time() + delay, payload, key=key)
+        self._wakeup.set()
+
+    async def ensure_scheduled(self, kind: str, delay: float, payload: Dict[str, Any], key: str) -> bool:
+        """Agenda o trabalho só se a chave ainda não tiver um (usado para recuperar prazos perdidos)."""
+        created = await self.jobs.ensure_scheduled(kind, time.time() + delay, payload, key)
+        if created:
+            self._wakeup.set()
+        return created
+
+    async def cancel(self, key: str):
+        await self.jobs.cancel(key)
+
+    async def start(self):
+        """Recoloca na fila os trabalhos interrompidos e inicia o loop."""
+        requeued = await self.jobs.requeue_running()
+        if requeued:
+            logger.info(f"{requeued} trabalhos agendados interrompidos voltaram para a fila.")
+        self._loop_task = asyncio.create_task(self._run_loop())
+
+    def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+
+    async def _wait_for_work(self):
+        """Dorme até o próximo trabalho vencer, um novo ser agendado ou o intervalo de verificação passar."""
+        self._wakeup.clear()
+        next_run = await self.jobs.next_run_at()
+        timeout = self.poll_interval if next_run is None else min(max(next_run - time.time(), 0.1), self.poll_interval)
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_loop(self):
+        while True:
+            try:
+                job = await self.jobs.claim_due()
+                if not job:
+                    await self._wait_for_work()
+                    continue
+                task = asyncio.create_task(self._run(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro inesperado no loop de trabalhos agendados: {e}")
+                await asyncio.sleep(5)
+
+    async def _run(self, job: Dict[str, Any]):
+        handler = self._handlers.get(job['kind'])
+        if not handler:
+            logger.error(f"Nenhum handler registrado para trabalhos do tipo '{job['kind']}'.")
+            return await self.jobs.fail(job['_id'], "handler ausente")
+        self.started += 1
+        self.total_lateness += max(time.time() - job['run_at'], 0)
+        try:
+            await handler(job['payload'])
+        except Exception as e:
+            attempts = job.get('attempts', 0) + 1
+            if attempts >= self.max_attempts:
+                self.failed += 1
+                logger.error(f"Trabalho '{job['kind']}' falhou após {attempts} tentativas: {e}")
+                return await self.jobs.fail(job['_id'], str(e))
+            logger.warning(f"Trabalho '{job['kind']}' será tentado de novo em {self.retry_delay:.0f}s: {e}")
+            await self.jobs.retry(job['_id'], self.retry_delay, str(e))
+        else:
+            self.completed += 1
+            await self.jobs.complete(job['_id'])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "running": len(self._running),
+            "avg_lateness_seconds": (self.total_lateness / self.started) if self.started else 0.0
+        }
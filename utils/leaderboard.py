@@ -0,0 +1,145 @@
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Campos do jogador necessários para montar o placar
+LEADERBOARD_FIELDS = ("username", "individual_elo_points", "individual_current_elo", "individual_current_division")
+
+# Tamanho de referência dos blocos do placar: um bloco é dividido ao passar de 2x este valor
+LEADERBOARD_BUCKET_SIZE = 512
+
+class LeaderboardIndex:
+    """
+    Placar de líderes em memória, ordenado por (-pontos, id), guardado em blocos ordenados
+    de no máximo 2 * LEADERBOARD_BUCKET_SIZE chaves (como uma lista ordenada em blocos).
+    Uma atualização acha o bloco por busca binária nos máximos dos blocos (O(log n)) e só desloca
+    as chaves daquele bloco, em vez da lista inteira. A posição de um jogador soma o tamanho dos
+    blocos anteriores (n / LEADERBOARD_BUCKET_SIZE somas) mais uma busca binária no bloco.
+    """
+    def __init__(self):
+        self._buckets: List[List[Tuple[int, int]]] = []
+        self._maxes: List[Tuple[int, int]] = []  # maior chave de cada bloco
+        self._players: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self._players
+
+    @staticmethod
+    def _key(player: Dict[str, Any]) -> Tuple[int, int]:
+        return (-player.get("individual_elo_points", 0), player["_id"])
+
+    def load(self, players: Iterable[Dict[str, Any]]):
+        """Substitui o conteúdo do placar pelos jogadores informados."""
+        self._players = {player["_id"]: self._summary(player) for player in players}
+        keys = sorted(self._key(player) for player in self._players.values())
+        self._buckets = [keys[start:start + LEADERBOARD_BUCKET_SIZE] for start in range(0, len(keys), LEADERBOARD_BUCKET_SIZE)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+
+    def _summary(self, player: Dict[str, Any]) -> Dict[str, Any]:
+        summary = {field: player.get(field) for field in LEADERBOARD_FIELDS}
+        summary["_id"] = player["_id"]
+        summary["individual_elo_points"] = player.get("individual_elo_points", 0)
+        return summary
+
+    def _insert_key(self, key: Tuple[int, int]):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            return
+        index = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[index]
+        insort(bucket, key)
+        self._maxes[index] = bucket[-1]
+        if len(bucket) > 2 * LEADERBOARD_BUCKET_SIZE:
+            # Divide o bloco cheio em dois para manter o custo de cada inserção limitado
+            half = len(bucket) // 2
+            self._buckets[index:index + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[index:index + 1] = [bucket[half - 1], bucket[-1]]
+
+    def _remove_key(self, key: Tuple[int, int]):
+        index = bisect_left(self._maxes, key)
+        if index == len(self._buckets):
+            return
+        bucket = self._buckets[index]
+        position = bisect_left(bucket, key)
+        if position == len(bucket) or bucket[position] != key:
+            return
+        del bucket[position]
+        if bucket:
+            self._maxes[index] = bucket[-1]
+        else:
+            del self._buckets[index]
+            del self._maxes[index]
+
+    def _keys_between(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Chaves das posições [start, end) da ordem do placar."""
+        keys: List[Tuple[int, int]] = []
+        offset = 0
+        for bucket in self._buckets:
+            if offset >= end:
+                break
+            if offset + len(bucket) > start:
+                keys.extend(bucket[max(start - offset, 0):end - offset])
+            offset += len(bucket)
+        return keys
+
+    def upsert(self, player: Dict[str, Any]):
+        """Insere ou reposiciona um jogador a partir do seu documento mais recente."""
+        self.remove(player["_id"])
+        summary = self._summary(player)
+        self._players[player["_id"]] = summary
+        self._insert_key(self._key(summary))
+
+    def remove(self, player_id: int):
+        """Remove um jogador do placar, se presente."""
+        summary = self._players.pop(player_id, None)
+        if summary is not None:
+            self._remove_key(self._key(summary))
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """Os `limit` primeiros colocados, do maior para o menor."""
+        return [self._players[player_id] for _, player_id in self._keys_between(0, limit)]
+
+    def signature(self, limit: int) -> Tuple[Tuple[Any, ...], ...]:
+        """Tupla comparável com o que é exibido no topo, para saber se o placar visível mudou."""
+        return tuple(
+            (player["_id"], player["individual_elo_points"], player.get("individual_current_elo"), player.get("individual_current_division"))
+            for player in self.top(limit)
+        )
+
+    def get(self, player_id: int) -> Optional[Dict[str, Any]]:
+        return self._players.get(player_id)
+
+    def position(self, player_id: int) -> Optional[int]:
+        """
+        Posição de um jogador no ranking (1 = primeiro).
+        Jogadores empatados em pontos compartilham a mesma posição.
+        """
+        summary = self._players.get(player_id)
+        if summary is None:
+            return None
+        # (−pontos,) é menor que qualquer (−pontos, id): conta quantos têm mais pontos
+        key = (-summary["individual_elo_points"],)
+        index = bisect_left(self._maxes, key)
+        ahead = sum(len(bucket) for bucket in self._buckets[:index])
+        if index < len(self._buckets):
+            ahead += bisect_left(self._buckets[index], key)
+        return ahead + 1
+
+    def between(self, start_rank: int, end_rank: int) -> List[Dict[str, Any]]:
+        """Jogadores da posição `start_rank` até `end_rank` (inclusive, começando em 1)."""
+        return [self._players[player_id] for _, player_id in self._keys_between(max(start_rank - 1, 0), end_rank)]
+
+
+def get_rank_position(client, player_id: int) -> Optional[Tuple[int, int]]:
+    """
+    Retorna (posição, total de jogadores ranqueados) usando o placar em memória do RankingCog,
+    ou None se o cog não estiver carregado ou o jogador não estiver no ranking.
+    """
+    ranking_cog = client.get_cog("RankingCog")
+    if not ranking_cog:
+        return None
+    position = ranking_cog.leaderboard.position(player_id)
+    return (position, len(ranking_cog.leaderboard)) if position else None
@@ -0,0 +1,77 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Modos de cache de membros aceitos em MEMBER_CACHE_MODE
+MEMBER_CACHE_MODES = ("full", "lean")
+
+# Membros buscados na API ficam guardados por pouco tempo (cargos e apelidos mudam)
+RESOLVED_MEMBERS_MAX_SIZE = 256
+RESOLVED_MEMBERS_TTL_SECONDS = 300
+
+# (servidor, membro) -> (expira em, membro), do menos para o mais usado recentemente
+_resolved_members: "OrderedDict[Tuple[int, int], Tuple[float, discord.Member]]" = OrderedDict()
+
+def build_client_options(mode: str) -> Dict[str, Any]:
+    """
+    Intents e opções de cache de membros do cliente para o modo informado.
+    - full: presenças e todos os membros em memória, com o servidor inteiro baixado na conexão.
+    - lean: sem presenças, sem baixar o servidor na conexão e guardando só quem está em call
+      (necessário para esvaziar as arenas). Os demais membros são resolvidos sob demanda.
+    """
+    intents = discord.Intents.default()
+    intents.members = True          # Garante que a intent SERVER MEMBERS INTENT seja solicitada
+    intents.message_content = True  # Garante que a intent MESSAGE CONTENT INTENT seja solicitada
+    intents.guilds = True           # Já inclui acesso básico a guildas
+    if mode == "lean":
+        intents.presences = False
+        return {
+            "intents": intents,
+            "member_cache_flags": discord.MemberCacheFlags(voice=True, joined=False),
+            "chunk_guilds_at_startup": False,
+        }
+    intents.presences = True
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.all(),
+        "chunk_guilds_at_startup": True,
+    }
+
+async def resolve_member(guild: Optional[discord.Guild], member_id: Optional[int]) -> Optional[discord.Member]:
+    """
+    Busca um membro no cache e, se ele não estiver lá (modo lean), na API. Retorna None se ele saiu do servidor.
+    Os membros buscados na API ficam em um LRU pequeno, para que os passos seguintes do mesmo fluxo
+    (desafio, painel, resultado) não repitam a chamada.
+    """
+    if guild is None or member_id is None:
+        return None
+    member = guild.get_member(member_id)
+    if member is not None:
+        return member
+    key = (guild.id, member_id)
+    if (entry := _resolved_members.get(key)) is not None:
+        expires_at, member = entry
+        if expires_at >= time.monotonic():
+            _resolved_members.move_to_end(key)
+            return member
+        del _resolved_members[key]
+    try:
+        member = await guild.fetch_member(member_id)
+    except discord.NotFound:
+        return None
+    except discord.HTTPException as e:
+        logger.error(f"Não foi possível buscar o membro {member_id}: {e}")
+        return None
+    _resolved_members[key] = (time.monotonic() + RESOLVED_MEMBERS_TTL_SECONDS, member)
+    while len(_resolved_members) > RESOLVED_MEMBERS_MAX_SIZE:
+        _resolved_members.popitem(last=False)
+    return member
+
+def forget_member(guild_id: int, member_id: int):
+    """Tira um membro dos resolvidos recentemente (ex.: ele saiu do servidor)."""
+    _resolved_members.pop((guild_id, member_id), None)
@@ -0,0 +1,158 @@
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Classes de prioridade (menor = sai primeiro da fila)
+PRIORITY_INTERACTION = 0  # respostas a quem acabou de clicar/usar um comando
+PRIORITY_DUEL_PANEL = 1   # painéis e avisos dentro das arenas de duelo
+PRIORITY_CONTENT = 2      # cards, histórico, ranking e guia
+PRIORITY_CLEANUP = 3      # limpeza de canais, lembretes por DM, expulsões
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTION: "interaction",
+    PRIORITY_DUEL_PANEL: "duel_panel",
+    PRIORITY_CONTENT: "content",
+    PRIORITY_CLEANUP: "cleanup",
+}
+
+# Rotas que aceitam mais de uma chamada simultânea; as demais são serializadas
+DEFAULT_ROUTE_LIMITS = {"guild:channels": 2, "dm": 2}
+
+def channel_route(channel: Any) -> str:
+    """Rota das mensagens de um canal (o Discord limita a taxa por canal)."""
+    return f"channel:{getattr(channel, 'id', channel)}"
+
+class _RestAction:
+    __slots__ = ("priority", "route", "factory", "future", "enqueued_at")
+
+    def __init__(self, priority: int, route: str, factory: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.priority = priority
+        self.route = route
+        self.factory = factory
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+class _ClassStats:
+    __slots__ = ("submitted", "completed", "failed", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+class RestScheduler:
+    """
+    Fila única para as escritas REST iniciadas pelo bot (envios, edições, exclusões, DMs).
+    Cada ação tem uma classe de prioridade e uma rota: os workers sempre pegam a ação mais prioritária
+    cuja rota ainda tem vaga, então um canal em backoff de rate limit segura só as ações daquele canal
+    e a limpeza de fundo nunca ocupa mais que `class_limits[PRIORITY_CLEANUP]` workers.
+    As ações são fábricas de corrotinas (lambda: channel.send(...)) e `submit` devolve o resultado delas.
+    """
+    def __init__(self, workers: int = 4, route_limits: Optional[Dict[str, int]] = None, default_route_limit: int = 1,
+                 class_limits: Optional[Dict[int, int]] = None):
+        self.worker_count = workers
+        self.route_limits = {**DEFAULT_ROUTE_LIMITS, **(route_limits or {})}
+        self.default_route_limit = default_route_limit
+        self.class_limits = class_limits if class_limits is not None else {PRIORITY_CLEANUP: 1}
+        self._queues: Dict[int, Deque[_RestAction]] = {priority: deque() for priority in PRIORITY_NAMES}
+        self._route_in_flight: Counter = Counter()
+        self._class_in_flight: Counter = Counter()
+        self._changed = asyncio.Condition()
+        self._workers: List[asyncio.Task] = []
+        self._stats = {priority: _ClassStats() for priority in PRIORITY_NAMES}
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        # Quem ainda esperava na fila recebe o cancelamento em vez de ficar pendurado
+        for queue in self._queues.values():
+            while queue:
+                queue.popleft().future.cancel()
+
+    async def submit(self, priority: int, route: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Enfileira a ação e espera o seu resultado (as exceções do Discord chegam a quem chamou)."""
+        if not self._workers:
+            # Fora do ciclo de vida do bot (ex.: antes do setup_hook) a ação roda direto
+            return await factory()
+        future = asyncio.get_running_loop().create_future()
+        async with self._changed:
+            self._queues[priority].append(_RestAction(priority, route, factory, future))
+            self._stats[priority].submitted += 1
+            self._changed.notify()
+        return await future
+
+    def _next_action(self) -> Optional[_RestAction]:
+        for priority, queue in self._queues.items():
+            if not queue:
+                continue
+            if (limit := self.class_limits.get(priority)) is not None and self._class_in_flight[priority] >= limit:
+                continue
+            for index, action in enumerate(queue):
+                if self._route_in_flight[action.route] < self.route_limits.get(action.route, self.default_route_limit):
+                    del queue[index]
+                    return action
+        return None
+
+    async def _worker(self):
+        while True:
+            async with self._changed:
+                action = self._next_action()
+                while action is None:
+                    await self._changed.wait()
+                    action = self._next_action()
+                self._route_in_flight[action.route] += 1
+                self._class_in_flight[action.priority] += 1
+
+            stats = self._stats[action.priority]
+            waited = time.monotonic() - action.enqueued_at
+            stats.wait_total += waited
+            stats.wait_max = max(stats.wait_max, waited)
+            try:
+                if action.future.cancelled():
+                    continue # Quem enviou desistiu enquanto a ação esperava na fila
+                result = await action.factory()
+                stats.completed += 1
+                if not action.future.cancelled():
+                    action.future.set_result(result)
+            except asyncio.CancelledError:
+                action.future.cancel()
+                raise
+            except Exception as e:
+                stats.failed += 1
+                if not action.future.cancelled():
+                    action.future.set_exception(e)
+            finally:
+                async with self._changed:
+                    self._route_in_flight[action.route] -= 1
+                    if not self._route_in_flight[action.route]:
+                        del self._route_in_flight[action.route]
+                    self._class_in_flight[action.priority] -= 1
+                    self._changed.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas por classe de prioridade, incluindo o tempo de espera na fila."""
+        result = {}
+        for priority, name in PRIORITY_NAMES.items():
+            stats = self._stats[priority]
+            started = stats.completed + stats.failed
+            result[name] = {
+                "submitted": stats.submitted,
+                "completed": stats.completed,
+                "failed": stats.failed,
+                "queued": len(self._queues[priority]),
+                "in_flight": self._class_in_flight[priority],
+                "avg_wait_ms": stats.wait_total / started * 1000 if started else 0.0,
+                "max_wait_ms": stats.wait_max * 1000
+            }
+        return result
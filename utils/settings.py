@@ -0,0 +1,112 @@
+import logging
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+from utils.members import MEMBER_CACHE_MODES
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Settings:
+    """Configuração do bot lida do .env uma única vez, já convertida e validada."""
+    discord_token: Optional[str]
+    mongo_uri: str
+    bot_prefix: Optional[str]
+    server_id: int
+    # Canais e cargos
+    duel_history_channel_id: int
+    player_card_channel_id: int
+    ranking_channel_id: int
+    guide_channel_id: int
+    mod_channel_id: int
+    mod_role_id: int
+    registration_log_webhook_url: Optional[str]
+    # Registro e fila de DMs
+    max_reminders_before_kick: int
+    dm_workers: int
+    dm_rate_per_second: float
+    # Duelos
+    arena_pool_min_idle: int
+    arena_pool_max_idle: int
+    history_digest_mode: bool
+    history_digest_interval_seconds: float
+    # Escritas REST do bot
+    rest_workers: int
+    # Inicialização e cache
+    sync_commands_on_startup: bool
+    member_cache_mode: str
+    player_cache_max_size: int
+    player_cache_ttl_seconds: float
+    mongo_slow_query_ms: float
+
+def _read_int(name: str, problems: List[str], default: Optional[int] = None) -> int:
+    """Lê um inteiro do .env. Sem `default`, a variável é obrigatória e a ausência vira um problema (valor 0)."""
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        if default is None:
+            problems.append(f"{name} não configurado")
+            return 0
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        problems.append(f"{name} inválido ('{raw}')")
+        return default if default is not None else 0
+
+def _read_float(name: str, default: float, problems: List[str]) -> float:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        problems.append(f"{name} inválido ('{raw}')")
+        return default
+
+def load_settings() -> Settings:
+    """Monta as configurações a partir das variáveis de ambiente, registrando no log tudo o que estiver faltando ou inválido."""
+    problems: List[str] = []
+    member_cache_mode = os.getenv('MEMBER_CACHE_MODE', 'full').lower()
+    if member_cache_mode not in MEMBER_CACHE_MODES:
+        problems.append(f"MEMBER_CACHE_MODE inválido ('{member_cache_mode}'), usando 'full'")
+        member_cache_mode = 'full'
+
+    settings = Settings(
+        discord_token=os.getenv('BOT_DICORD_TOKEN'),
+        mongo_uri=str(os.getenv('MONGO_URI_NEW')),
+        bot_prefix=os.getenv('BOT_PREFIX'),
+        server_id=_read_int('SERVER_ID', problems),
+        duel_history_channel_id=_read_int('DUEL_HISTORY_CHANNEL_ID', problems),
+        player_card_channel_id=_read_int('PLAYER_CARD_CHANNEL_ID', problems),
+        ranking_channel_id=_read_int('RANKING_CHANNEL_ID', problems),
+        guide_channel_id=_read_int('GUIDE_CHANNEL_ID', problems),
+        mod_channel_id=_read_int('MOD_CHANNEL_ID', problems, default=0),
+        mod_role_id=_read_int('MOD_ROLE_ID', problems),
+        registration_log_webhook_url=os.getenv('REGISTRATION_LOG_WEBHOOK_URL'),
+        max_reminders_before_kick=_read_int('MAX_REMINDERS_BEFORE_KICK', problems, default=3),
+        dm_workers=_read_int('DM_WORKERS', problems, default=3),
+        dm_rate_per_second=_read_float('DM_RATE_PER_SECOND', 1.0, problems),
+        arena_pool_min_idle=_read_int('ARENA_POOL_MIN_IDLE', problems, default=2),
+        arena_pool_max_idle=_read_int('ARENA_POOL_MAX_IDLE', problems, default=5),
+        history_digest_mode=os.getenv('HISTORY_DIGEST_MODE', '').lower() in ('1', 'true', 'sim'),
+        history_digest_interval_seconds=_read_float('HISTORY_DIGEST_INTERVAL_SECONDS', 60.0, problems),
+        rest_workers=_read_int('REST_WORKERS', problems, default=4),
+        sync_commands_on_startup=os.getenv('SYNC_COMMANDS_ON_STARTUP', '').lower() in ('1', 'true', 'sim'),
+        member_cache_mode=member_cache_mode,
+        player_cache_max_size=_read_int('PLAYER_CACHE_MAX_SIZE', problems, default=5000),
+        player_cache_ttl_seconds=_read_float('PLAYER_CACHE_TTL_SECONDS', 300.0, problems),
+        mongo_slow_query_ms=_read_float('MONGO_SLOW_QUERY_MS', 200.0, problems),
+    )
+    for problem in problems:
+        logger.critical(f"ERRO DE CONFIGURAÇÃO: {problem} no .env!")
+    return settings
+
+_settings: Optional[Settings] = None
+
+def get_settings() -> Settings:
+    """Retorna as configurações compartilhadas, lendo o .env na primeira chamada."""
+    global _settings
+    if _settings is None:
+        _settings = load_settings()
+    return _settings